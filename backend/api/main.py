@@ -39,6 +39,7 @@ from .content_integrity import (
     generate_clause_checksum,
     content_manager,
 )
+from .response_cache import response_cache
 
 app = FastAPI(title="ClauseBot Local API", version="1.0.0")
 EDITION = os.getenv("CLAUSEBOT_EDITION", "AWS_D1.1:2025")
@@ -52,10 +53,6 @@ from .routers.clauses import router as clauses_router
 from .routers.admin import router as admin_router
 # from .routers.quiz import router as quiz_router  # Temporarily disabled - using direct endpoint
 
-# Simple in-memory cache with TTL
-cache = {}
-cache_timestamps = {}
-
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -127,26 +124,15 @@ def get_cache_key(code: str, clause: str, operation: str) -> str:
     return f"{code}:{clause}:{operation}"
 
 
-def is_cache_valid(cache_key: str) -> bool:
-    """Check if cache entry is still valid"""
-    if cache_key not in cache_timestamps:
-        return False
-
-    cache_time = cache_timestamps[cache_key]
-    return (time.time() - cache_time) < CACHE_TTL_SECONDS
-
-
-def set_cache_entry(cache_key: str, value: Any):
-    """Set cache entry with timestamp"""
-    cache[cache_key] = value
-    cache_timestamps[cache_key] = time.time()
+@app.on_event("startup")
+async def start_response_cache():
+    """Start the response cache sweeper and cross-worker invalidation listener"""
+    await response_cache.start()
 
 
-def get_cache_entry(cache_key: str) -> Optional[Any]:
-    """Get cache entry if valid"""
-    if cache_key in cache and is_cache_valid(cache_key):
-        return cache[cache_key]
-    return None
+@app.on_event("shutdown")
+async def stop_response_cache():
+    await response_cache.close()
 
 
 @app.get("/health")
@@ -184,7 +170,7 @@ def check_integrity():
 
 
 @app.post("/v1/clauses/{code}/{clause}/explain")
-def explain(
+async def explain(
     code: str,
     clause: str,
     body: ExplainReq,
@@ -204,7 +190,7 @@ def explain(
 
         # Check cache first
         cache_key = get_cache_key(code, clause, "explain")
-        cached_result = get_cache_entry(cache_key)
+        cached_result = await response_cache.get(cache_key)
         if cached_result:
             cached_result["telemetry"]["cache_hit"] = True
             cached_result["telemetry"]["latency_ms"] = int((time.time() - t0) * 1000)
@@ -213,6 +199,7 @@ def explain(
                 200,
                 time.time() - t0,
                 cache_hit=True,
+                cache_stats=response_cache.stats(),
             )
             logger.log(
                 "INFO",
@@ -267,7 +254,7 @@ def explain(
         }
 
         # Cache the result
-        set_cache_entry(cache_key, payload.copy())
+        await response_cache.set(cache_key, payload.copy())
 
         # Record metrics
         record_request_metrics(
@@ -275,6 +262,7 @@ def explain(
             200,
             time.time() - t0,
             cache_hit=False,
+            cache_stats=response_cache.stats(),
         )
         logger.log(
             "INFO",
@@ -303,7 +291,7 @@ def explain(
 
 
 @app.post("/v1/clauses/{code}/{clause}/script")
-def script(
+async def script(
     code: str,
     clause: str,
     body: ScriptReq,
@@ -323,7 +311,7 @@ def script(
 
         # Check cache first
         cache_key = get_cache_key(code, clause, "script")
-        cached_result = get_cache_entry(cache_key)
+        cached_result = await response_cache.get(cache_key)
         if cached_result:
             cached_result["telemetry"]["cache_hit"] = True
             cached_result["telemetry"]["latency_ms"] = int((time.time() - t0) * 1000)
@@ -332,6 +320,7 @@ def script(
                 200,
                 time.time() - t0,
                 cache_hit=True,
+                cache_stats=response_cache.stats(),
             )
             return cached_result
 
@@ -362,11 +351,15 @@ def script(
         }
 
         # Cache the result
-        set_cache_entry(cache_key, payload.copy())
+        await response_cache.set(cache_key, payload.copy())
 
         # Record metrics
         record_request_metrics(
-            "/v1/clauses/{code}/{clause}/script", 200, time.time() - t0, cache_hit=False
+            "/v1/clauses/{code}/{clause}/script",
+            200,
+            time.time() - t0,
+            cache_hit=False,
+            cache_stats=response_cache.stats(),
         )
         logger.log(
             "INFO",
@@ -395,7 +388,7 @@ def script(
 
 
 @app.get("/v1/clauses/{code}/{clause}/summary")
-def summary(
+async def summary(
     code: str, clause: str, request: Request, authorization: str = Header(None)
 ):
     """Quick summary endpoint for mobile UI paint"""
@@ -412,13 +405,14 @@ def summary(
 
         # Check cache first
         cache_key = get_cache_key(code, clause, "summary")
-        cached_result = get_cache_entry(cache_key)
+        cached_result = await response_cache.get(cache_key)
         if cached_result:
             record_request_metrics(
                 "/v1/clauses/{code}/{clause}/summary",
                 200,
                 time.time() - t0,
                 cache_hit=True,
+                cache_stats=response_cache.stats(),
             )
             return cached_result
 
@@ -439,7 +433,7 @@ def summary(
         }
 
         # Cache the result
-        set_cache_entry(cache_key, payload.copy())
+        await response_cache.set(cache_key, payload.copy())
 
         # Record metrics
         record_request_metrics(
@@ -447,6 +441,7 @@ def summary(
             200,
             time.time() - t0,
             cache_hit=False,
+            cache_stats=response_cache.stats(),
         )
 
         return payload
@@ -16,9 +16,11 @@ import uvicorn
 
 # Import optimized components
 from .routes.search_cached import router as search_cached_router
-from .services.retriever_optimized import warm_cache, performance_monitor
+from .services.retriever_optimized import performance_monitor
 from .middleware.rate_limiting import RateLimitMiddleware
 from .middleware.performance_monitoring import PerformanceMiddleware
+from clausebot_api.cache import cache as kv_cache
+from clausebot_api.cache_warming import cache_warmer
 
 # Configure logging
 logging.basicConfig(
@@ -35,9 +37,10 @@ async def lifespan(app: FastAPI):
     logger.info("🚀 Starting ClauseBot Optimized API...")
 
     try:
-        # Warm cache with common queries
-        await warm_cache()
-        logger.info("✅ Cache warmed successfully")
+        # Warm hot keys once per deploy (RQ job), then keep them warm
+        await cache_warmer.enqueue_deploy_warm()
+        await cache_warmer.start()
+        logger.info("✅ Cache warmer started")
 
         # Initialize connection pools
         await initialize_connection_pools()
@@ -47,6 +50,10 @@ async def lifespan(app: FastAPI):
         compile_performance_patterns()
         logger.info("✅ Performance patterns compiled")
 
+        # Follow cache clears from other workers and the sync job
+        kv_cache.bus.add_listener(clear_local_caches)
+        await kv_cache.bus.start()
+
         logger.info("🎯 ClauseBot API ready for sub-1.2s performance!")
 
     except Exception as e:
@@ -57,6 +64,8 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("🔄 Shutting down ClauseBot API...")
+    await cache_warmer.stop()
+    await kv_cache.bus.stop()
     await cleanup_resources()
     logger.info("✅ Shutdown complete")
 
@@ -251,16 +260,31 @@ async def get_performance_stats() -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail="Performance stats unavailable")
 
 
+def clear_local_caches(event: Dict[str, str]) -> None:
+    """Invalidation-bus listener: drop this worker's retriever hot cache"""
+    if event.get("op") not in ("all", "ns"):
+        return
+    from .services.retriever_optimized import get_optimized_retriever
+
+    get_optimized_retriever()._hot_cache.clear()
+
+
 # Admin endpoint for cache management
 @app.post("/admin/cache/clear")
 async def clear_cache() -> Dict[str, Any]:
-    """Clear in-memory cache (admin only)"""
+    """Clear search/clause caches on every worker (admin only)"""
     try:
         from .services.retriever_optimized import get_optimized_retriever
 
         retriever = get_optimized_retriever()
         retriever._hot_cache.clear()
 
+        # Redis entries via generation bump, then every other worker's
+        # L1 and hot cache via the invalidation bus
+        for namespace in ("/v1/search", "/v1/clause"):
+            await kv_cache.invalidate_namespace(namespace)
+        await kv_cache.bus.publish("all")
+
         return {"status": "success", "message": "Cache cleared successfully"}
 
     except Exception as e:
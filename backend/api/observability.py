@@ -1,7 +1,7 @@
 import time
 import json
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
 from collections import defaultdict, deque
 import threading
@@ -59,9 +59,13 @@ class MetricsCollector:
 
 
 def record_request_metrics(
-    endpoint: str, status_code: int, response_time: float, cache_hit: bool = False
+    endpoint: str,
+    status_code: int,
+    response_time: float,
+    cache_hit: bool = False,
+    cache_stats: Optional[Dict[str, Any]] = None,
 ):
-    """Record request metrics"""
+    """Record request metrics (cache_stats: snapshot from ResponseCache.stats())"""
     MetricsCollector.increment_counter("requests_total")
     MetricsCollector.increment_counter("requests_by_endpoint", {"endpoint": endpoint})
     MetricsCollector.increment_counter(
@@ -77,6 +81,11 @@ def record_request_metrics(
     if status_code >= 400:
         MetricsCollector.increment_counter("errors_total")
 
+    if cache_stats:
+        for name in ("entries", "bytes", "evictions", "expired", "shared_hits"):
+            if name in cache_stats:
+                MetricsCollector.set_gauge(f"cache_{name}", cache_stats[name])
+
 
 def get_metrics_summary() -> Dict[str, Any]:
     """Get metrics summary for /metrics endpoint"""
@@ -118,6 +127,11 @@ def get_metrics_summary() -> Dict[str, Any]:
                 "hits": metrics_storage["cache_hits"],
                 "misses": metrics_storage["cache_misses"],
                 "hit_rate_percent": round(cache_hit_rate, 2),
+                "entries": metrics_storage.get("cache_entries", 0),
+                "bytes": metrics_storage.get("cache_bytes", 0),
+                "evictions": metrics_storage.get("cache_evictions", 0),
+                "expired": metrics_storage.get("cache_expired", 0),
+                "shared_hits": metrics_storage.get("cache_shared_hits", 0),
             },
             "errors_total": metrics_storage["errors_total"],
             "active_connections": metrics_storage["active_connections"],
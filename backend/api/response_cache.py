@@ -0,0 +1,257 @@
+"""
+Bounded response cache for the local API (api/main.py)
+
+Replaces the old `cache` / `cache_timestamps` dicts, which never evicted:
+expired entries stayed until the same key was written again, so memory
+grew with every distinct code/clause a client tried.
+
+- TTL + LRU: entries expire after `ttl` seconds and the least recently
+  used entry is evicted once `max_entries` or `max_bytes` is exceeded
+- A daemon sweeper thread drops expired entries every `sweep_interval`
+- Optional shared tier: when API_CACHE_SHARED=true and KV_URL is set,
+  misses fall through to the Redis KVCache so workers share results.
+  invalidate() bumps the shared namespace's generation and, through the
+  KVCache invalidation bus, empties the local tier of every worker
+
+Configuration:
+    CACHE_TTL_SECONDS=86400
+    API_CACHE_MAX_ENTRIES=2048
+    API_CACHE_MAX_BYTES=33554432      # 32 MB
+    API_CACHE_SWEEP_SECONDS=60
+    API_CACHE_SHARED=false
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from clausebot_api.cache import KVCache
+except ImportError:
+    KVCache = None
+
+# Redis namespace for delegated entries (invalidate with KVCache.invalidate_namespace)
+SHARED_NAMESPACE = "cb:/v1/clauses"
+
+
+def _size_of(value: Any) -> int:
+    """Approximate in-memory cost of a value by its JSON length."""
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(repr(value))
+
+
+class ResponseCache:
+    """
+    Thread-safe TTL + LRU cache with an optional shared Redis tier.
+
+    The local tier is guarded by a lock because sync endpoints run in
+    FastAPI's threadpool and the sweeper runs in its own thread.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[int] = None,
+        sweep_interval: Optional[float] = None,
+        shared: Optional[bool] = None,
+    ):
+        self.max_entries = max_entries if max_entries is not None else int(
+            os.getenv("API_CACHE_MAX_ENTRIES", "2048")
+        )
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            os.getenv("API_CACHE_MAX_BYTES", str(32 * 1024 * 1024))
+        )
+        self.ttl = ttl if ttl is not None else int(os.getenv("CACHE_TTL_SECONDS", "86400"))
+        self.sweep_interval = sweep_interval if sweep_interval is not None else float(
+            os.getenv("API_CACHE_SWEEP_SECONDS", "60")
+        )
+        if shared is None:
+            shared = os.getenv("API_CACHE_SHARED", "false").lower() == "true"
+
+        # key -> (expires_at, size, value)
+        self._data: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self.evictions = 0
+        self.expired = 0
+
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        self.kv = None
+        if shared:
+            if KVCache is None:
+                print("⚠️  API_CACHE_SHARED=true but clausebot_api.cache unavailable - local only")
+            else:
+                # Local tier already plays the L1 role, so keep KVCache's off
+                kv = KVCache(l1_max_entries=0)
+                if kv.redis is not None:
+                    self.kv = kv
+                    kv.bus.add_listener(self.on_invalidation)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Local lookup, then the shared tier (if any). None on miss."""
+        value = self.get_local(key)
+        if value is not None or self.kv is None:
+            return value
+
+        value = await self.kv.get(f"{SHARED_NAMESPACE}:{key}")
+        if value is not None:
+            with self._lock:
+                self.misses -= 1  # counted as a shared hit instead
+                self.shared_hits += 1
+            self.set_local(key, value)
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        self.set_local(key, value)
+        if self.kv is not None:
+            await self.kv.set(f"{SHARED_NAMESPACE}:{key}", value, ttl=self.ttl)
+
+    def get_local(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, _, value = entry
+            if expires_at <= time.monotonic():
+                self._drop(key)
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set_local(self, key: str, value: Any) -> bool:
+        """Store locally; returns False if the value can never fit the byte budget."""
+        size = _size_of(value)
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            if size > self.max_bytes:
+                return False
+
+            self._data[key] = (time.monotonic() + self.ttl, size, value)
+            self.bytes += size
+
+            while len(self._data) > self.max_entries or self.bytes > self.max_bytes:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+        return True
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+                return True
+        return False
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._data)
+            self._data.clear()
+            self.bytes = 0
+        return count
+
+    async def invalidate(self) -> int:
+        """Clear this worker's entries and, when shared, every worker's."""
+        cleared = self.clear()
+        if self.kv is not None:
+            # Both publish on the bus; other workers clear in on_invalidation.
+            # SCAN + DEL when CACHE_GENERATION_NAMESPACES leaves this one out
+            if SHARED_NAMESPACE in self.kv.generation_namespaces:
+                await self.kv.invalidate_namespace(SHARED_NAMESPACE)
+            else:
+                await self.kv.delete_pattern(f"{SHARED_NAMESPACE}*")
+        return cleared
+
+    def on_invalidation(self, event: Dict[str, str]) -> None:
+        """InvalidationBus listener: drop the local tier with the shared one."""
+        op, target = event.get("op"), event.get("target") or ""
+        if op == "all" or (op in ("ns", "pattern", "key") and target.startswith(SHARED_NAMESPACE)):
+            self.clear()
+
+    def sweep(self) -> int:
+        """Drop every expired entry; returns how many were removed."""
+        now = time.monotonic()
+        with self._lock:
+            stale = [k for k, (expires_at, _, _) in self._data.items() if expires_at <= now]
+            for key in stale:
+                self._drop(key)
+            self.expired += len(stale)
+        return len(stale)
+
+    def start_sweeper(self) -> None:
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._stop.clear()
+        self._sweeper = threading.Thread(
+            target=self._sweep_loop, name="response-cache-sweeper", daemon=True
+        )
+        self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+
+    async def start(self) -> None:
+        """Start the sweeper and, when shared, the invalidation listener."""
+        self.start_sweeper()
+        if self.kv is not None:
+            await self.kv.bus.start()
+
+    async def close(self) -> None:
+        self.stop_sweeper()
+        if self.kv is not None:
+            await self.kv.bus.stop()
+            await self.kv.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.shared_hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "hit_rate": round((self.hits + self.shared_hits) / total * 100, 2) if total else 0.0,
+                "shared": self.kv is not None,
+            }
+
+    def _sweep_loop(self) -> None:
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"⚠️  Response cache sweep error: {e}")
+
+    def _drop(self, key: str) -> None:
+        _, size, _ = self._data.pop(key)
+        self.bytes -= size
+
+
+# Global instance used by api/main.py and the admin router
+response_cache = ResponseCache()
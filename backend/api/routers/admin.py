@@ -201,11 +201,13 @@ async def detailed_health_check():
 async def clear_cache():
     """Clear ClauseBot cache (useful after sync operations)"""
     try:
-        # This would clear Redis/memory cache in production
-        # For now, return success
+        from ..response_cache import response_cache
+
+        cleared = await response_cache.invalidate()
         return {
             "status": "success",
             "message": "Cache cleared successfully",
+            "entries_cleared": cleared,
             "timestamp": datetime.now().isoformat(),
         }
     except Exception as e:
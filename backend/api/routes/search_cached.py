@@ -6,9 +6,11 @@ GET endpoints with proper cache headers for 150-300ms improvement
 import hashlib
 import re
 from typing import List, Dict, Any
-from fastapi import APIRouter, Query, HTTPException, Response
+from fastapi import APIRouter, Query, HTTPException, Request, Response
 import logging
 
+from clausebot_api.cache import cache_key
+from clausebot_api.response_cache import cached_json_response
 from ..services.retriever_optimized import retrieve_optimized, retrieve_clause_direct
 
 logger = logging.getLogger(__name__)
@@ -38,50 +40,53 @@ def get_cache_headers(query: str, max_age: int = 30) -> Dict[str, str]:
 
 @router.get("/search")
 async def search_cached(
+    request: Request,
     q: str = Query(..., description="Search query", min_length=1, max_length=200),
     limit: int = Query(5, ge=1, le=20, description="Number of results"),
-    response: Response = None,
-) -> Dict[str, Any]:
+) -> Response:
     """
     Cacheable search endpoint for CDN optimization
 
     Expected performance:
-    - Cached hits: 50-150ms TTFB
+    - Cached hits: 50-150ms TTFB (body bytes served as-is from the cache)
     - Uncached: <400ms with optimized indexes
     """
     try:
         # Normalize query for consistent caching
         normalized_query = normalize_query(q)
-
-        # Set cache headers
         cache_headers = get_cache_headers(normalized_query)
-        for key, value in cache_headers.items():
-            response.headers[key] = value
 
-        # Perform optimized search
-        results = await retrieve_optimized(normalized_query, limit)
-
-        # Format response
-        return {
-            "query": q,
-            "normalized_query": normalized_query,
-            "results": [
-                {
-                    "question_id": result.question_id,
-                    "question": result.question,
-                    "clause_reference": result.clause_reference,
-                    "explanation": result.explanation,
-                    "match_type": result.match_type,
-                    "relevance_score": result.relevance_score,
-                }
-                for result in results
-            ],
-            "count": len(results),
-            "source": "ClauseBot",
-            "edition": "AWS D1.1:2025-r1",
-            "cached": False,  # Will be True for CDN hits
-            "cache_key": cache_headers["X-Cache-Key"],
-        }
+        async def run_search() -> Dict[str, Any]:
+            # Perform optimized search
+            results = await retrieve_optimized(normalized_query, limit)
+
+            # Format response; the body is shared by every query that
+            # normalizes to this key, so the caller's "query" is added per
+            # request (fields=) instead of being cached
+            return {
+                "normalized_query": normalized_query,
+                "results": [
+                    {
+                        "question_id": result.question_id,
+                        "question": result.question,
+                        "clause_reference": result.clause_reference,
+                        "explanation": result.explanation,
+                        "match_type": result.match_type,
+                        "relevance_score": result.relevance_score,
+                    }
+                    for result in results
+                ],
+                "count": len(results),
+                "source": "ClauseBot",
+                "edition": "AWS D1.1:2025-r1",
+                "cached": False,  # Will be True for CDN hits
+                "cache_key": cache_headers["X-Cache-Key"],
+            }
+
+        key = cache_key("/v1/search", q=normalized_query, limit=limit)
+        return await cached_json_response(
+            request, key, run_search, headers=cache_headers, fields={"query": q}
+        )
 
     except Exception as e:
         logger.error(f"Cached search error for query '{q}': {str(e)}")
@@ -89,9 +94,7 @@ async def search_cached(
 
 
 @router.get("/clauses/{clause_ref}")
-async def get_clause_cached(
-    clause_ref: str, response: Response = None
-) -> Dict[str, Any]:
+async def get_clause_cached(clause_ref: str, request: Request) -> Response:
     """
     Fast path for direct clause lookups with aggressive caching
 
@@ -111,36 +114,39 @@ async def get_clause_cached(
             "X-Cache-Key": hashlib.md5(clause_ref.encode()).hexdigest()[:8],
         }
 
-        for key, value in cache_headers.items():
-            response.headers[key] = value
-
-        # Direct clause lookup
-        results = await retrieve_clause_direct(clause_ref)
-
-        if not results:
-            raise HTTPException(
-                status_code=404, detail=f"Clause {clause_ref} not found"
-            )
-
-        return {
-            "clause_reference": clause_ref,
-            "results": [
-                {
-                    "question_id": result.question_id,
-                    "question": result.question,
-                    "clause_reference": result.clause_reference,
-                    "explanation": result.explanation,
-                    "match_type": result.match_type,
-                    "relevance_score": result.relevance_score,
-                }
-                for result in results
-            ],
-            "count": len(results),
-            "source": "ClauseBot",
-            "edition": "AWS D1.1:2025-r1",
-            "cached": False,
-            "cache_key": cache_headers["X-Cache-Key"],
-        }
+        async def lookup_clause() -> Dict[str, Any]:
+            # Direct clause lookup
+            results = await retrieve_clause_direct(clause_ref)
+
+            if not results:
+                raise HTTPException(
+                    status_code=404, detail=f"Clause {clause_ref} not found"
+                )
+
+            return {
+                "clause_reference": clause_ref,
+                "results": [
+                    {
+                        "question_id": result.question_id,
+                        "question": result.question,
+                        "clause_reference": result.clause_reference,
+                        "explanation": result.explanation,
+                        "match_type": result.match_type,
+                        "relevance_score": result.relevance_score,
+                    }
+                    for result in results
+                ],
+                "count": len(results),
+                "source": "ClauseBot",
+                "edition": "AWS D1.1:2025-r1",
+                "cached": False,
+                "cache_key": cache_headers["X-Cache-Key"],
+            }
+
+        key = cache_key("/v1/clause", ref=clause_ref)
+        return await cached_json_response(
+            request, key, lookup_clause, headers=cache_headers
+        )
 
     except HTTPException:
         raise
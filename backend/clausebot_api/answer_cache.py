@@ -0,0 +1,192 @@
+"""
+ClauseBot Answer Cache - reuse answers for near-duplicate compliance questions
+
+Inspectors ask the same question in different words ("min preheat for
+A514 over 2.5in" / "A514 thick plate preheat"). Each phrasing used to be a
+full embed -> retrieve -> gpt-4o cycle. After retrieval, rag_pipeline now
+looks for a stored answer that was generated:
+
+- from exactly the same retrieved clause set (IDs and content), and
+- for a query whose embedding has cosine >= ANSWER_CACHE_THRESHOLD with
+  the new one.
+
+Entries are grouped in one Redis value per clause set, keyed by model,
+standard filter and each clause's (clause_id, sha256(content)). An edited
+clause therefore changes the key: answers citing its old text are never
+read again and expire with their TTL. A bucket keeps the
+ANSWER_CACHE_MAX_PER_SET most recent queries (embeddings packed as
+float16, see embedding_cache).
+
+Each entry also records which clauses the answer cited (the ones that
+made it into its packed context, see context_packer). Citations are
+rebuilt from the current retrieval, limited to those clauses; only the
+answer text and its token counts come from the cache.
+
+Configuration:
+    ANSWER_CACHE_ENABLED=true
+    ANSWER_CACHE_THRESHOLD=0.95      # min cosine between query embeddings
+    ANSWER_CACHE_TTL=86400           # seconds
+    ANSWER_CACHE_MAX_PER_SET=8       # stored queries per clause set
+
+Usage:
+    hit = await answer_cache.lookup(embedding, standard, clauses, model)
+    await answer_cache.store(embedding, standard, clauses, model, response)
+"""
+import os
+import base64
+import hashlib
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from clausebot_api.cache import KVCache, cache, cache_key
+from clausebot_api.embedding_cache import decode_vector, encode_vector
+
+NAMESPACE = "/v1/answer"
+STORED_METADATA = ("model", "prompt_tokens", "completion_tokens")
+
+
+def content_hash(text: str) -> str:
+    """Same digest as clause_embeddings.content_hash (sha256 of the content)."""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def clause_fingerprint(clauses: Sequence[Any]) -> List[List[str]]:
+    """Sorted [clause_id, content hash] pairs of a retrieved clause set."""
+    return sorted([c.clause_id, content_hash(c.content)] for c in clauses)
+
+
+def _cosine(a: np.ndarray, b: np.ndarray) -> float:
+    denom = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(a @ b) / denom if denom else 0.0
+
+
+class SemanticAnswerCache:
+    """Answers keyed by clause set, matched by query embedding similarity."""
+
+    def __init__(
+        self,
+        kv: Optional[KVCache] = None,
+        threshold: Optional[float] = None,
+        ttl: Optional[int] = None,
+        max_per_set: Optional[int] = None,
+        enabled: Optional[bool] = None,
+    ):
+        self.kv = kv if kv is not None else cache
+        self.threshold = threshold if threshold is not None else float(
+            os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")
+        )
+        self.ttl = ttl or int(os.getenv("ANSWER_CACHE_TTL", "86400"))
+        self.max_per_set = max_per_set or int(os.getenv("ANSWER_CACHE_MAX_PER_SET", "8"))
+        self.enabled = enabled if enabled is not None else (
+            os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+        )
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "below_threshold": 0,
+            "stored": 0,
+            "errors": 0,
+        }
+
+    def key(self, standard: Optional[str], clauses: Sequence[Any], model: str) -> str:
+        return cache_key(NAMESPACE, model=model, standard=standard, clauses=clause_fingerprint(clauses))
+
+    async def lookup(
+        self,
+        embedding: Sequence[float],
+        standard: Optional[str],
+        clauses: Sequence[Any],
+        model: str,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Stored answer for the most similar earlier query on this clause set.
+
+        Returns:
+            {"answer", "metadata", "similarity", "query", "cited"} or None
+        """
+        if not self.enabled or not clauses:
+            return None
+        try:
+            entries = await self.kv.get(self.key(standard, clauses, model)) or []
+            query = np.asarray(embedding, dtype=np.float32)
+            best, best_score = None, -1.0
+            for entry in entries:
+                if "cited" not in entry:
+                    # Written before cited clauses were recorded
+                    continue
+                stored = np.asarray(decode_vector(base64.b64decode(entry["embedding"])), dtype=np.float32)
+                score = _cosine(query, stored)
+                if score > best_score:
+                    best, best_score = entry, score
+        except Exception as e:
+            self.counters["errors"] += 1
+            print(f"⚠️  Answer cache lookup error: {e}")
+            return None
+
+        if best is None:
+            self.counters["misses"] += 1
+            return None
+        if best_score < self.threshold:
+            self.counters["below_threshold"] += 1
+            return None
+        self.counters["hits"] += 1
+        return {
+            "answer": best["answer"],
+            "metadata": best.get("metadata", {}),
+            "similarity": round(best_score, 4),
+            "query": best.get("query"),
+            "cited": best["cited"],
+        }
+
+    async def store(
+        self,
+        embedding: Sequence[float],
+        standard: Optional[str],
+        clauses: Sequence[Any],
+        model: str,
+        answer: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        query: Optional[str] = None,
+        cited: Optional[Sequence[str]] = None,
+    ) -> None:
+        """
+        Add one answer to its clause-set bucket (most recent first).
+
+        cited: clause IDs the answer's citations cover (default: all)
+        """
+        if not self.enabled or not clauses or not answer:
+            return
+        key = self.key(standard, clauses, model)
+        try:
+            entries = await self.kv.get(key) or []
+            entry = {
+                "embedding": base64.b64encode(encode_vector(list(embedding), "float16")).decode("ascii"),
+                "answer": answer,
+                # Token counts only; latencies belong to the original request
+                "metadata": {k: v for k, v in (metadata or {}).items() if k in STORED_METADATA},
+                "query": query,
+                "cited": list(cited) if cited is not None else [c.clause_id for c in clauses],
+                "stored_at": time.time(),
+            }
+            await self.kv.set(key, [entry] + entries[:self.max_per_set - 1], self.ttl)
+            self.counters["stored"] += 1
+        except Exception as e:
+            # Never fail the request because the cache write failed
+            self.counters["errors"] += 1
+            print(f"⚠️  Answer cache store error: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        c = self.counters
+        total = c["hits"] + c["misses"] + c["below_threshold"]
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "hit_rate": round(c["hits"] / total * 100, 2) if total else 0.0,
+            **c,
+        }
+
+
+# Global instance used by the RAG pipeline
+answer_cache = SemanticAnswerCache()
@@ -9,6 +9,8 @@ from datetime import datetime
 import os
 from supabase import create_client, Client
 
+from clausebot_api.services.supabase_pool import supabase_pool
+
 router = APIRouter(prefix="/v1", tags=["welding-resources"])
 
 # Pydantic models
@@ -38,9 +40,15 @@ class HealthResponse(BaseModel):
     cwi_resources_count: int
     total_count: int
 
-# Supabase client initialization
+# Supabase client initialization (one client per process, reused by every request)
+_client: Optional[Client] = None
+
 def get_supabase_client() -> Client:
     """Get Supabase client instance"""
+    global _client
+    if _client is not None:
+        return _client
+
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
     
@@ -50,7 +58,8 @@ def get_supabase_client() -> Client:
             detail="Supabase configuration missing"
         )
     
-    return create_client(url, key)
+    _client = create_client(url, key)
+    return _client
 
 @router.get(
     "/welding-symbols",
@@ -72,18 +81,20 @@ async def get_welding_symbols(
         supabase = get_supabase_client()
         
         # Query welding symbols
-        response = supabase.table("welding_resources")\
-            .select("*")\
-            .eq("category", "welding_symbols")\
-            .order("created_at", desc=True)\
-            .range(offset, offset + limit - 1)\
-            .execute()
+        response = await supabase_pool.execute(
+            supabase.table("welding_resources")
+            .select("*")
+            .eq("category", "welding_symbols")
+            .order("created_at", desc=True)
+            .range(offset, offset + limit - 1)
+        )
         
         # Get total count
-        count_response = supabase.table("welding_resources")\
-            .select("id", count="exact")\
-            .eq("category", "welding_symbols")\
-            .execute()
+        count_response = await supabase_pool.execute(
+            supabase.table("welding_resources")
+            .select("id", count="exact")
+            .eq("category", "welding_symbols")
+        )
         
         total = count_response.count or 0
         
@@ -116,18 +127,20 @@ async def get_cwi_resources(
         supabase = get_supabase_client()
         
         # Query CWI resources
-        response = supabase.table("welding_resources")\
-            .select("*")\
-            .eq("category", "cwi_resources")\
-            .order("created_at", desc=True)\
-            .range(offset, offset + limit - 1)\
-            .execute()
+        response = await supabase_pool.execute(
+            supabase.table("welding_resources")
+            .select("*")
+            .eq("category", "cwi_resources")
+            .order("created_at", desc=True)
+            .range(offset, offset + limit - 1)
+        )
         
         # Get total count
-        count_response = supabase.table("welding_resources")\
-            .select("id", count="exact")\
-            .eq("category", "cwi_resources")\
-            .execute()
+        count_response = await supabase_pool.execute(
+            supabase.table("welding_resources")
+            .select("id", count="exact")
+            .eq("category", "cwi_resources")
+        )
         
         total = count_response.count or 0
         
@@ -179,7 +192,7 @@ async def search_welding_resources(
             query = query.eq("category", category)
         
         # Execute with pagination
-        response = query.range(offset, offset + limit - 1).execute()
+        response = await supabase_pool.execute(query.range(offset, offset + limit - 1))
         
         # Get total count (approximate for text search)
         count_query = supabase.table("welding_resources")\
@@ -189,7 +202,7 @@ async def search_welding_resources(
         if category:
             count_query = count_query.eq("category", category)
         
-        count_response = count_query.execute()
+        count_response = await supabase_pool.execute(count_query)
         total = count_response.count or 0
         
         return WeldingResourcesList(
@@ -219,16 +232,18 @@ async def welding_resources_health():
         supabase = get_supabase_client()
         
         # Count welding symbols
-        symbols_response = supabase.table("welding_resources")\
-            .select("id", count="exact")\
-            .eq("category", "welding_symbols")\
-            .execute()
+        symbols_response = await supabase_pool.execute(
+            supabase.table("welding_resources")
+            .select("id", count="exact")
+            .eq("category", "welding_symbols")
+        )
         
         # Count CWI resources
-        cwi_response = supabase.table("welding_resources")\
-            .select("id", count="exact")\
-            .eq("category", "cwi_resources")\
-            .execute()
+        cwi_response = await supabase_pool.execute(
+            supabase.table("welding_resources")
+            .select("id", count="exact")
+            .eq("category", "cwi_resources")
+        )
         
         symbols_count = symbols_response.count or 0
         cwi_count = cwi_response.count or 0
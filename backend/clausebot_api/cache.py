@@ -9,13 +9,73 @@ Usage:
         "my-key",
         producer=lambda: expensive_operation()
     )
+
+Optional L1 (in-process LRU in front of Redis):
+    CACHE_L1_MAX_ENTRIES=256       # 0 disables L1 (default)
+    CACHE_L1_MAX_BYTES=16777216    # byte budget (encoded value size)
+    CACHE_L1_TTL=30                # seconds, never longer than the Redis TTL
+
+Miss coalescing:
+    Concurrent get_or_set misses for the same key share one producer call
+    per process. CACHE_REDIS_LOCK=1 additionally takes a SET NX lease in
+    Redis so only one uvicorn worker recomputes a key
+    (CACHE_LOCK_LEASE_MS, default 10000).
+
+Stale-while-revalidate (per namespace):
+    CACHE_STALE_WINDOWS="/v1/quiz=600,/v1/search=120"
+    Entries in a listed namespace are fresh for their TTL and may be served
+    stale for the extra window while get_or_set refreshes them in the
+    background.
+
+Namespace invalidation:
+    Keys in generational namespaces (CACHE_GENERATION_NAMESPACES, default
+    /v1/quiz,/v1/clause,/v1/clauses,/v1/search) carry the namespace's generation
+    ("cb:/v1/quiz:g3:<hash>"). invalidate_namespace() is a single INCR;
+    entries from older generations are never read again and age out by TTL.
+
+Value encoding (see cache_codec):
+    CACHE_CODEC=json|msgpack, CACHE_COMPRESSION=none|zlib|zstd|lz4
+
+Expiry spreading:
+    CACHE_TTL_JITTER=0.1      # each write's TTL is shortened by up to 10%
+    CACHE_XFETCH_BETA=0       # off unless configured (render.yaml sets 1.0)
+    With XFETCH_BETA > 0 every entry records its producer cost; a read
+    triggers a background refresh early with probability rising as expiry
+    nears, sooner for expensive producers (XFetch), so keys written
+    together don't all miss together.
+
+Negative caching:
+    CACHE_NEGATIVE_TTL=30            # seconds; 0 disables
+    CACHE_NEGATIVE_STATUSES=404,422
+    When a get_or_set producer raises an HTTPException with one of these
+    statuses, "no result" and its detail are cached for the short negative
+    TTL and re-raised to later callers without running the producer.
+
+Cross-worker invalidation (see cache_bus):
+    invalidate_namespace / delete / delete_pattern publish an event on
+    CACHE_INVALIDATION_CHANNEL; each worker's listener (cache.bus.start()
+    at app startup) drops the matching L1 entries.
+
+Telemetry (see cache_metrics):
+    Hits by tier, misses, producer latency, value sizes and errors are
+    recorded per namespace; /health/cache and /metrics/cache expose them.
 """
 import os
 import json
+import math
+import time
+import random
+import fnmatch
 import hashlib
 import asyncio
-from typing import Callable, Any, Optional
+import secrets
+from collections import OrderedDict
+from typing import Callable, Any, Dict, List, Optional, Set, Tuple
+from fastapi import HTTPException
 from redis.asyncio import Redis
+from clausebot_api.cache_codec import ValueCodec
+from clausebot_api.cache_metrics import CacheTelemetry
+from clausebot_api.cache_bus import InvalidationBus
 
 
 def _key_for(path: str, payload: Optional[dict] = None) -> str:
@@ -37,18 +97,194 @@ def _key_for(path: str, payload: Optional[dict] = None) -> str:
     return f"cb:{path}"
 
 
+def _namespace_of(key: str) -> str:
+    """Namespace of a key: "cb:/v1/quiz:a1b2" -> "cb:/v1/quiz"."""
+    if key.startswith("cb:"):
+        return "cb:" + key[3:].split(":", 1)[0]
+    return key.split(":", 1)[0]
+
+
+def _parse_namespace_map(raw: str) -> Dict[str, int]:
+    """Parse "/v1/quiz=600,/v1/clause=60" into {"cb:/v1/quiz": 600, ...}."""
+    result = {}
+    for part in raw.split(","):
+        if "=" not in part:
+            continue
+        path, value = part.rsplit("=", 1)
+        result[_as_namespace(path.strip())] = int(value)
+    return result
+
+
+DEFAULT_GENERATION_NAMESPACES = "/v1/quiz,/v1/clause,/v1/clauses,/v1/search"
+
+
+def _as_namespace(path: str) -> str:
+    """"/v1/quiz" -> "cb:/v1/quiz" (already-prefixed names pass through)."""
+    return path if path.startswith("cb:") else f"cb:{path}"
+
+
+# Soft-expiry envelope marker for stale-while-revalidate entries
+_SWR_FIELD = "__cb_soft__"
+
+# Marker for cached "no result" entries
+_NEG_FIELD = "__cb_neg__"
+
+
+class NegativeEntry:
+    """A cached 404/422: status code and detail of the original HTTPException."""
+    
+    __slots__ = ("status_code", "detail")
+    
+    def __init__(self, status_code: int, detail: Any):
+        self.status_code = status_code
+        self.detail = detail
+    
+    def to_exception(self) -> HTTPException:
+        return HTTPException(status_code=self.status_code, detail=self.detail)
+
+
+class WarmEntry:
+    """L1 copy of a value written by the cache warmer, so L1 hits count as warm hits."""
+    
+    __slots__ = ("value",)
+    
+    def __init__(self, value: Any):
+        self.value = value
+
+
+# Compare-and-delete so a worker never releases a lease it no longer owns
+_RELEASE_LOCK_LUA = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class LocalLRU:
+    """
+    Bounded in-process LRU with per-entry expiry.
+    
+    Used as the L1 tier in front of Redis. Entries are evicted
+    least-recently-used first once either `max_entries` or `max_bytes`
+    is exceeded. Sizes are supplied by the caller (the encoded JSON
+    length), so no extra serialization happens here.
+    
+    Values are stored as-is and shared between callers - treat anything
+    returned from the L1 as read-only.
+    """
+    
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # key -> (expires_at, size, value)
+        self._data: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return the value for key, or None if missing/expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            self._drop(key)
+            self.misses += 1
+            return None
+        
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def set(self, key: str, value: Any, ttl: float, size: int) -> bool:
+        """Store a value; returns False if it can never fit the byte budget."""
+        if ttl <= 0 or size > self.max_bytes:
+            self.delete(key)
+            return False
+        
+        if key in self._data:
+            self._drop(key)
+        
+        self._data[key] = (time.monotonic() + ttl, size, value)
+        self.bytes += size
+        
+        while len(self._data) > self.max_entries or self.bytes > self.max_bytes:
+            oldest = next(iter(self._data))
+            self._drop(oldest)
+            self.evictions += 1
+        
+        return True
+    
+    def delete(self, key: str) -> bool:
+        if key in self._data:
+            self._drop(key)
+            return True
+        return False
+    
+    def delete_pattern(self, pattern: str) -> int:
+        """Delete keys matching a Redis-style glob pattern."""
+        matched = [k for k in self._data if fnmatch.fnmatchcase(k, pattern)]
+        for k in matched:
+            self._drop(k)
+        return len(matched)
+    
+    def clear(self) -> None:
+        self._data.clear()
+        self.bytes = 0
+    
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits / total) * 100, 2) if total else 0.0,
+        }
+    
+    def _drop(self, key: str) -> None:
+        _, size, _ = self._data.pop(key)
+        self.bytes -= size
+
+
 class KVCache:
     """
     Async cache wrapper for Valkey/Redis.
     
     Features:
-    - Automatic JSON serialization
+    - Automatic serialization (JSON/msgpack, optional compression)
     - Configurable TTL via QUIZ_CACHE_TTL env var
     - get_or_set pattern for easy integration
     - Namespace prefix ("cb:") for safe key management
+    - Optional in-process L1 LRU (CACHE_L1_MAX_ENTRIES > 0)
+    - Single-flight misses (per process, optionally across workers)
+    - Stale-while-revalidate per namespace (CACHE_STALE_WINDOWS)
+    - O(1) namespace invalidation via generation counters
+    - Batched get_many / set_many / get_or_set_many (one round trip)
+    - Per-namespace telemetry (self.telemetry)
+    - TTL jitter and XFetch probabilistic early refresh
+    - Short-TTL negative entries for 404/422 producer results
+    - Cross-worker L1 invalidation over pub/sub (self.bus)
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        l1_max_entries: Optional[int] = None,
+        l1_max_bytes: Optional[int] = None,
+        l1_ttl: Optional[int] = None,
+        redis_lock: Optional[bool] = None,
+    ):
         self.ttl = int(os.getenv("QUIZ_CACHE_TTL", "300"))  # 5 min default
         kv_url = os.getenv("KV_URL")
         
@@ -57,38 +293,600 @@ class KVCache:
             print("⚠️  KV_URL not set - cache disabled (all calls will be cache misses)")
             self.redis = None
         else:
-            self.redis = Redis.from_url(kv_url, decode_responses=True)
+            # Raw bytes: values may carry a binary codec header
+            self.redis = Redis.from_url(kv_url, decode_responses=False)
+        
+        self.codec = ValueCodec()
+        self.telemetry = CacheTelemetry()
+        self.bus = InvalidationBus(self)
+        
+        if l1_max_entries is None:
+            l1_max_entries = int(os.getenv("CACHE_L1_MAX_ENTRIES", "0"))
+        if l1_max_bytes is None:
+            l1_max_bytes = int(os.getenv("CACHE_L1_MAX_BYTES", str(16 * 1024 * 1024)))
+        if l1_ttl is None:
+            l1_ttl = int(os.getenv("CACHE_L1_TTL", "30"))
+        
+        self.l1_ttl = l1_ttl
+        self.l1 = LocalLRU(l1_max_entries, l1_max_bytes) if l1_max_entries > 0 else None
+        
+        if redis_lock is None:
+            redis_lock = os.getenv("CACHE_REDIS_LOCK", "0").lower() in ("1", "true", "yes")
+        self.redis_lock = redis_lock
+        self.lock_lease_ms = int(os.getenv("CACHE_LOCK_LEASE_MS", "10000"))
+        self.lock_poll_ms = 50
+        
+        # namespace -> seconds an entry may be served stale past its TTL
+        self.stale_windows = _parse_namespace_map(os.getenv("CACHE_STALE_WINDOWS", ""))
+        
+        self.ttl_jitter = float(os.getenv("CACHE_TTL_JITTER", "0.1"))
+        self.xfetch_beta = float(os.getenv("CACHE_XFETCH_BETA", "0"))
+        
+        self.negative_ttl = int(os.getenv("CACHE_NEGATIVE_TTL", "30"))
+        self.negative_statuses = {
+            int(code) for code in os.getenv("CACHE_NEGATIVE_STATUSES", "404,422").split(",") if code.strip()
+        }
+        
+        # Generational namespaces; the local generation is re-read from
+        # Redis at most every gen_refresh_seconds
+        gen_namespaces = os.getenv("CACHE_GENERATION_NAMESPACES", DEFAULT_GENERATION_NAMESPACES)
+        self.generation_namespaces = {
+            _as_namespace(p.strip()) for p in gen_namespaces.split(",") if p.strip()
+        }
+        self.gen_refresh_seconds = float(os.getenv("CACHE_GEN_REFRESH_SECONDS", "1"))
+        # namespace -> (generation, fetched_at monotonic)
+        self._generations: Dict[str, Tuple[int, float]] = {}
+        
+        # key -> in-flight producer task (single-flight)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # key -> stale-while-revalidate refresh task; kept apart from
+        # _inflight because a refresh yields None on failure and misses
+        # must not join it
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        # Strong refs for fire-and-forget tasks (batch refreshes)
+        self._background: Set[asyncio.Task] = set()
+        self.counters = {
+            "producer_calls": 0,
+            "coalesced": 0,
+            "lock_acquired": 0,
+            "lock_waited": 0,
+            "stale_serves": 0,
+            "background_refreshes": 0,
+            "invalidations": 0,
+            "early_refreshes": 0,
+            "negative_stores": 0,
+            "negative_hits": 0,
+            "warm_hits": 0,
+        }
+    
+    def set_stale_window(self, path: str, seconds: int) -> None:
+        """Enable stale-while-revalidate for a namespace ("/v1/quiz")."""
+        self.stale_windows[_as_namespace(path)] = seconds
+    
+    def _stale_window(self, key: str) -> int:
+        return self.stale_windows.get(_namespace_of(key), 0)
+    
+    async def _generation(self, ns: str) -> int:
+        cached = self._generations.get(ns)
+        now = time.monotonic()
+        if cached is not None and (not self.redis or now - cached[1] < self.gen_refresh_seconds):
+            return cached[0]
+        
+        gen = cached[0] if cached else 0
+        if self.redis:
+            try:
+                raw = await self.redis.get(f"cb:gen:{ns}")
+                gen = int(raw) if raw is not None else 0
+            except Exception as e:
+                print(f"⚠️  Cache generation read error for {ns}: {e}")
+        self._generations[ns] = (gen, now)
+        return gen
+    
+    async def _resolve(self, key: str) -> str:
+        """Map a logical key to its physical key (generation folded in)."""
+        ns = _namespace_of(key)
+        if ns not in self.generation_namespaces:
+            return key
+        gen = await self._generation(ns)
+        if gen == 0:
+            # Keys written before the first invalidation stay readable
+            return key
+        return f"{ns}:g{gen}{key[len(ns):]}"
+    
+    async def invalidate_namespace(self, path: str) -> int:
+        """
+        Invalidate every key in a namespace with one INCR.
+        
+        Args:
+            path: Namespace path (e.g., "/v1/quiz")
+        
+        Returns:
+            The namespace's new generation
+        
+        Raises:
+            ValueError: namespace is not in CACHE_GENERATION_NAMESPACES.
+                Workers only version keys of configured namespaces, so a
+                bump here would go unnoticed everywhere else.
+        """
+        ns = _as_namespace(path)
+        if ns not in self.generation_namespaces:
+            raise ValueError(
+                f"{ns} is not a generation namespace; add it to CACHE_GENERATION_NAMESPACES"
+            )
+        gen = (self._generations.get(ns) or (0, 0))[0] + 1
+        
+        if self.redis:
+            try:
+                gen = await self.redis.incr(f"cb:gen:{ns}")
+            except Exception as e:
+                print(f"⚠️  Cache INVALIDATE error for {ns}: {e}")
+        
+        self._generations[ns] = (gen, time.monotonic())
+        if self.l1 is not None:
+            # Old generations are unreachable anyway; free the memory now
+            self.l1.delete_pattern(f"{ns}*")
+        self.counters["invalidations"] += 1
+        # Other workers may hold L1 copies / a cached generation
+        await self.bus.publish("ns", ns)
+        return gen
+    
+    def _l1_ttl_for(self, ttl: Optional[float]) -> float:
+        """L1 entries never outlive the Redis entry they shadow."""
+        return min(self.l1_ttl, ttl or self.ttl)
     
     async def get(self, key: str) -> Optional[Any]:
         """Get a value from cache, return None if missing or cache disabled."""
+        val, _ = await self._lookup(await self._resolve(key))
+        return None if isinstance(val, NegativeEntry) else val
+    
+    async def _lookup(self, key: str) -> Tuple[Optional[Any], bool]:
+        """Return (value, is_stale) for key; value is None on a miss."""
+        ns = _namespace_of(key)
+        if self.l1 is not None:
+            val = self._l1_get(key)
+            if val is not None:
+                # L1 only ever holds fresh values
+                return val, False
+        
         if not self.redis:
-            return None
+            self.telemetry.miss(ns)
+            return None, False
         
+        val, stale = None, False
         try:
-            val = await self.redis.get(key)
-            if val is not None:
-                return json.loads(val)
+            if self.l1 is None:
+                raw = await self.redis.get(key)
+                pttl = None
+            else:
+                # Fetch the remaining TTL in the same round trip so the L1
+                # copy never outlives the Redis entry
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.get(key)
+                pipe.pttl(key)
+                raw, pttl = await pipe.execute()
+            
+            val, stale = self._accept(key, raw, pttl)
         except Exception as e:
             print(f"⚠️  Cache GET error for {key}: {e}")
+            self.telemetry.error(ns, "get")
         
-        return None
+        self._record_lookup(ns, val, stale)
+        return val, stale
+    
+    def _l1_get(self, key: str) -> Optional[Any]:
+        """L1 value for key (hit recorded, warm marker unwrapped), or None."""
+        val = self.l1.get(key)
+        if val is None:
+            return None
+        ns = _namespace_of(key)
+        if isinstance(val, NegativeEntry):
+            self.telemetry.negative_hit(ns)
+            return val
+        if isinstance(val, WarmEntry):
+            self._record_warm_hit(ns)
+            val = val.value
+        self.telemetry.hit(ns, "l1")
+        return val
+    
+    def _record_warm_hit(self, ns: str) -> None:
+        # Written by the cache warmer, not by a request's producer
+        self.counters["warm_hits"] += 1
+        self.telemetry.warm_hit(ns)
+    
+    def _record_lookup(self, ns: str, val: Optional[Any], stale: bool) -> None:
+        if val is None:
+            self.telemetry.miss(ns)
+        elif isinstance(val, NegativeEntry):
+            self.telemetry.negative_hit(ns)
+        else:
+            self.telemetry.hit(ns, "stale" if stale else "redis")
+    
+    def _accept(self, key: str, raw: Optional[bytes], pttl: Optional[int]) -> Tuple[Optional[Any], bool]:
+        """Decode a raw Redis value and promote it to L1 if it is fresh."""
+        if raw is None:
+            return None, False
+        
+        data = self.codec.decode(raw)
+        soft_expiry = None
+        cost = 0.0
+        warmed = False
+        if isinstance(data, dict) and _NEG_FIELD in data:
+            data = NegativeEntry(data[_NEG_FIELD], data.get("detail"))
+        elif isinstance(data, dict) and _SWR_FIELD in data:
+            soft_expiry = data[_SWR_FIELD]
+            cost = data.get("d", 0.0)
+            warmed = bool(data.get("w"))
+            if warmed:
+                self._record_warm_hit(_namespace_of(key))
+            data = data["v"]
+        
+        now = time.time()
+        if soft_expiry is not None:
+            if now >= soft_expiry:
+                return data, True
+            if cost and self._expires_early(soft_expiry - now, cost):
+                # Treated like a stale hit: served now, refreshed in background
+                self.counters["early_refreshes"] += 1
+                return data, True
+        
+        if self.l1 is not None:
+            remaining = pttl / 1000 if pttl and pttl > 0 else None
+            if soft_expiry is not None:
+                remaining = soft_expiry - now
+            self.l1.set(key, WarmEntry(data) if warmed else data, self._l1_ttl_for(remaining), len(raw))
+        return data, False
     
-    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
-        """Set a value in cache with optional TTL override."""
+    async def _store_negative(self, key: str, exc: HTTPException) -> None:
+        """Remember a 404/422 for negative_ttl seconds (no SWR envelope)."""
+        entry = {_NEG_FIELD: exc.status_code, "detail": exc.detail}
+        try:
+            encoded = self.codec.encode(entry)
+        except Exception as e:
+            print(f"⚠️  Cache SET error for {key}: {e}")
+            return
+        
+        self.counters["negative_stores"] += 1
+        if self.l1 is not None:
+            self.l1.set(
+                key,
+                NegativeEntry(exc.status_code, exc.detail),
+                self._l1_ttl_for(self.negative_ttl),
+                len(encoded),
+            )
         if not self.redis:
+            return
+        try:
+            await self.redis.set(key, encoded, ex=self.negative_ttl)
+        except Exception as e:
+            print(f"⚠️  Cache SET error for {key}: {e}")
+            self.telemetry.error(_namespace_of(key), "set")
+    
+    def _expires_early(self, remaining: float, cost: float) -> bool:
+        """
+        XFetch: refresh early if cost * beta * -ln(U) reaches the time left.
+        
+        The chance rises as expiry nears and with producer cost, so
+        recomputations spread out instead of landing at the same instant.
+        """
+        if self.xfetch_beta <= 0:
             return False
+        # 1 - random() is in (0, 1], so the log is always defined
+        return cost * self.xfetch_beta * -math.log(1.0 - random.random()) >= remaining
+    
+    def _jittered(self, ttl: int) -> int:
+        """Shorten ttl by a random fraction (up to CACHE_TTL_JITTER)."""
+        if self.ttl_jitter <= 0 or ttl <= 1:
+            return ttl
+        return max(1, int(round(ttl * (1 - random.uniform(0, self.ttl_jitter)))))
+    
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        warmed: bool = False,
+    ) -> bool:
+        """
+        Set a value in cache with optional TTL override.
+        
+        warmed=True marks the entry as pre-warmed (see cache_warming), so
+        hits on it are counted as warm_hits.
+        """
+        return await self._store(await self._resolve(key), value, ttl, warmed=warmed)
+    
+    async def _store(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        cost: Optional[float] = None,
+        warmed: bool = False,
+    ) -> bool:
+        if not self.redis and self.l1 is None:
+            return False
+        
+        try:
+            encoded, ex = self._prepare(key, value, ttl, cost, warmed)
+        except Exception as e:
+            print(f"⚠️  Cache SET error for {key}: {e}")
+            self.telemetry.error(_namespace_of(key), "encode")
+            return False
+        
+        if not self.redis:
+            return True
         
         try:
             await self.redis.set(
                 key,
-                json.dumps(value),
-                ex=ttl or self.ttl
+                encoded,
+                ex=ex
             )
             return True
         except Exception as e:
             print(f"⚠️  Cache SET error for {key}: {e}")
+            self.telemetry.error(_namespace_of(key), "set")
+            return False
+    
+    def _prepare(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int],
+        cost: Optional[float] = None,
+        warmed: bool = False,
+    ) -> Tuple[bytes, int]:
+        """
+        Encode value for Redis (and mirror it into L1); returns (encoded, ex).
+        
+        cost is the producer time in seconds for XFetch; when the write
+        didn't come from a producer, the namespace's average is used.
+        """
+        ns = _namespace_of(key)
+        ttl = self._jittered(ttl or self.ttl)
+        stale_window = self._stale_window(key)
+        if self.xfetch_beta <= 0:
+            cost = 0.0
+        elif cost is None:
+            cost = self.telemetry.producer_avg(ns)
+        
+        stored = value
+        if stale_window > 0 or cost or warmed:
+            # Fresh until the soft expiry, kept for serving stale until ex
+            stored = {_SWR_FIELD: time.time() + ttl, "v": value}
+            if cost:
+                stored["d"] = round(cost, 4)
+            if warmed:
+                stored["w"] = 1
+        
+        encoded = self.codec.encode(stored)
+        self.telemetry.value_size(ns, len(encoded))
+        
+        if self.l1 is not None:
+            self.l1.set(key, WarmEntry(value) if warmed else value, self._l1_ttl_for(ttl), len(encoded))
+        
+        return encoded, ttl + stale_window
+    
+    async def get_bytes(self, key: str) -> Optional[bytes]:
+        """
+        Get an opaque byte string stored with set_bytes (no codec, no SWR).
+        
+        Used for pre-serialized response bodies; the key still lives in its
+        namespace, so generation invalidation covers it.
+        """
+        key = await self._resolve(key)
+        ns = _namespace_of(key)
+        if self.l1 is not None:
+            val = self.l1.get(key)
+            if val is not None:
+                self.telemetry.hit(ns, "l1")
+                return val
+        
+        if not self.redis:
+            self.telemetry.miss(ns)
+            return None
+        
+        raw = None
+        try:
+            if self.l1 is None:
+                raw = await self.redis.get(key)
+            else:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.get(key)
+                pipe.pttl(key)
+                raw, pttl = await pipe.execute()
+                if raw is not None:
+                    remaining = pttl / 1000 if pttl and pttl > 0 else None
+                    self.l1.set(key, raw, self._l1_ttl_for(remaining), len(raw))
+        except Exception as e:
+            print(f"⚠️  Cache GET error for {key}: {e}")
+            self.telemetry.error(ns, "get")
+        
+        self._record_lookup(ns, raw, False)
+        return raw
+    
+    async def set_bytes(self, key: str, data: bytes, ttl: Optional[int] = None) -> bool:
+        """Store an opaque byte string under key (see get_bytes)."""
+        key = await self._resolve(key)
+        ttl = self._jittered(ttl or self.ttl)
+        self.telemetry.value_size(_namespace_of(key), len(data))
+        if self.l1 is not None:
+            self.l1.set(key, data, self._l1_ttl_for(ttl), len(data))
+        
+        if not self.redis:
+            return self.l1 is not None
+        
+        try:
+            await self.redis.set(key, data, ex=ttl)
+            return True
+        except Exception as e:
+            print(f"⚠️  Cache SET error for {key}: {e}")
+            self.telemetry.error(_namespace_of(key), "set")
             return False
     
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        Get several keys in one round trip (MGET).
+        
+        Args:
+            keys: Logical cache keys
+        
+        Returns:
+            Dict of key -> value for the keys that were found
+        """
+        found = await self._lookup_many(keys)
+        return {
+            k: val for k, (val, _) in found.items() if not isinstance(val, NegativeEntry)
+        }
+    
+    async def _lookup_many(self, keys: List[str]) -> Dict[str, Tuple[Any, bool]]:
+        """Return {logical key: (value, is_stale)} for every key that hit."""
+        physical = {k: await self._resolve(k) for k in keys}
+        found: Dict[str, Tuple[Any, bool]] = {}
+        remote = []
+        
+        for k in keys:
+            val = self._l1_get(physical[k]) if self.l1 is not None else None
+            if val is not None:
+                found[k] = (val, False)
+            else:
+                remote.append(k)
+        
+        if not remote:
+            return found
+        if not self.redis:
+            for k in remote:
+                self.telemetry.miss(_namespace_of(physical[k]))
+            return found
+        
+        try:
+            pkeys = [physical[k] for k in remote]
+            if self.l1 is None:
+                raws = await self.redis.mget(pkeys)
+                pttls = [None] * len(pkeys)
+            else:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.mget(pkeys)
+                for pk in pkeys:
+                    pipe.pttl(pk)
+                raws, *pttls = await pipe.execute()
+            
+            for k, raw, pttl in zip(remote, raws, pttls):
+                val, stale = self._accept(physical[k], raw, pttl)
+                if val is not None:
+                    found[k] = (val, stale)
+        except Exception as e:
+            print(f"⚠️  Cache MGET error for {len(remote)} keys: {e}")
+            for ns in {_namespace_of(physical[k]) for k in remote}:
+                self.telemetry.error(ns, "get")
+        
+        for k in remote:
+            val, stale = found.get(k, (None, False))
+            self._record_lookup(_namespace_of(physical[k]), val, stale)
+        return found
+    
+    async def set_many(self, mapping: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """
+        Set several keys in one pipelined round trip, each with a TTL.
+        
+        Args:
+            mapping: Dict of logical key -> value
+            ttl: Optional TTL override (seconds)
+        """
+        if not mapping or (not self.redis and self.l1 is None):
+            return False
+        
+        try:
+            pipe = self.redis.pipeline(transaction=False) if self.redis else None
+            for k, value in mapping.items():
+                pk = await self._resolve(k)
+                encoded, ex = self._prepare(pk, value, ttl)
+                if pipe is not None:
+                    pipe.set(pk, encoded, ex=ex)
+            
+            if pipe is not None:
+                await pipe.execute()
+            return True
+        except Exception as e:
+            print(f"⚠️  Cache SET_MANY error for {len(mapping)} keys: {e}")
+            for ns in {_namespace_of(k) for k in mapping}:
+                self.telemetry.error(ns, "set")
+            return False
+    
+    async def get_or_set_many(
+        self,
+        keys: List[str],
+        producer: Callable,
+        ttl: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Bulk get_or_set: one MGET, one producer call for the misses, one
+        pipelined write-back.
+        
+        Args:
+            keys: Logical cache keys
+            producer: Async or sync callable taking the list of missing keys
+                and returning a dict of key -> value (keys it omits or maps
+                to None are not cached)
+            ttl: Optional TTL override (seconds)
+        
+        Returns:
+            Dict of key -> value, in the order of `keys`
+        
+        Example:
+            def fetch_clauses(missing):
+                rows = sb.table("clauses").select("*").in_("clause_num", ...)
+                return {f"cb:/v1/clause:{r['clause_num']}": r for r in rows}
+            
+            data = await cache.get_or_set_many(keys, fetch_clauses)
+        """
+        found = await self._lookup_many(keys)
+        # Keys with a cached negative entry are left out without re-producing
+        result = {
+            k: val for k, (val, _) in found.items() if not isinstance(val, NegativeEntry)
+        }
+        
+        stale = [k for k, (_, is_stale) in found.items() if is_stale]
+        if stale:
+            self.counters["stale_serves"] += len(stale)
+            task = asyncio.ensure_future(self._refresh_many(stale, producer, ttl))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+        
+        missing = [k for k in keys if k not in found]
+        if missing:
+            self.counters["producer_calls"] += 1
+            produced = await self._call_many(producer, missing)
+            wanted = set(missing)
+            fresh = {k: v for k, v in produced.items() if k in wanted and v is not None}
+            await self.set_many(fresh, ttl)
+            result.update(fresh)
+        
+        return {k: result[k] for k in keys if k in result}
+    
+    async def _call_many(self, producer: Callable, keys: List[str]) -> Dict[str, Any]:
+        ns = _namespace_of(keys[0])
+        start = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(producer):
+                return await producer(keys) or {}
+            return producer(keys) or {}
+        except Exception:
+            self.telemetry.error(ns, "producer")
+            raise
+        finally:
+            self.telemetry.producer_latency(ns, time.perf_counter() - start)
+    
+    async def _refresh_many(self, keys: List[str], producer: Callable, ttl: Optional[int]) -> None:
+        try:
+            produced = await self._call_many(producer, keys)
+            wanted = set(keys)
+            await self.set_many(
+                {k: v for k, v in produced.items() if k in wanted and v is not None}, ttl
+            )
+            self.counters["background_refreshes"] += 1
+        except Exception as e:
+            print(f"⚠️  Cache background refresh failed for {len(keys)} keys: {e}")
+    
     async def get_or_set(
         self,
         key: str,
@@ -113,31 +911,166 @@ class KVCache:
             data = await cache.get_or_set("quiz:d1.1", fetch_quiz)
         """
         # Try cache first
-        val = await self.get(key)
+        key = await self._resolve(key)
+        val, stale = await self._lookup(key)
+        if isinstance(val, NegativeEntry):
+            self.counters["negative_hits"] += 1
+            raise val.to_exception()
         if val is not None:
+            if stale:
+                # Serve the stale copy now, refresh off the request path
+                self.counters["stale_serves"] += 1
+                self._schedule_refresh(key, producer, ttl)
             return val
         
-        # Cache miss - produce value
-        if asyncio.iscoroutinefunction(producer):
-            data = await producer()
+        # Cache miss - share one producer call per key
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._produce(key, producer, ttl))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._inflight_done(k, t))
         else:
-            data = producer()
+            self.counters["coalesced"] += 1
         
-        # Store in cache
-        await self.set(key, data, ttl)
+        # Shield so one cancelled caller doesn't cancel the shared producer
+        val = await asyncio.shield(task)
+        if isinstance(val, NegativeEntry):
+            # Another worker cached a negative result while we waited
+            raise val.to_exception()
+        return val
+    
+    def _inflight_done(self, key: str, task: asyncio.Task, tasks: Optional[Dict[str, asyncio.Task]] = None) -> None:
+        tasks = self._inflight if tasks is None else tasks
+        if tasks.get(key) is task:
+            del tasks[key]
+        # Mark the exception retrieved even if every awaiter was cancelled
+        if not task.cancelled():
+            task.exception()
+    
+    def _schedule_refresh(self, key: str, producer: Callable, ttl: Optional[int]) -> None:
+        """Start a background refresh of key unless one is already running."""
+        if key in self._refreshing or key in self._inflight:
+            return
+        task = asyncio.ensure_future(self._refresh(key, producer, ttl))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda t, k=key: self._inflight_done(k, t, self._refreshing))
+    
+    async def _refresh(self, key: str, producer: Callable, ttl: Optional[int]) -> Any:
+        try:
+            data = await self._produce(key, producer, ttl, wait_for_lock=False)
+            if data is not None:
+                self.counters["background_refreshes"] += 1
+            return data
+        except Exception as e:
+            # Keep serving the stale copy until its hard expiry
+            print(f"⚠️  Cache background refresh failed for {key}: {e}")
+            return None
+    
+    async def _produce(
+        self,
+        key: str,
+        producer: Callable,
+        ttl: Optional[int],
+        wait_for_lock: bool = True,
+    ) -> Any:
+        """Run the producer (under a Redis lease if enabled) and store the result."""
+        token = None
+        if self.redis and self.redis_lock:
+            token = await self._acquire_lock(key)
+            if token is None:
+                if not wait_for_lock:
+                    # Another worker is already refreshing this key
+                    return None
+                # Another worker holds the lease - wait for its result
+                self.counters["lock_waited"] += 1
+                val = await self._wait_for_value(key)
+                if val is not None:
+                    return val
         
-        return data
+        ns = _namespace_of(key)
+        try:
+            self.counters["producer_calls"] += 1
+            start = time.perf_counter()
+            try:
+                if asyncio.iscoroutinefunction(producer):
+                    data = await producer()
+                else:
+                    data = producer()
+            except HTTPException as e:
+                if self.negative_ttl > 0 and e.status_code in self.negative_statuses:
+                    await self._store_negative(key, e)
+                else:
+                    self.telemetry.error(ns, "producer")
+                raise
+            except Exception:
+                self.telemetry.error(ns, "producer")
+                raise
+            finally:
+                cost = time.perf_counter() - start
+                self.telemetry.producer_latency(ns, cost)
+            
+            # Store in cache
+            await self._store(key, data, ttl, cost)
+            
+            return data
+        finally:
+            if token is not None:
+                await self._release_lock(key, token)
+    
+    async def _acquire_lock(self, key: str) -> Optional[str]:
+        """Take the recompute lease for key; returns the owner token or None."""
+        token = secrets.token_hex(8)
+        try:
+            if await self.redis.set(f"cb:lock:{key}", token, nx=True, px=self.lock_lease_ms):
+                self.counters["lock_acquired"] += 1
+                return token
+        except Exception as e:
+            print(f"⚠️  Cache LOCK error for {key}: {e}")
+            # Fail open: compute locally rather than stall the request
+            return ""
+        return None
+    
+    async def _release_lock(self, key: str, token: str) -> None:
+        if not token:
+            return
+        try:
+            await self.redis.eval(_RELEASE_LOCK_LUA, 1, f"cb:lock:{key}", token)
+        except Exception as e:
+            print(f"⚠️  Cache UNLOCK error for {key}: {e}")
+    
+    async def _wait_for_value(self, key: str) -> Optional[Any]:
+        """Poll until the lease holder writes key or the lease runs out."""
+        deadline = time.monotonic() + self.lock_lease_ms / 1000
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.lock_poll_ms / 1000)
+            try:
+                if await self.redis.exists(key):
+                    val, _ = await self._lookup(key)
+                    return val
+                if not await self.redis.exists(f"cb:lock:{key}"):
+                    # Holder finished without storing (e.g. producer raised)
+                    return None
+            except Exception as e:
+                print(f"⚠️  Cache LOCK wait error for {key}: {e}")
+                return None
+        return None
     
     async def delete(self, key: str) -> bool:
         """Delete a key from cache."""
+        key = await self._resolve(key)
+        if self.l1 is not None:
+            self.l1.delete(key)
+        
         if not self.redis:
             return False
         
         try:
             await self.redis.delete(key)
+            await self.bus.publish("key", key)
             return True
         except Exception as e:
             print(f"⚠️  Cache DELETE error for {key}: {e}")
+            self.telemetry.error(_namespace_of(key), "delete")
             return False
     
     async def delete_pattern(self, pattern: str) -> int:
@@ -147,12 +1080,20 @@ class KVCache:
         Args:
             pattern: Redis pattern (e.g., "cb:/v1/quiz*")
         
+        Walks the whole keyspace - prefer invalidate_namespace() for
+        namespace-wide clears; this stays for ad-hoc admin use.
+        
         Returns:
             Number of keys deleted
         """
+        if self.l1 is not None:
+            self.l1.delete_pattern(pattern)
+        
         if not self.redis:
             return 0
         
+        await self.bus.publish("pattern", pattern)
+        
         try:
             count = 0
             async for key in self.redis.scan_iter(match=pattern):
@@ -161,15 +1102,31 @@ class KVCache:
             return count
         except Exception as e:
             print(f"⚠️  Cache DELETE_PATTERN error for {pattern}: {e}")
+            self.telemetry.error(_namespace_of(pattern.rstrip("*")), "delete")
             return 0
     
+    async def close(self) -> None:
+        """Close the Redis connection pool (for short-lived jobs)."""
+        await self.bus.stop()
+        if self.redis:
+            await self.redis.close()
+    
     async def health_check(self) -> dict:
         """Check cache connectivity and return stats."""
+        l1_stats = self.l1.stats() if self.l1 is not None else {"enabled": False}
+        
         if not self.redis:
             return {
                 "ok": False,
                 "message": "Cache not configured",
-                "enabled": False
+                "enabled": False,
+                "l1": l1_stats,
+                "counters": dict(self.counters),
+                "stale_windows": dict(self.stale_windows),
+                "generations": {ns: g for ns, (g, _) in self._generations.items()},
+                "codec": self.codec.stats(),
+                "namespaces": self.telemetry.snapshot(),
+                "bus": self.bus.health(),
             }
         
         try:
@@ -181,12 +1138,22 @@ class KVCache:
                 "ttl_seconds": self.ttl,
                 "keyspace_hits": info.get("keyspace_hits", 0),
                 "keyspace_misses": info.get("keyspace_misses", 0),
+                "l1": l1_stats,
+                "counters": dict(self.counters),
+                "stale_windows": dict(self.stale_windows),
+                "generations": {ns: g for ns, (g, _) in self._generations.items()},
+                "codec": self.codec.stats(),
+                "namespaces": self.telemetry.snapshot(),
+                "bus": self.bus.health(),
             }
         except Exception as e:
             return {
                 "ok": False,
                 "enabled": True,
-                "error": str(e)
+                "error": str(e),
+                "l1": l1_stats,
+                "namespaces": self.telemetry.snapshot(),
+                "bus": self.bus.health(),
             }
 
 
@@ -0,0 +1,202 @@
+"""
+ClauseBot Cache Invalidation Bus - cross-worker L1 invalidation over pub/sub
+
+With several uvicorn workers, each holds its own L1 (and other in-process
+caches). A clear in one process - or in the nightly airtable_sync job -
+only reached Redis and that process. Every KVCache invalidation now also
+publishes an event on a Redis channel; each worker's listener drops the
+matching local entries as soon as it arrives.
+
+Events (JSON):
+    {"op": "ns", "target": "cb:/v1/quiz"}        # namespace invalidated
+    {"op": "key", "target": "cb:/v1/quiz:g3:ab"}  # one physical key
+    {"op": "pattern", "target": "cb:/v1/quiz*"}   # delete_pattern
+    {"op": "all", "target": ""}                   # drop everything local
+    {"op": "notify", "target": "vector-index:{...}"}  # listeners only
+
+Pub/sub is fire-and-forget: events published while a worker is
+disconnected are lost. After every reconnect the listener therefore
+resyncs - it clears the whole L1 and forgets cached generations, so the
+next read goes back to Redis. Reconnects back off exponentially (0.5s up
+to 30s) whether the subscription failed or the server just closed it; the
+backoff only starts over after a connection stayed up for the maximum
+delay, so a flapping server can't make the listener spin.
+
+Configuration:
+    CACHE_INVALIDATION_CHANNEL=cb:invalidate   # empty disables the bus
+
+Usage (app startup):
+    await cache.bus.start()
+
+Extra in-process caches can follow along:
+    cache.bus.add_listener(lambda event: my_dict.clear())
+"""
+import os
+import json
+import time
+import asyncio
+import secrets
+from typing import Callable, Dict, List, Optional
+
+CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "cb:invalidate")
+
+
+class InvalidationBus:
+    """Publishes and applies KVCache invalidation events for one process."""
+
+    def __init__(self, kv, channel: Optional[str] = None):
+        self.kv = kv
+        self.channel = CHANNEL if channel is None else channel
+        # Lets a worker skip the echo of its own events
+        self.origin = secrets.token_hex(6)
+        self._listeners: List[Callable[[Dict[str, str]], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self.reconnect_delay = 0.5
+        self.max_reconnect_delay = 30.0
+        self.stats = {
+            "published": 0,
+            "received": 0,
+            "applied": 0,
+            "resyncs": 0,
+            "errors": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.channel) and self.kv.redis is not None
+
+    @property
+    def listening(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def add_listener(self, fn: Callable[[Dict[str, str]], None]) -> None:
+        """Call fn(event) for every event applied in this process (incl. resyncs)."""
+        self._listeners.append(fn)
+
+    async def publish(self, op: str, target: str = "") -> None:
+        """Tell every worker to drop local entries; never raises."""
+        if not self.enabled:
+            return
+        event = json.dumps({"op": op, "target": target, "origin": self.origin})
+        try:
+            await self.kv.redis.publish(self.channel, event)
+            self.stats["published"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"⚠️  Cache invalidation publish error ({op} {target}): {e}")
+
+    async def start(self) -> None:
+        """Start the background listener (no-op without Redis or channel)."""
+        if not self.enabled or self.listening:
+            return
+        self._task = asyncio.ensure_future(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def handle(self, data) -> None:
+        """Apply one raw pub/sub payload from another worker."""
+        try:
+            event = json.loads(data)
+        except (TypeError, ValueError):
+            self.stats["errors"] += 1
+            return
+        self.stats["received"] += 1
+        if event.get("origin") == self.origin:
+            return
+        self.apply(event)
+
+    def apply(self, event: Dict[str, str]) -> None:
+        """Drop the local state an event refers to."""
+        op, target = event.get("op"), event.get("target", "")
+        kv = self.kv
+        l1 = kv.l1
+
+        if op == "ns":
+            kv._generations.pop(target, None)
+            if l1 is not None:
+                l1.delete_pattern(f"{target}*")
+        elif op == "key":
+            if l1 is not None:
+                l1.delete(target)
+        elif op == "pattern":
+            if l1 is not None:
+                l1.delete_pattern(target)
+        elif op == "all":
+            kv._generations.clear()
+            if l1 is not None:
+                l1.clear()
+        elif op == "notify":
+            # Nothing cached here; only for add_listener() callbacks
+            pass
+        else:
+            return
+
+        self.stats["applied"] += 1
+        for fn in self._listeners:
+            try:
+                fn(event)
+            except Exception as e:
+                print(f"⚠️  Cache invalidation listener error: {e}")
+
+    def resync(self) -> None:
+        """Local state may have missed events - start over from Redis."""
+        self.stats["resyncs"] += 1
+        self.apply({"op": "all", "target": ""})
+
+    async def _listen(self) -> None:
+        delay = self.reconnect_delay
+        # Set once a subscription drops (or never came up); events may
+        # have been missed, so resync on the next successful subscribe
+        missed = False
+        while True:
+            pubsub = None
+            connected_at = None
+            try:
+                pubsub = self.kv.redis.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(self.channel)
+                connected_at = time.monotonic()
+                if missed:
+                    self.resync()
+                    print(f"✅ Cache invalidation bus reconnected ({self.channel})")
+                    missed = False
+
+                async for message in pubsub.listen():
+                    if message and message.get("type") == "message":
+                        self.handle(message["data"])
+                missed = True
+                reason = "connection closed"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                missed = True
+                self.stats["errors"] += 1
+                reason = str(e)
+            finally:
+                if pubsub is not None:
+                    try:
+                        # aclose() on redis>=5.0.1, close() before that
+                        await getattr(pubsub, "aclose", pubsub.close)()
+                    except Exception:
+                        pass
+
+            # Only a connection that stayed up a while starts the backoff over
+            if connected_at is not None and time.monotonic() - connected_at >= self.max_reconnect_delay:
+                delay = self.reconnect_delay
+            print(f"⚠️  Cache invalidation bus disconnected: {reason} (retry in {delay:.1f}s)")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def health(self) -> dict:
+        return {
+            "channel": self.channel,
+            "enabled": self.enabled,
+            "listening": self.listening,
+            **self.stats,
+        }
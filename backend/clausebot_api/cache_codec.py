@@ -0,0 +1,207 @@
+"""
+ClauseBot Cache Codecs - compact value encoding for KVCache
+
+Every encoded value starts with a one-byte header naming the serializer
+and compression, so formats can be mixed in Redis during a rollout:
+
+    0x01 json            0x05 msgpack
+    0x02 json + zlib     0x06 msgpack + zlib
+    0x03 json + zstd     0x07 msgpack + zstd
+    0x04 json + lz4      0x08 msgpack + lz4
+
+Values with no header (first byte is printable) are legacy plain JSON.
+Plain uncompressed JSON is still written header-less, so older workers
+can keep reading what newer ones write.
+
+Configuration:
+    CACHE_CODEC=json|msgpack          # default json (orjson if installed)
+    CACHE_COMPRESSION=none|zlib|zstd|lz4
+    CACHE_COMPRESS_MIN_BYTES=1024     # only compress values above this size
+
+msgpack, orjson, zstandard and lz4 are optional; if one is missing the
+codec falls back to stdlib json / zlib and says so at startup.
+"""
+import os
+import json
+import time
+import zlib
+from typing import Any, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+
+SERIALIZERS = ("json", "msgpack")
+COMPRESSIONS = ("none", "zlib", "zstd", "lz4")
+
+
+def _header(serializer: str, compression: str) -> int:
+    return 1 + SERIALIZERS.index(serializer) * len(COMPRESSIONS) + COMPRESSIONS.index(compression)
+
+
+def _parse_header(byte: int) -> Optional[tuple]:
+    """Header byte -> (serializer, compression), or None for legacy JSON."""
+    idx = byte - 1
+    if 0 <= idx < len(SERIALIZERS) * len(COMPRESSIONS):
+        return SERIALIZERS[idx // len(COMPRESSIONS)], COMPRESSIONS[idx % len(COMPRESSIONS)]
+    return None
+
+
+class ValueCodec:
+    """
+    Serialize + optionally compress cache values, with a header byte.
+
+    Tracks bytes before/after compression and time spent encoding and
+    decoding, reported via stats().
+    """
+
+    def __init__(
+        self,
+        serializer: Optional[str] = None,
+        compression: Optional[str] = None,
+        compress_min_bytes: Optional[int] = None,
+    ):
+        serializer = serializer or os.getenv("CACHE_CODEC", "json")
+        compression = compression or os.getenv("CACHE_COMPRESSION", "none")
+        if compress_min_bytes is None:
+            compress_min_bytes = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "1024"))
+
+        if serializer not in SERIALIZERS:
+            raise ValueError(f"Unknown cache codec: {serializer}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown cache compression: {compression}")
+
+        if serializer == "msgpack" and msgpack is None:
+            print("⚠️  CACHE_CODEC=msgpack but msgpack not installed - using json")
+            serializer = "json"
+        if compression == "zstd" and zstandard is None:
+            print("⚠️  CACHE_COMPRESSION=zstd but zstandard not installed - using zlib")
+            compression = "zlib"
+        if compression == "lz4" and lz4_frame is None:
+            print("⚠️  CACHE_COMPRESSION=lz4 but lz4 not installed - using zlib")
+            compression = "zlib"
+
+        self.serializer = serializer
+        self.compression = compression
+        self.compress_min_bytes = compress_min_bytes
+
+        self._zstd_c = zstandard.ZstdCompressor(level=3) if zstandard else None
+        self._zstd_d = zstandard.ZstdDecompressor() if zstandard else None
+
+        self.encoded = 0
+        self.decoded = 0
+        self.compressed = 0
+        self.bytes_serialized = 0
+        self.bytes_stored = 0
+        self.encode_seconds = 0.0
+        self.decode_seconds = 0.0
+
+    def encode(self, value: Any) -> bytes:
+        start = time.perf_counter()
+
+        serialized = self._serialize(value, self.serializer)
+        body = serialized
+        compression = "none"
+        if self.compression != "none" and len(body) >= self.compress_min_bytes:
+            packed = self._compress(body, self.compression)
+            if len(packed) < len(body):
+                body, compression = packed, self.compression
+                self.compressed += 1
+
+        if self.serializer == "json" and compression == "none":
+            # Header-less legacy layout stays readable by older workers
+            out = body
+        else:
+            out = bytes((_header(self.serializer, compression),)) + body
+
+        self.encoded += 1
+        self.bytes_serialized += len(serialized)
+        self.bytes_stored += len(out)
+        self.encode_seconds += time.perf_counter() - start
+        return out
+
+    def decode(self, raw: Union[bytes, str]) -> Any:
+        start = time.perf_counter()
+
+        if isinstance(raw, str):
+            value = json.loads(raw)
+        else:
+            fmt = _parse_header(raw[0]) if raw else None
+            if fmt is None:
+                value = self._deserialize(raw, "json")
+            else:
+                serializer, compression = fmt
+                body = self._decompress(raw[1:], compression)
+                value = self._deserialize(body, serializer)
+
+        self.decoded += 1
+        self.decode_seconds += time.perf_counter() - start
+        return value
+
+    def stats(self) -> dict:
+        return {
+            "serializer": self.serializer,
+            "compression": self.compression,
+            "compress_min_bytes": self.compress_min_bytes,
+            "encoded": self.encoded,
+            "decoded": self.decoded,
+            "compressed": self.compressed,
+            "bytes_serialized": self.bytes_serialized,
+            "bytes_stored": self.bytes_stored,
+            "bytes_saved": self.bytes_serialized - self.bytes_stored,
+            "encode_ms_avg": round(self.encode_seconds * 1000 / self.encoded, 3) if self.encoded else 0.0,
+            "decode_ms_avg": round(self.decode_seconds * 1000 / self.decoded, 3) if self.decoded else 0.0,
+        }
+
+    def _serialize(self, value: Any, serializer: str) -> bytes:
+        if serializer == "msgpack":
+            return msgpack.packb(value, use_bin_type=True)
+        if orjson is not None:
+            return orjson.dumps(value)
+        return json.dumps(value, separators=(",", ":")).encode()
+
+    def _deserialize(self, body: bytes, serializer: str) -> Any:
+        if serializer == "msgpack":
+            if msgpack is None:
+                raise RuntimeError("msgpack value in cache but msgpack not installed")
+            return msgpack.unpackb(body, raw=False)
+        if orjson is not None:
+            return orjson.loads(body)
+        return json.loads(body)
+
+    def _compress(self, body: bytes, compression: str) -> bytes:
+        if compression == "zstd":
+            return self._zstd_c.compress(body)
+        if compression == "lz4":
+            return lz4_frame.compress(body)
+        return zlib.compress(body, 6)
+
+    def _decompress(self, body: bytes, compression: str) -> bytes:
+        if compression == "none":
+            return body
+        if compression == "zstd":
+            if self._zstd_d is None:
+                raise RuntimeError("zstd value in cache but zstandard not installed")
+            return self._zstd_d.decompress(body)
+        if compression == "lz4":
+            if lz4_frame is None:
+                raise RuntimeError("lz4 value in cache but lz4 not installed")
+            return lz4_frame.decompress(body)
+        return zlib.decompress(body)
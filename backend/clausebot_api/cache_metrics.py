@@ -0,0 +1,233 @@
+"""
+ClauseBot Cache Telemetry - per-namespace counters and histograms
+
+Redis's keyspace_hits / keyspace_misses are instance-wide (every tenant of
+the Valkey instance) and say nothing about which endpoint is cold. KVCache
+records, per key namespace ("cb:/v1/quiz", "cb:/v1/clause", ...):
+
+- hits by tier (l1, redis, stale) and misses
+- negative hits (cached 404/422), kept out of the hit rate
+- warm hits: L1 / Redis hits on entries written by the cache warmer
+- producer latency histogram (seconds)
+- stored value size histogram (encoded bytes)
+- errors by operation (get, set, delete, producer, ...)
+
+Exposed as JSON on /health/cache ("namespaces") and in Prometheus text
+format on /metrics/cache.
+"""
+import threading
+from typing import Dict, Tuple
+
+# Prometheus-style upper bounds (cumulative on export)
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+SIZE_BUCKETS: Tuple[float, ...] = (
+    256, 1024, 4096, 16384, 65536, 262144, 1048576,
+)
+
+# Keys outside the "cb:" scheme can produce arbitrary namespaces; cap the
+# label cardinality and fold the rest into one bucket
+MAX_NAMESPACES = 64
+OVERFLOW_NAMESPACE = "other"
+
+
+class Histogram:
+    """Fixed-bucket histogram (non-cumulative counts, +Inf last)."""
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return self.bounds[i] if i < len(self.bounds) else float("inf")
+        return float("inf")
+
+    def snapshot(self, scale: float = 1.0, digits: int = 2) -> dict:
+        p95 = self.quantile(0.95)
+        return {
+            "count": self.count,
+            "avg": round(self.sum / self.count * scale, digits) if self.count else 0.0,
+            "p50_le": round(self.quantile(0.5) * scale, digits),
+            "p95_le": round(p95 * scale, digits) if p95 != float("inf") else "+Inf",
+        }
+
+
+class NamespaceStats:
+    def __init__(self):
+        self.hits = {"l1": 0, "redis": 0, "stale": 0}
+        self.misses = 0
+        self.negative_hits = 0
+        self.warm_hits = 0
+        self.errors: Dict[str, int] = {}
+        self.producer_seconds = Histogram(LATENCY_BUCKETS)
+        self.value_bytes = Histogram(SIZE_BUCKETS)
+
+    def snapshot(self) -> dict:
+        hits = sum(self.hits.values())
+        total = hits + self.misses
+        return {
+            "hits": dict(self.hits),
+            "misses": self.misses,
+            "negative_hits": self.negative_hits,
+            "warm_hits": self.warm_hits,
+            "warm_hit_share": round(self.warm_hits / hits * 100, 2) if hits else 0.0,
+            "hit_rate": round(hits / total * 100, 2) if total else 0.0,
+            "errors": dict(self.errors),
+            "producer_ms": self.producer_seconds.snapshot(scale=1000),
+            "value_bytes": self.value_bytes.snapshot(digits=0),
+        }
+
+
+class CacheTelemetry:
+    """
+    Per-namespace cache telemetry.
+
+    Updated from the event loop and from sync producers running in
+    threads, so mutations take a lock (they are a handful of integer
+    adds; contention is negligible next to a Redis round trip).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._namespaces: Dict[str, NamespaceStats] = {}
+
+    def _ns(self, namespace: str) -> NamespaceStats:
+        stats = self._namespaces.get(namespace)
+        if stats is None:
+            if len(self._namespaces) >= MAX_NAMESPACES:
+                namespace = OVERFLOW_NAMESPACE
+                stats = self._namespaces.get(namespace)
+            if stats is None:
+                stats = self._namespaces[namespace] = NamespaceStats()
+        return stats
+
+    def hit(self, namespace: str, tier: str) -> None:
+        with self._lock:
+            self._ns(namespace).hits[tier] += 1
+
+    def miss(self, namespace: str, count: int = 1) -> None:
+        with self._lock:
+            self._ns(namespace).misses += count
+
+    def negative_hit(self, namespace: str) -> None:
+        with self._lock:
+            self._ns(namespace).negative_hits += 1
+
+    def warm_hit(self, namespace: str) -> None:
+        with self._lock:
+            self._ns(namespace).warm_hits += 1
+
+    def error(self, namespace: str, op: str) -> None:
+        with self._lock:
+            errors = self._ns(namespace).errors
+            errors[op] = errors.get(op, 0) + 1
+
+    def producer_latency(self, namespace: str, seconds: float) -> None:
+        with self._lock:
+            self._ns(namespace).producer_seconds.observe(seconds)
+
+    def value_size(self, namespace: str, size: int) -> None:
+        with self._lock:
+            self._ns(namespace).value_bytes.observe(size)
+
+    def producer_avg(self, namespace: str) -> float:
+        """Mean producer latency (seconds) seen for a namespace, 0 if none."""
+        stats = self._namespaces.get(namespace)
+        hist = stats.producer_seconds if stats else None
+        return hist.sum / hist.count if hist and hist.count else 0.0
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {ns: stats.snapshot() for ns, stats in sorted(self._namespaces.items())}
+
+    def render_prometheus(self, prefix: str = "clausebot_cache") -> str:
+        """Prometheus text exposition (format 0.0.4)."""
+        lines = [
+            f"# HELP {prefix}_hits_total Cache hits by namespace and tier",
+            f"# TYPE {prefix}_hits_total counter",
+        ]
+        with self._lock:
+            items = sorted(self._namespaces.items())
+
+            for ns, stats in items:
+                for tier, n in stats.hits.items():
+                    lines.append(f'{prefix}_hits_total{{namespace="{_esc(ns)}",tier="{tier}"}} {n}')
+
+            lines += [
+                f"# HELP {prefix}_misses_total Cache misses by namespace",
+                f"# TYPE {prefix}_misses_total counter",
+            ]
+            for ns, stats in items:
+                lines.append(f'{prefix}_misses_total{{namespace="{_esc(ns)}"}} {stats.misses}')
+
+            lines += [
+                f"# HELP {prefix}_negative_hits_total Cached 404/422 results served by namespace",
+                f"# TYPE {prefix}_negative_hits_total counter",
+            ]
+            for ns, stats in items:
+                lines.append(f'{prefix}_negative_hits_total{{namespace="{_esc(ns)}"}} {stats.negative_hits}')
+
+            lines += [
+                f"# HELP {prefix}_warm_hits_total Hits on entries written by the cache warmer",
+                f"# TYPE {prefix}_warm_hits_total counter",
+            ]
+            for ns, stats in items:
+                lines.append(f'{prefix}_warm_hits_total{{namespace="{_esc(ns)}"}} {stats.warm_hits}')
+
+            lines += [
+                f"# HELP {prefix}_errors_total Cache errors by namespace and operation",
+                f"# TYPE {prefix}_errors_total counter",
+            ]
+            for ns, stats in items:
+                for op, n in sorted(stats.errors.items()):
+                    lines.append(f'{prefix}_errors_total{{namespace="{_esc(ns)}",op="{op}"}} {n}')
+
+            lines += _histogram_lines(
+                f"{prefix}_producer_seconds", "Producer (cache fill) latency",
+                [(ns, s.producer_seconds) for ns, s in items],
+            )
+            lines += _histogram_lines(
+                f"{prefix}_value_bytes", "Encoded size of stored values",
+                [(ns, s.value_bytes) for ns, s in items],
+            )
+
+        return "\n".join(lines) + "\n"
+
+
+def _esc(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histogram_lines(name: str, help_text: str, series) -> list:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for ns, hist in series:
+        label = f'namespace="{_esc(ns)}"'
+        cumulative = 0
+        for bound, n in zip(hist.bounds, hist.counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{{{label},le="{bound:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{label},le="+Inf"}} {hist.count}')
+        lines.append(f"{name}_sum{{{label}}} {hist.sum:g}")
+        lines.append(f"{name}_count{{{label}}} {hist.count}")
+    return lines
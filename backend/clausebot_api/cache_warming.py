@@ -0,0 +1,307 @@
+"""
+ClauseBot Cache Warming - keep the hottest keys warm before they expire
+
+Endpoints record each access (path + the params that built the cache
+key) in a bounded heavy-hitter sketch. Every CACHE_WARM_INTERVAL seconds
+each worker folds its sketch into a shared Redis sorted set; one worker
+(the holder of a short Redis lease) then re-computes the top-N keys whose
+fresh TTL is about to run out, so requests keep hitting instead of
+missing at expiry.
+
+After a deploy or an Airtable sync the whole hot set is re-warmed by an
+RQ job (TaskQueue.enqueue_hot_key_warm -> jobs.tasks.warm_hot_keys). The
+hot set lives in Redis, so it survives deploys.
+
+Warmed entries carry a marker; hits on them are counted as warm_hits
+(KVCache counters and per-namespace telemetry), giving the share of the
+hit rate that warming is responsible for.
+
+Configuration:
+    CACHE_WARM_INTERVAL=60        # seconds between cycles, 0 disables
+    CACHE_WARM_TOP_N=50           # keys considered per cycle
+    CACHE_WARM_LEAD_SECONDS=60    # re-warm when less fresh TTL than this
+    CACHE_WARM_SKETCH_SIZE=512    # heavy-hitter counters per worker / in Redis
+
+Registering a warmable endpoint:
+    register_warmer("/v1/quiz", build_quiz)      # build_quiz(category, count)
+    cache_warmer.record("/v1/quiz", {"category": cat, "count": count})
+"""
+import os
+import json
+import time
+import heapq
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from clausebot_api.cache import KVCache, cache, cache_key
+
+HOT_ZSET = "cb:warm:hot"
+HOT_PARAMS = "cb:warm:params"
+CYCLE_LOCK = "cb:warm:lock"
+
+# path -> (producer(**params), ttl)
+_PRODUCERS: Dict[str, Tuple[Callable, Optional[int]]] = {}
+
+
+def register_warmer(path: str, producer: Callable, ttl: Optional[int] = None) -> None:
+    """
+    Make a cache namespace warmable.
+
+    Args:
+        path: Namespace path, as passed to cache_key ("/v1/quiz")
+        producer: Async or sync callable taking the cache_key params as
+            keyword arguments and returning the value to cache
+        ttl: TTL for warmed entries (defaults to the cache TTL)
+    """
+    _PRODUCERS[path] = (producer, ttl)
+
+
+class HeavyHitters:
+    """
+    Space-Saving top-k sketch with at most `capacity` counters.
+
+    A new item arriving when the sketch is full takes over the smallest
+    counter (inheriting its count), so frequent items are never lost and
+    memory stays bounded no matter how many distinct keys clients try.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._counts: Dict[str, int] = {}
+        self._payloads: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def add(self, item: str, payload: Any = None, weight: int = 1) -> None:
+        if item in self._counts:
+            self._counts[item] += weight
+        elif len(self._counts) < self.capacity:
+            self._counts[item] = weight
+        else:
+            victim = min(self._counts, key=self._counts.get)
+            floor = self._counts.pop(victim)
+            self._payloads.pop(victim, None)
+            self._counts[item] = floor + weight
+        self._payloads[item] = payload
+
+    def top(self, n: int) -> List[Tuple[str, int, Any]]:
+        best = heapq.nlargest(n, self._counts.items(), key=lambda kv: kv[1])
+        return [(item, count, self._payloads.get(item)) for item, count in best]
+
+    def drain(self) -> List[Tuple[str, int, Any]]:
+        """Return every counter and reset the sketch."""
+        items = [(item, count, self._payloads.get(item)) for item, count in self._counts.items()]
+        self._counts.clear()
+        self._payloads.clear()
+        return items
+
+
+class CacheWarmer:
+    """Records key popularity and re-warms hot keys ahead of expiry."""
+
+    def __init__(
+        self,
+        kv: KVCache,
+        sketch_size: Optional[int] = None,
+        top_n: Optional[int] = None,
+        interval: Optional[float] = None,
+        lead_seconds: Optional[float] = None,
+    ):
+        self.kv = kv
+        self.sketch_size = sketch_size or int(os.getenv("CACHE_WARM_SKETCH_SIZE", "512"))
+        self.top_n = top_n or int(os.getenv("CACHE_WARM_TOP_N", "50"))
+        self.interval = interval if interval is not None else float(os.getenv("CACHE_WARM_INTERVAL", "60"))
+        self.lead_seconds = lead_seconds if lead_seconds is not None else float(
+            os.getenv("CACHE_WARM_LEAD_SECONDS", "60")
+        )
+        self.sketch = HeavyHitters(self.sketch_size)
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {
+            "recorded": 0,
+            "cycles": 0,
+            "warmed": 0,
+            "skipped_fresh": 0,
+            "errors": 0,
+            "last_cycle_ms": 0.0,
+        }
+
+    def record(self, path: str, params: Dict[str, Any]) -> None:
+        """Count one access to the key cache_key(path, **params)."""
+        if path not in _PRODUCERS:
+            return
+        self.sketch.add(cache_key(path, **params), {"path": path, "params": params})
+        self.stats["recorded"] += 1
+
+    async def flush(self) -> None:
+        """Fold this worker's sketch into the shared Redis hot set."""
+        if not self.kv.redis or not len(self.sketch):
+            return
+        entries = self.sketch.drain()
+        try:
+            pipe = self.kv.redis.pipeline(transaction=False)
+            for key, count, payload in entries:
+                pipe.zincrby(HOT_ZSET, count, key)
+                pipe.hset(HOT_PARAMS, key, json.dumps(payload))
+            # Keep only the sketch_size hottest keys
+            pipe.zremrangebyrank(HOT_ZSET, 0, -(self.sketch_size + 1))
+            await pipe.execute()
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"⚠️  Cache warm flush error: {e}")
+
+    async def hot_keys(self, n: int) -> List[Tuple[str, Dict[str, Any]]]:
+        """Top-n (key, {"path", "params"}) - shared hot set, else local sketch."""
+        if not self.kv.redis:
+            return [(key, payload) for key, _, payload in self.sketch.top(n)]
+        try:
+            keys = [
+                k.decode() if isinstance(k, bytes) else k
+                for k in await self.kv.redis.zrevrange(HOT_ZSET, 0, n - 1)
+            ]
+            if not keys:
+                return []
+            raws = await self.kv.redis.hmget(HOT_PARAMS, keys)
+            return [(k, json.loads(raw)) for k, raw in zip(keys, raws) if raw]
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"⚠️  Cache warm hot-set read error: {e}")
+            return []
+
+    async def _fresh_seconds_left(self, key: str) -> float:
+        """Fresh TTL remaining for key (0 if missing or unknown)."""
+        if not self.kv.redis:
+            return 0.0
+        pkey = await self.kv._resolve(key)
+        pttl = await self.kv.redis.pttl(pkey)
+        if pttl is None or pttl < 0:
+            return 0.0
+        # The stale window is extra Redis lifetime, not freshness
+        return max(0.0, pttl / 1000 - self.kv._stale_window(pkey))
+
+    async def warm_key(self, key: str, entry: Dict[str, Any], force: bool = False) -> bool:
+        """Recompute and store one key unless it still has lead_seconds of freshness."""
+        producer, ttl = _PRODUCERS.get(entry.get("path"), (None, None))
+        if producer is None:
+            return False
+        try:
+            if not force and await self._fresh_seconds_left(key) > self.lead_seconds:
+                self.stats["skipped_fresh"] += 1
+                return False
+
+            params = entry.get("params") or {}
+            if asyncio.iscoroutinefunction(producer):
+                value = await producer(**params)
+            else:
+                # Producers may block (Airtable/Supabase HTTP)
+                value = await asyncio.to_thread(producer, **params)
+
+            await self.kv.set(key, value, ttl, warmed=True)
+            self.stats["warmed"] += 1
+            return True
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"⚠️  Cache warm failed for {key}: {e}")
+            return False
+
+    async def warm_top(self, n: Optional[int] = None, force: bool = False) -> Dict[str, Any]:
+        """Re-warm the n hottest keys (only those close to expiry unless force)."""
+        start = time.perf_counter()
+        hot = await self.hot_keys(n or self.top_n)
+        warmed = 0
+        for key, entry in hot:
+            if await self.warm_key(key, entry, force=force):
+                warmed += 1
+        return {
+            "considered": len(hot),
+            "warmed": warmed,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+
+    async def warm_all(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Warm the whole hot set regardless of TTL (after deploy / sync)."""
+        return await self.warm_top(limit or self.sketch_size, force=True)
+
+    async def run_cycle(self) -> Optional[Dict[str, Any]]:
+        """Flush, then - if this worker wins the cycle lease - decay and warm."""
+        start = time.perf_counter()
+        self.stats["cycles"] += 1
+        await self.flush()
+
+        if self.kv.redis:
+            lease_ms = max(1000, int(self.interval * 1000 * 0.9))
+            try:
+                if not await self.kv.redis.set(CYCLE_LOCK, self.kv.bus.origin, nx=True, px=lease_ms):
+                    return None
+                # Halve old counts so the hot set follows current traffic
+                await self.kv.redis.zunionstore(HOT_ZSET, {HOT_ZSET: 0.5})
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"⚠️  Cache warm lease error: {e}")
+                return None
+
+        result = await self.warm_top()
+        self.stats["last_cycle_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return result
+
+    async def start(self) -> None:
+        if self.interval <= 0 or not _PRODUCERS:
+            return
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_cycle()
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"⚠️  Cache warm cycle error: {e}")
+
+    async def enqueue_deploy_warm(self) -> bool:
+        """Enqueue one full re-warm per deploy (first worker to start wins)."""
+        if not self.kv.redis or not _PRODUCERS:
+            return False
+        build = os.getenv("RENDER_GIT_COMMIT") or os.getenv("GIT_SHA") or "local"
+        try:
+            if not await self.kv.redis.set(f"cb:warm:deploy:{build}", "1", nx=True, ex=600):
+                return False
+        except Exception as e:
+            print(f"⚠️  Cache deploy-warm lease error: {e}")
+            return False
+
+        from clausebot_api.services.queue import task_queue
+        return task_queue.enqueue_hot_key_warm() is not None
+
+    def health(self) -> Dict[str, Any]:
+        hits = sum(
+            ns["hits"]["redis"] + ns["hits"]["stale"]
+            for ns in self.kv.telemetry.snapshot().values()
+        )
+        warm_hits = self.kv.counters["warm_hits"]
+        return {
+            "registered": sorted(_PRODUCERS),
+            "interval_seconds": self.interval,
+            "top_n": self.top_n,
+            "lead_seconds": self.lead_seconds,
+            "sketch_entries": len(self.sketch),
+            "running": self._task is not None and not self._task.done(),
+            "warm_hits": warm_hits,
+            "warm_hit_share": round(warm_hits / hits * 100, 2) if hits else 0.0,
+            **self.stats,
+        }
+
+
+# Global warmer bound to the global cache
+cache_warmer = CacheWarmer(cache)
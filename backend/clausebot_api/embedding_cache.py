@@ -0,0 +1,181 @@
+"""
+ClauseBot Embedding Cache - reuse query embeddings across requests
+
+Every compliance question used to be embedded with text-embedding-3-large
+(100-300 ms and a paid API call), even exact repeats such as
+"minimum preheat A514". Embeddings are deterministic per (model, text), so
+they are cached under the normalized query text (case and whitespace
+folded). The model always embeds the caller's original text, cased like
+the clause text embedded at ingest; phrasings that differ only in case or
+spacing share the first one's vector.
+
+    L1:    in-process LRU of float32 arrays (per worker)
+    Redis: packed little-endian floats in the "cb:/v1/embed" namespace
+
+A 3072-dim vector is ~6 KB as float16 (~12 KB as float32) instead of
+~60 KB as a JSON list. float16 keeps cosine similarity to ~1e-3, which
+does not change clause ranking; set EMBED_CACHE_DTYPE=float32 to store
+exact values.
+
+Configuration:
+    EMBED_CACHE_MAX_ENTRIES=1024      # L1 vectors per worker, 0 disables L1
+    EMBED_CACHE_L1_MAX_BYTES=67108864 # L1 budget (~4 bytes per dimension)
+    EMBED_CACHE_TTL=604800            # Redis TTL (7 days)
+    EMBED_CACHE_DTYPE=float16         # float16 | float32
+
+Usage:
+    vector = await embedding_cache.get_or_embed(query, model, embed)
+"""
+import os
+import re
+import sys
+import struct
+from array import array
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from clausebot_api.cache import KVCache, LocalLRU, cache_key
+
+NAMESPACE = "/v1/embed"
+
+# dtype -> (header byte, struct code, bytes per value)
+_DTYPES = {
+    "float16": (1, "e", 2),
+    "float32": (2, "f", 4),
+}
+_BY_HEADER = {header: (code, width) for header, code, width in _DTYPES.values()}
+
+_WS = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Case- and whitespace-insensitive form used for cache keys."""
+    return _WS.sub(" ", text).strip().casefold()
+
+
+def encode_vector(vector: List[float], dtype: str = "float16") -> bytes:
+    """Pack a vector as header byte + little-endian floats."""
+    header, code, _ = _DTYPES[dtype]
+    return bytes((header,)) + struct.pack(f"<{len(vector)}{code}", *vector)
+
+
+def decode_vector(data: bytes) -> List[float]:
+    code, width = _BY_HEADER[data[0]]
+    return list(struct.unpack(f"<{(len(data) - 1) // width}{code}", data[1:]))
+
+
+class EmbeddingCache:
+    """Two-tier (L1 + Redis) cache of query embedding vectors."""
+
+    def __init__(
+        self,
+        kv: Optional[KVCache] = None,
+        max_entries: Optional[int] = None,
+        ttl: Optional[int] = None,
+        dtype: Optional[str] = None,
+    ):
+        if max_entries is None:
+            max_entries = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "1024"))
+        max_bytes = int(os.getenv("EMBED_CACHE_L1_MAX_BYTES", str(64 * 1024 * 1024)))
+        self.ttl = ttl or int(os.getenv("EMBED_CACHE_TTL", str(7 * 24 * 3600)))
+        self.dtype = dtype or os.getenv("EMBED_CACHE_DTYPE", "float16")
+        if self.dtype not in _DTYPES:
+            print(f"⚠️  Unknown EMBED_CACHE_DTYPE={self.dtype!r} - using float16")
+            self.dtype = "float16"
+
+        self.l1 = LocalLRU(max_entries, max_bytes) if max_entries > 0 else None
+        # The L1 above replaces KVCache's own, so keep that one off
+        self.kv = kv if kv is not None else KVCache(l1_max_entries=0)
+
+        self.counters = {
+            "l1_hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "stored": 0,
+            "bytes_stored": 0,
+            "errors": 0,
+        }
+
+    def key(self, text: str, model: str) -> str:
+        return cache_key(NAMESPACE, model=model, q=normalize_query(text))
+
+    async def get(self, text: str, model: str) -> Optional[List[float]]:
+        key = self.key(text, model)
+        if self.l1 is not None:
+            packed = self.l1.get(key)
+            if packed is not None:
+                self.counters["l1_hits"] += 1
+                return packed.tolist()
+
+        data = await self.kv.get_bytes(key)
+        if not data:
+            return None
+        try:
+            vector = decode_vector(data)
+        except (KeyError, IndexError, struct.error) as e:
+            self.counters["errors"] += 1
+            print(f"⚠️  Embedding cache decode error for {key}: {e}")
+            return None
+
+        self.counters["redis_hits"] += 1
+        self._set_l1(key, vector)
+        return vector
+
+    async def set(self, text: str, model: str, vector: List[float]) -> None:
+        key = self.key(text, model)
+        self._set_l1(key, vector)
+        data = encode_vector(vector, self.dtype)
+        if await self.kv.set_bytes(key, data, self.ttl) and self.kv.redis:
+            self.counters["stored"] += 1
+            self.counters["bytes_stored"] += len(data)
+
+    async def get_or_embed(
+        self,
+        text: str,
+        model: str,
+        embed: Callable[[str], Awaitable[List[float]]],
+    ) -> List[float]:
+        """
+        Return the cached embedding for text, calling embed() on a miss.
+
+        embed receives the original text; only the cache key is
+        normalized.
+        """
+        vector = await self.get(text, model)
+        if vector is not None:
+            return vector
+
+        self.counters["misses"] += 1
+        vector = await embed(text)
+        try:
+            await self.set(text, model, vector)
+        except Exception as e:
+            # Never fail the request because the cache write failed
+            self.counters["errors"] += 1
+            print(f"⚠️  Embedding cache store error: {e}")
+        return vector
+
+    def _set_l1(self, key: str, vector: List[float]) -> None:
+        if self.l1 is not None:
+            # A list of Python floats costs ~32 bytes per dimension; an
+            # array('f') is 4, and getsizeof reports what it really holds
+            packed = array("f", vector)
+            self.l1.set(key, packed, self.ttl, sys.getsizeof(packed))
+
+    def stats(self) -> Dict[str, Any]:
+        c = self.counters
+        hits = c["l1_hits"] + c["redis_hits"]
+        total = hits + c["misses"]
+        return {
+            "dtype": self.dtype,
+            "hit_rate": round(hits / total * 100, 2) if total else 0.0,
+            **c,
+            "l1": self.l1.stats() if self.l1 is not None else None,
+            "redis_enabled": self.kv.redis is not None,
+        }
+
+    async def close(self) -> None:
+        await self.kv.close()
+
+
+# Global instance used by the RAG pipeline
+embedding_cache = EmbeddingCache()
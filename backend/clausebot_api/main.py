@@ -84,6 +84,52 @@ else:
 def quiz_health() -> Dict[str, Any]:
     return {"quiz": "ready", "default_category": DEFAULT_CATEGORY}
 
+@app.on_event("startup")
+async def start_cache_bus():
+    # Drop this worker's L1 entries when any process invalidates a key
+    from clausebot_api.cache import cache
+    await cache.bus.start()
+
+@app.on_event("startup")
+async def start_cache_warmer():
+    # Re-warm hot keys periodically, and once per deploy via the task queue
+    from clausebot_api.cache_warming import cache_warmer
+    await cache_warmer.start()
+    await cache_warmer.enqueue_deploy_warm()
+
+@app.on_event("startup")
+async def start_vector_index():
+    # Map the clause embedding snapshot; rebuild when ingestion announces changes
+    if RAG_ENABLED:
+        from clausebot_api.cache import cache
+        from clausebot_api.services.vector_index import vector_index
+        vector_index.start()
+        cache.bus.add_listener(vector_index.on_invalidation)
+
+@app.on_event("startup")
+async def start_clause_key_index():
+    # Priority routing P1/P2 lookups; reload on the same ingestion announcements
+    if RAG_ENABLED:
+        from clausebot_api.cache import cache
+        from clausebot_api.services.clause_key_index import clause_key_index
+        if clause_key_index.enabled:
+            clause_key_index.refresh_in_background()
+            cache.bus.add_listener(clause_key_index.on_invalidation)
+
+@app.on_event("shutdown")
+async def flush_citation_log():
+    # Write queued citations (or spill them) before the worker exits
+    if RAG_ENABLED:
+        from clausebot_api.services.citation_log import citation_log
+        await citation_log.stop()
+
+@app.on_event("shutdown")
+async def stop_cache_bus():
+    from clausebot_api.cache import cache
+    from clausebot_api.cache_warming import cache_warmer
+    await cache_warmer.stop()
+    await cache.bus.stop()
+
 @app.on_event("startup")
 async def startup_probe():
     try:
@@ -0,0 +1,152 @@
+"""
+ClauseBot Response Byte Cache - pre-serialized bodies for hot GET endpoints
+
+A KVCache hit still decodes the value, re-validates it through the
+endpoint's pydantic model and lets FastAPI serialize it again. This layer
+caches the final JSON body (gzip-compressed above a size threshold) plus
+an ETag, and serves it as a raw Response:
+
+    hit:  get_bytes -> Response(body)        (no decode, no validation)
+    miss: cache.get_or_set(data) -> validate/serialize once -> set_bytes
+
+Body keys live in the data key's namespace ("cb:/v1/quiz:body:<hash>"),
+so invalidate_namespace() drops both. Bodies get a shorter TTL than the
+data (RESPONSE_CACHE_TTL) so a body built from a stale-while-revalidate
+copy doesn't outlive the refresh.
+
+Fields that differ per request (e.g. the caller's raw query when the key
+is built from a normalized one) are never cached: pass them as `fields`
+and they are spliced into the front of the cached body for each response,
+with an ETag of their own.
+
+Configuration:
+    RESPONSE_CACHE_TTL=60
+    RESPONSE_CACHE_GZIP_MIN_BYTES=1024
+
+Usage:
+    return await cached_json_response(
+        request, key, fetch_quiz, model=QuizResponse
+    )
+"""
+import os
+import gzip
+import json
+import hashlib
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from clausebot_api.cache import KVCache, cache, _namespace_of
+
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "60"))
+GZIP_MIN_BYTES = int(os.getenv("RESPONSE_CACHE_GZIP_MIN_BYTES", "1024"))
+
+# Entry layout: flags (1 byte) | etag (16 ascii hex) | body
+_FLAG_GZIP = 0x01
+_ETAG_LEN = 16
+
+
+def body_key(key: str) -> str:
+    """"cb:/v1/quiz:abc" -> "cb:/v1/quiz:body:abc" (same namespace)."""
+    ns = _namespace_of(key)
+    return f"{ns}:body{key[len(ns):]}"
+
+
+def serialize_body(data: Any, model: Optional[Type[BaseModel]] = None) -> bytes:
+    """Encode data exactly as FastAPI would for a JSON response."""
+    if model is not None:
+        return model.model_validate(data).model_dump_json().encode()
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def pack_entry(body: bytes, gzip_min_bytes: int = GZIP_MIN_BYTES) -> bytes:
+    etag = hashlib.blake2b(body, digest_size=_ETAG_LEN // 2).hexdigest()
+    flags = 0
+    if len(body) >= gzip_min_bytes:
+        packed = gzip.compress(body, compresslevel=6)
+        if len(packed) < len(body):
+            body, flags = packed, _FLAG_GZIP
+    return bytes((flags,)) + etag.encode() + body
+
+
+def unpack_entry(entry: bytes) -> Tuple[str, bool, bytes]:
+    """-> (etag, is_gzipped, body)"""
+    flags = entry[0]
+    etag = entry[1:1 + _ETAG_LEN].decode()
+    return etag, bool(flags & _FLAG_GZIP), entry[1 + _ETAG_LEN:]
+
+
+def with_fields(entry: bytes, fields: Dict[str, Any]) -> bytes:
+    """Re-pack an entry with per-request fields prepended to its JSON object."""
+    _, gzipped, body = unpack_entry(entry)
+    if gzipped:
+        body = gzip.decompress(body)
+    head = serialize_body(fields)
+    if body.strip() != b"{}":
+        head = head[:-1] + b"," + body.lstrip()[1:]
+    return pack_entry(head)
+
+
+def render(
+    request: Request,
+    entry: bytes,
+    headers: Optional[Dict[str, str]] = None,
+    cache_status: str = "hit",
+    media_type: str = "application/json",
+) -> Response:
+    """Turn a packed entry into a Response (304 / gzip / identity)."""
+    etag, gzipped, body = unpack_entry(entry)
+    out_headers = dict(headers or {})
+    out_headers["ETag"] = f'"{etag}"'
+    out_headers["Vary"] = "Accept-Encoding"
+    out_headers["X-Body-Cache"] = cache_status
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in if_none_match.replace("W/", "").replace('"', "").replace(" ", "").split(","):
+        return Response(status_code=304, headers=out_headers)
+
+    if gzipped:
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            out_headers["Content-Encoding"] = "gzip"
+        else:
+            body = gzip.decompress(body)
+
+    return Response(content=body, media_type=media_type, headers=out_headers)
+
+
+async def cached_json_response(
+    request: Request,
+    key: str,
+    producer: Callable,
+    model: Optional[Type[BaseModel]] = None,
+    ttl: Optional[int] = None,
+    headers: Optional[Dict[str, str]] = None,
+    kv: Optional[KVCache] = None,
+    fields: Optional[Dict[str, Any]] = None,
+) -> Response:
+    """
+    Serve a pre-serialized body for key, building it from producer on a miss.
+
+    Args:
+        request: Incoming request (If-None-Match / Accept-Encoding)
+        key: Data cache key (e.g. cache_key("/v1/quiz", ...))
+        producer: Async or sync callable returning the response data
+        model: Optional pydantic model to validate/serialize with once
+        ttl: Data TTL override (seconds); bodies use RESPONSE_CACHE_TTL
+        headers: Extra headers (Cache-Control etc.) for every response
+        kv: Cache instance (defaults to the global cache)
+        fields: Per-request fields added in front of the cached body
+            (not cached, so they must not be in producer's data)
+    """
+    kv = kv or cache
+    bkey = body_key(key)
+
+    entry = await kv.get_bytes(bkey)
+    if entry:
+        return render(request, with_fields(entry, fields) if fields else entry, headers, "hit")
+
+    data = await kv.get_or_set(key, producer, ttl)
+    entry = pack_entry(serialize_body(data, model))
+    await kv.set_bytes(bkey, entry, min(RESPONSE_CACHE_TTL, ttl or kv.ttl))
+    return render(request, with_fields(entry, fields) if fields else entry, headers, "miss")
@@ -1,10 +1,14 @@
 # chat_compliance.py
 # FastAPI router for RAG compliance endpoint (feature-flagged)
 import os
+import json
+import time
 import uuid
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Optional
+from clausebot_api.cache_metrics import Histogram, LATENCY_BUCKETS
 from clausebot_api.services import rag_service
 
 router = APIRouter()
@@ -58,14 +62,12 @@ class ComplianceChatResponse(BaseModel):
     metadata: Dict
     session_id: str
 
-@router.post("/chat/compliance", response_model=ComplianceChatResponse)
-async def compliance_chat(req: ComplianceChatRequest):
-    """
-    RAG-powered compliance chat endpoint.
-    
-    Returns grounded answers with clause citations from AWS D1.1 and other standards.
-    Requires RAG_ENABLED=true environment variable.
-    """
+# Streaming latency (seconds): first byte on the wire vs. whole answer
+STREAM_TTFB = Histogram(LATENCY_BUCKETS)
+STREAM_TOTAL = Histogram(LATENCY_BUCKETS)
+
+def validate_request(req: ComplianceChatRequest) -> str:
+    """Feature flag, validation and rate limit; returns the session ID."""
     # Feature flag check
     if not RAG_ENABLED:
         raise HTTPException(
@@ -90,7 +92,17 @@ async def compliance_chat(req: ComplianceChatRequest):
         )
     
     # Generate session ID if not provided
-    session_id = req.session_id or str(uuid.uuid4())
+    return req.session_id or str(uuid.uuid4())
+
+@router.post("/chat/compliance", response_model=ComplianceChatResponse)
+async def compliance_chat(req: ComplianceChatRequest):
+    """
+    RAG-powered compliance chat endpoint.
+    
+    Returns grounded answers with clause citations from AWS D1.1 and other standards.
+    Requires RAG_ENABLED=true environment variable.
+    """
+    session_id = validate_request(req)
     
     # Execute RAG pipeline
     try:
@@ -111,6 +123,58 @@ async def compliance_chat(req: ComplianceChatRequest):
         print(f"RAG pipeline error: {e}")
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/chat/compliance/stream")
+async def compliance_chat_stream(req: ComplianceChatRequest):
+    """
+    Streaming (Server-Sent Events) variant of /chat/compliance.
+    
+    Events, in order:
+        citations  - list of CitationItem, sent as soon as retrieval is done
+        token      - {"text": ...} per answer delta from the LLM
+        metadata   - token counts plus ttfb_ms / total_ms, then the stream ends
+        error      - {"detail": ...} instead of the remaining events on failure
+    """
+    session_id = validate_request(req)
+    start = time.perf_counter()
+    
+    async def events():
+        first_byte = None
+        try:
+            async for event, data in rag_service.rag_pipeline_stream(
+                query=req.query,
+                session_id=session_id,
+                standard=req.standard,
+                top_k=req.top_k
+            ):
+                if first_byte is None:
+                    first_byte = time.perf_counter() - start
+                    STREAM_TTFB.observe(first_byte)
+                if event == 'token':
+                    data = {'text': data}
+                elif event == 'metadata':
+                    total = time.perf_counter() - start
+                    STREAM_TOTAL.observe(total)
+                    data = dict(
+                        data,
+                        session_id=session_id,
+                        ttfb_ms=round(first_byte * 1000, 1),
+                        total_ms=round(total * 1000, 1)
+                    )
+                yield sse_event(event, data)
+        except Exception as e:
+            print(f"RAG stream error: {e}")
+            yield sse_event('error', {'detail': f"Internal error: {str(e)}"})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/chat/compliance/health")
 async def compliance_health():
     """
@@ -126,7 +190,9 @@ async def compliance_health():
         # Quick DB check (sample query)
         clause_count = None
         try:
-            result = rag_service.supabase.table('clause_embeddings').select('clause_id').limit(1).execute()
+            result = await rag_service.supabase_pool.execute(
+                rag_service.supabase.table('clause_embeddings').select('clause_id').limit(1)
+            )
             clause_count = len(result.data) if result.data else 0
         except Exception as e:
             print(f"DB health check error: {e}")
@@ -145,7 +211,16 @@ async def compliance_health():
             "openai_configured": openai_configured,
             "supabase_configured": supabase_configured,
             "clause_sample_available": clause_count is not None and clause_count > 0,
-            "rate_limit_per_minute": RATE_LIMIT_PER_MINUTE
+            "rate_limit_per_minute": RATE_LIMIT_PER_MINUTE,
+            "vector_backend": rag_service.RAG_VECTOR_BACKEND,
+            "vector_index": rag_service.vector_index.health(),
+            "citation_log": rag_service.citation_log.health(),
+            "supabase_pool": rag_service.supabase_pool.health(),
+            "answer_cache": rag_service.answer_cache.stats(),
+            "streaming": {
+                "ttfb_ms": STREAM_TTFB.snapshot(scale=1000, digits=1),
+                "total_ms": STREAM_TOTAL.snapshot(scale=1000, digits=1)
+            }
         }
     except Exception as e:
         return {
@@ -1,6 +1,7 @@
 # Health and Diagnostics Router
 from typing import Dict, Any
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
 from collections import Counter
 import os
 from clausebot_api.airtable_data_source import (
@@ -142,10 +143,18 @@ async def cache_health() -> Dict[str, Any]:
         - keyspace_hits: Number of successful cache lookups
         - keyspace_misses: Number of cache misses
         - hit_rate: Cache hit rate percentage
+        - namespaces: Per-namespace hits/misses, producer latency,
+          value sizes and errors (this process only)
+        - warming: Hot-key warmer status and share of hits on warmed entries
+        - embeddings: Query embedding cache hit rate and bytes stored
     """
     from clausebot_api.cache import cache
+    from clausebot_api.cache_warming import cache_warmer
+    from clausebot_api.embedding_cache import embedding_cache
     
     result = await cache.health_check()
+    result["warming"] = cache_warmer.health()
+    result["embeddings"] = embedding_cache.stats()
     
     # Calculate hit rate if we have stats
     if result.get("ok") and "keyspace_hits" in result:
@@ -159,3 +168,14 @@ async def cache_health() -> Dict[str, Any]:
             result["hit_rate"] = 0.0
     
     return result
+
+
+@router.get("/metrics/cache", response_class=PlainTextResponse)
+async def cache_metrics() -> PlainTextResponse:
+    """Per-namespace cache telemetry in Prometheus text format."""
+    from clausebot_api.cache import cache
+    
+    return PlainTextResponse(
+        cache.telemetry.render_prometheus(),
+        media_type="text/plain; version=0.0.4",
+    )
@@ -1,9 +1,11 @@
 from typing import Optional, List, Dict, Any
 import os
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Request
 from pydantic import BaseModel
 from clausebot_api.airtable_data_source import get_questions
-from clausebot_api.cache import cache, cache_key
+from clausebot_api.cache import cache_key
+from clausebot_api.response_cache import cached_json_response
+from clausebot_api.cache_warming import cache_warmer, register_warmer
 
 router = APIRouter()
 
@@ -26,8 +28,19 @@ class QuizResponse(BaseModel):
     source: str
     items: List[QuizResponseItem]
 
+def build_quiz(category: str, count: int) -> Dict[str, Any]:
+    """Quiz payload for a category (cache producer, also used by the warmer)."""
+    items = get_questions(category, count)
+    if not items:
+        # Surface as 422 (no records) rather than silent 503
+        raise HTTPException(status_code=422, detail=f"No quiz records for category '{category}' (need {count}, have 0)")
+    return {"count": len(items), "category": category, "source": "airtable", "items": items}
+
+register_warmer("/v1/quiz", build_quiz)
+
 @router.get("/quiz", response_model=QuizResponse)
 async def get_quiz(
+    request: Request,
     category: Optional[str] = Query(
         None,
         description="Airtable category (optional). Defaults to 'Structural Welding' if omitted."
@@ -46,7 +59,8 @@ async def get_quiz(
     - Returns results
     
     On cache hit:
-    - Returns cached results (sub-50ms)
+    - Returns the pre-serialized (gzip) body with an ETag - no decode or
+      re-validation (see response_cache)
     """
     
     cat = category or DEFAULT_CATEGORY
@@ -54,19 +68,14 @@ async def get_quiz(
     try:
         # Generate cache key based on category and count
         key = cache_key("/v1/quiz", category=cat, count=count)
+        cache_warmer.record("/v1/quiz", {"category": cat, "count": count})
         
         # Define producer function for cache miss
         def fetch_quiz():
-            items = get_questions(cat, count)
-            if not items:
-                # Surface as 422 (no records) rather than silent 503
-                raise HTTPException(status_code=422, detail=f"No quiz records for category '{cat}' (need {count}, have 0)")
-            return {"count": len(items), "category": cat, "source": "airtable", "items": items}
-        
-        # Get from cache or fetch (async-aware)
-        result = await cache.get_or_set(key, fetch_quiz)
+            return build_quiz(cat, count)
         
-        return result
+        # Serve cached body bytes, or fetch, validate and cache once
+        return await cached_json_response(request, key, fetch_quiz, model=QuizResponse)
 
     except HTTPException:
         # Re-raise HTTPExceptions (like 422 from get_questions)
@@ -0,0 +1,200 @@
+"""
+ClauseBot ANN Index - IVF-PQ over the vector index snapshot
+
+Exact scans grow linearly with the corpus; once D1.1:2025, ASME IX and
+API 1104 sit next to D1.1:2020 an inverted-file index keeps query cost
+roughly constant:
+
+- IVF: rows are clustered (k-means) into lists; a query only visits the
+  nprobe lists whose centroids are closest.
+- PQ: each row's residual (row - its list centroid) is stored as M one-byte
+  codes, one per D/M-dim subspace. Inner products are approximated from a
+  per-query (M, K) lookup table, so scanning a list never touches floats.
+
+Lists never mix standards: each standard gets its own ~sqrt(rows) lists,
+so a standard filter only probes that standard's lists instead of
+post-filtering a global result (no recall lost to the filter).
+
+Everything is plain .npy next to the snapshot (memory-mapped on load),
+written by write_snapshot(..., ann=True) from the ingestion job or
+scripts/build_vector_index.py, never by API workers. The caller rescores
+the returned candidates exactly against the float32 rows.
+
+Configuration:
+    VECTOR_INDEX_PQ_M=96         # subspaces (3072 dims -> 32 per code)
+    VECTOR_INDEX_NPROBE=8        # lists visited per query
+"""
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+PQ_CODEBOOK_SIZE = 256  # one uint8 per subspace
+KMEANS_ITERATIONS = 12
+
+_ARRAYS = ("centroids", "offsets", "ids", "codes", "codebooks")
+
+
+def kmeans(x: np.ndarray, k: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Plain L2 k-means, seeded with random distinct rows.
+
+    Returns:
+        (centroids (k, dim), assignment of every row)
+    """
+    x = np.asarray(x, dtype=np.float32)
+    k = max(1, min(k, len(x)))
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), size=k, replace=False)].copy()
+    x_sq = np.einsum("ij,ij->i", x, x)
+
+    assign = np.zeros(len(x), dtype=np.int64)
+    for _ in range(iterations):
+        dist = x_sq[:, None] - 2 * x @ centroids.T + np.einsum("ij,ij->i", centroids, centroids)[None, :]
+        assign = dist.argmin(axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        counts = np.bincount(assign, minlength=k)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Re-seed empty clusters with random rows
+        if not filled.all():
+            centroids[~filled] = x[rng.choice(len(x), size=int((~filled).sum()))]
+    return centroids, assign
+
+
+def _subspaces(dim: int, max_m: int) -> int:
+    """Largest M <= max_m that divides dim."""
+    for m in range(min(max_m, dim), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def build_ivfpq(
+    vectors: np.ndarray,
+    ranges: Dict[str, Tuple[int, int]],
+    pq_m: Optional[int] = None,
+) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """
+    Train and encode an IVF-PQ index over normalized snapshot rows.
+
+    Args:
+        vectors: (rows, dim) float32, rows sorted by standard
+        ranges: standard -> (first row, end row)
+        pq_m: Max PQ subspaces (default VECTOR_INDEX_PQ_M)
+
+    Returns:
+        (arrays to save, meta dict)
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    m = _subspaces(dim, pq_m or int(os.getenv("VECTOR_INDEX_PQ_M", "96")))
+
+    centroids, list_ids, list_standards = [], [], {}
+    residuals = np.empty_like(vectors)
+    for standard, (start, end) in sorted(ranges.items(), key=lambda kv: kv[1][0]):
+        rows = vectors[start:end]
+        cents, assign = kmeans(rows, int(np.sqrt(len(rows))) or 1)
+        first = len(centroids)
+        for c in range(len(cents)):
+            members = np.flatnonzero(assign == c)
+            if not len(members):
+                continue
+            centroids.append(cents[c])
+            list_ids.append(members + start)
+            residuals[members + start] = rows[members] - cents[c]
+        list_standards[standard] = [first, len(centroids)]
+
+    # One codebook per subspace, trained on every residual
+    sub = dim // m
+    k = min(PQ_CODEBOOK_SIZE, n)
+    codebooks = np.zeros((m, k, sub), dtype=np.float32)
+    codes = np.zeros((n, m), dtype=np.uint8)
+    for s in range(m):
+        part = residuals[:, s * sub:(s + 1) * sub]
+        codebooks[s], codes[:, s] = kmeans(part, k, seed=s)
+
+    order = np.concatenate(list_ids) if list_ids else np.zeros(0, dtype=np.int64)
+    offsets = np.zeros(len(list_ids) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(ids) for ids in list_ids])
+
+    arrays = {
+        "centroids": np.asarray(centroids, dtype=np.float32).reshape(len(centroids), dim),
+        "offsets": offsets,
+        "ids": order.astype(np.int32),
+        "codes": codes[order],
+        "codebooks": codebooks,
+    }
+    meta = {"nlist": len(centroids), "m": m, "k": k, "standards": list_standards}
+    return arrays, meta
+
+
+def save_ivfpq(path: Path, version: str, arrays: Dict[str, np.ndarray]) -> Dict[str, str]:
+    files = {}
+    for name in _ARRAYS:
+        files[name] = f"ann-{version}.{name}.npy"
+        np.save(path / files[name], arrays[name])
+    return files
+
+
+class IVFPQIndex:
+    """Read-only IVF-PQ search over memory-mapped arrays."""
+
+    def __init__(self, path: Path, meta: Dict[str, Any]):
+        files = meta["files"]
+        arrays = {name: np.load(path / files[name], mmap_mode="r") for name in _ARRAYS}
+        self.centroids = np.asarray(arrays["centroids"])
+        self.offsets = np.asarray(arrays["offsets"])
+        self.ids = arrays["ids"]
+        self.codes = arrays["codes"]
+        self.codebooks = np.asarray(arrays["codebooks"])
+        self.m = int(meta["m"])
+        self.standards: Dict[str, Tuple[int, int]] = {
+            std: (int(a), int(b)) for std, (a, b) in meta["standards"].items()
+        }
+        self.centroid_sq = np.einsum("ij,ij->i", self.centroids, self.centroids)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    def candidates(
+        self,
+        query: np.ndarray,
+        n_candidates: int,
+        standard: Optional[str] = None,
+        nprobe: int = 8,
+    ) -> np.ndarray:
+        """
+        Snapshot row ids of the n_candidates best approximate matches.
+
+        Args:
+            query: Normalized (dim,) float32 query
+            n_candidates: How many rows to return for exact rescoring
+            standard: Only probe this standard's lists
+            nprobe: Lists to visit
+        """
+        lo, hi = self.standards[standard] if standard is not None else (0, self.nlist)
+        if hi <= lo:
+            return np.zeros(0, dtype=np.int64)
+
+        cq = self.centroids[lo:hi] @ query
+        dist = self.centroid_sq[lo:hi] - 2 * cq
+        probe = np.argsort(dist)[:max(1, nprobe)]
+
+        spans = [(self.offsets[lo + p], self.offsets[lo + p + 1]) for p in probe]
+        positions = np.concatenate([np.arange(a, b) for a, b in spans])
+        if not len(positions):
+            return np.zeros(0, dtype=np.int64)
+        base = np.repeat(cq[probe], [b - a for a, b in spans])
+
+        # (M, K) table of query-subspace . codeword
+        tables = np.einsum("mkd,md->mk", self.codebooks, query.reshape(self.m, -1))
+        codes = np.asarray(self.codes[positions])
+        scores = base + tables[np.arange(self.m), codes].sum(axis=1)
+
+        n = min(n_candidates, len(scores))
+        best = np.argpartition(-scores, n - 1)[:n] if n < len(scores) else np.arange(len(scores))
+        return np.asarray(self.ids[positions[best]], dtype=np.int64)
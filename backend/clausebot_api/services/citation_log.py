@@ -0,0 +1,241 @@
+"""
+ClauseBot Citation Log - batched chat_citations inserts off the request path
+
+generate_rag_response used to insert one chat_citations row per retrieved
+clause, each a blocking Supabase HTTP call made before the answer was
+returned. Rows are now queued in memory and written by a background task
+in bulk inserts, when CITATION_LOG_BATCH_SIZE rows are waiting or every
+CITATION_LOG_FLUSH_SECONDS, whichever comes first.
+
+If Supabase is unreachable a failed batch is appended (JSON lines) to
+CITATION_LOG_SPILL_PATH and replayed after the next successful flush, so
+citations survive outages and restarts. Rows beyond CITATION_LOG_MAX_QUEUE
+go straight to the spill file instead of growing the queue.
+
+Configuration:
+    CITATION_LOG_BATCH_SIZE=50        # rows per bulk insert
+    CITATION_LOG_FLUSH_SECONDS=2      # max time a row waits in the queue
+    CITATION_LOG_MAX_QUEUE=10000      # in-memory rows before spilling
+    CITATION_LOG_SPILL_PATH=backend/data/citation_spill.jsonl
+
+Usage:
+    citation_log.enqueue([{"session_id": ..., "clause_id": ..., ...}])
+"""
+import os
+import json
+import time
+import asyncio
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+from clausebot_api.cache_metrics import Histogram, LATENCY_BUCKETS
+from clausebot_api.services.supabase_pool import supabase_pool
+
+TABLE = "chat_citations"
+DEFAULT_SPILL_PATH = Path(__file__).resolve().parents[2] / "data" / "citation_spill.jsonl"
+
+
+class CitationLogWriter:
+    """Queues citation rows and bulk-inserts them from a background task."""
+
+    def __init__(
+        self,
+        client=None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_queue: Optional[int] = None,
+        spill_path: Optional[Path] = None,
+    ):
+        self.client = client
+        self.batch_size = batch_size or int(os.getenv("CITATION_LOG_BATCH_SIZE", "50"))
+        self.flush_interval = flush_interval if flush_interval is not None else float(
+            os.getenv("CITATION_LOG_FLUSH_SECONDS", "2")
+        )
+        self.max_queue = max_queue or int(os.getenv("CITATION_LOG_MAX_QUEUE", "10000"))
+        self.spill_path = Path(spill_path or os.getenv("CITATION_LOG_SPILL_PATH", str(DEFAULT_SPILL_PATH)))
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.flush_seconds = Histogram(LATENCY_BUCKETS)
+        self.stats = {
+            "enqueued": 0,
+            "written": 0,
+            "batches": 0,
+            "spilled": 0,
+            "replayed": 0,
+            "errors": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def enqueue(self, rows: List[Dict[str, Any]]) -> None:
+        """Queue rows for the next bulk insert; never blocks or raises."""
+        if not rows:
+            return
+        room = max(0, self.max_queue - len(self._queue))
+        self._queue.extend(rows[:room])
+        self.stats["enqueued"] += len(rows)
+        if len(rows) > room:
+            self._spill(rows[room:])
+
+        self._ensure_task()
+        if len(self._queue) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _ensure_task(self) -> None:
+        """Start the flush loop on first use inside a running event loop."""
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.ensure_future(self._loop())
+
+    async def start(self) -> None:
+        self._ensure_task()
+
+    async def stop(self) -> None:
+        """Stop the loop and write (or spill) whatever is still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._queue:
+            await self.flush()
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                while self._queue:
+                    if not await self.flush():
+                        break
+                else:
+                    await self.replay_spill()
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"⚠️  Citation log flush error: {e}")
+
+    def _client(self):
+        if self.client is None:
+            url = os.getenv("SUPABASE_URL")
+            key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+            if url and key:
+                from supabase import create_client
+                self.client = create_client(url, key)
+        return self.client
+
+    def _insert(self, rows: List[Dict[str, Any]]) -> None:
+        client = self._client()
+        if client is None:
+            raise RuntimeError("Supabase not configured")
+        client.table(TABLE).insert(rows).execute()
+
+    async def flush(self) -> bool:
+        """
+        Bulk-insert up to batch_size queued rows.
+
+        Returns:
+            False if the batch had to be spilled
+        """
+        batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+        if not batch:
+            return True
+
+        start = time.perf_counter()
+        try:
+            # supabase-py is synchronous; keep the HTTP call off the event loop
+            await supabase_pool.run(self._insert, batch)
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"⚠️  Citation log insert failed ({len(batch)} rows spilled): {e}")
+            self._spill(batch)
+            return False
+        finally:
+            elapsed = time.perf_counter() - start
+            self.flush_seconds.observe(elapsed)
+            self.stats["last_flush_ms"] = round(elapsed * 1000, 1)
+
+        self.stats["written"] += len(batch)
+        self.stats["batches"] += 1
+        return True
+
+    def _spill(self, rows: List[Dict[str, Any]]) -> None:
+        try:
+            self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+            # One write per batch: appends from several workers don't interleave lines
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(row, default=str) + "\n" for row in rows))
+            self.stats["spilled"] += len(rows)
+        except OSError as e:
+            self.stats["errors"] += 1
+            print(f"⚠️  Citation log spill failed ({len(rows)} rows lost): {e}")
+
+    async def replay_spill(self) -> int:
+        """Insert spilled rows; whatever fails goes back to the spill file."""
+        if not self.spill_path.exists():
+            return 0
+        # Claim the file so new spills (and other workers) don't race the replay
+        claimed = self.spill_path.with_name(f"{self.spill_path.name}.{os.getpid()}.replay")
+        try:
+            os.replace(self.spill_path, claimed)
+            lines = claimed.read_text(encoding="utf-8").splitlines()
+        except OSError:
+            return 0
+
+        rows = []
+        for line in lines:
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                self.stats["errors"] += 1
+
+        replayed = 0
+        for i in range(0, len(rows), self.batch_size):
+            batch = rows[i:i + self.batch_size]
+            try:
+                await supabase_pool.run(self._insert, batch)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"⚠️  Citation log replay failed: {e}")
+                self._spill(rows[i:])
+                self.stats["spilled"] -= len(rows) - i
+                break
+            replayed += len(batch)
+
+        claimed.unlink()
+        self.stats["replayed"] += replayed
+        self.stats["written"] += replayed
+        return replayed
+
+    def health(self) -> Dict[str, Any]:
+        try:
+            spill_bytes = self.spill_path.stat().st_size
+        except OSError:
+            spill_bytes = 0
+        return {
+            "queue_depth": self.depth,
+            "batch_size": self.batch_size,
+            "flush_interval_seconds": self.flush_interval,
+            "running": self._task is not None and not self._task.done(),
+            "flush_ms": self.flush_seconds.snapshot(scale=1000, digits=1),
+            "spill_bytes": spill_bytes,
+            **self.stats,
+        }
+
+
+# Global writer used by rag_service
+citation_log = CitationLogWriter()
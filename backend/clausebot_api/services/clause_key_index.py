@@ -0,0 +1,237 @@
+"""
+ClauseBot Clause Key Index - in-memory exact-match lookups for PriorityRouter
+
+Priority 1 (NLM ID + clause) and Priority 2 (clause / ASME reference +
+keywords) used to send a filtered select on clause_embeddings to Supabase
+for every query. Both are pure key lookups on a table that only changes at
+ingestion, so each worker keeps the NLM columns of every clause in memory
+with three maps:
+
+    by_nlm[nlm_source_id]      -> rows
+    by_section[section]        -> rows
+    by_asme["IX QW-200.1"]     -> rows (normalized ASME reference)
+
+ASME references in code_reference_primary ("ASME IX QW-200.1",
+"ASME Section IX QW-200.1") are normalized to "<section> <QW ref>" and
+indexed under every dotted prefix as well (QW-451.1.2 also under QW-451.1
+and QW-451), matching the substring filter the Supabase query used.
+
+A snapshot is one immutable set of maps swapped in whole, so lookups never
+see a half-built index. It is loaded at startup and refreshed:
+- on the cache bus "notify" events vector_index.announce_refresh() /
+  announce_insert() publish after ingestion (inserts fetch only those rows),
+- in the background once it is older than CLAUSE_KEY_INDEX_MAX_AGE, for
+  clauses loaded by SQL without an announcement. At most one background
+  reload is attempted per CLAUSE_KEY_INDEX_MAX_AGE, so while Supabase is
+  down lookups keep serving the stale snapshot instead of starting a
+  reload per request.
+
+Until the first snapshot is loaded, PriorityRouter falls back to querying
+Supabase.
+
+Configuration:
+    CLAUSE_KEY_INDEX_ENABLED=true
+    CLAUSE_KEY_INDEX_MAX_AGE=900     # seconds before a background reload
+
+Usage:
+    await clause_key_index.refresh()
+    rows = clause_key_index.lookup_nlm("Q032", section="8.15")
+"""
+import os
+import re
+import json
+import time
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence
+
+from clausebot_api.services.supabase_pool import supabase_pool
+from clausebot_api.services.vector_index import NOTIFY_PREFIX, _default_client
+
+NLM_TAG = "source: notebooklm"
+COLUMNS = (
+    "clause_id", "section", "content", "nlm_source_id", "nlm_timestamp",
+    "code_reference_primary", "sme_reviewer_initials", "cms_tag", "content_hash",
+)
+
+_ASME_REF = re.compile(r'ASME\s+(?:Section\s+)?([IVX]+)[\s,:]+(QW-\d+(?:\.\d+)*)', re.IGNORECASE)
+
+
+def asme_key(section: str, qw_ref: str) -> str:
+    """Normalized ASME reference, e.g. ("ix", "qw-200.1") -> "IX QW-200.1"."""
+    return f"{section.upper()} {qw_ref.upper().rstrip('.')}"
+
+
+def asme_keys(code_reference: Optional[str]) -> List[str]:
+    """Every normalized reference (and dotted prefix) in a code_reference_primary."""
+    keys: List[str] = []
+    for section, qw_ref in _ASME_REF.findall(code_reference or ""):
+        parts = qw_ref.upper().split(".")
+        for n in range(len(parts), 0, -1):
+            key = asme_key(section, ".".join(parts[:n]))
+            if key not in keys:
+                keys.append(key)
+    return keys
+
+
+class _Snapshot:
+    """Immutable maps over one set of rows (in clause_id order)."""
+
+    def __init__(self, rows: Sequence[Dict[str, Any]]):
+        self.rows = list(rows)
+        self.by_nlm: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_section: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_asme: Dict[str, List[Dict[str, Any]]] = {}
+        for row in self.rows:
+            if row.get("nlm_source_id"):
+                self.by_nlm.setdefault(row["nlm_source_id"], []).append(row)
+            if row.get("section"):
+                self.by_section.setdefault(row["section"], []).append(row)
+            for key in asme_keys(row.get("code_reference_primary")):
+                self.by_asme.setdefault(key, []).append(row)
+        self.built_at = time.time()
+
+
+def fetch_key_rows(client, page_size: int = 1000, clause_ids: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """Page the NLM columns of clause_embeddings (or just clause_ids) out of Supabase."""
+    rows: List[Dict[str, Any]] = []
+    start = 0
+    while True:
+        query = client.table("clause_embeddings").select(",".join(COLUMNS))
+        if clause_ids is not None:
+            query = query.in_("clause_id", list(clause_ids))
+        page = query.order("clause_id").range(start, start + page_size - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        start += page_size
+
+
+class ClauseKeyIndex:
+    """nlm_source_id / section / ASME reference -> clause_embeddings rows."""
+
+    def __init__(self, client=None, max_age: Optional[float] = None, enabled: Optional[bool] = None):
+        self._client = client
+        self.max_age = max_age if max_age is not None else float(os.getenv("CLAUSE_KEY_INDEX_MAX_AGE", "900"))
+        self.enabled = enabled if enabled is not None else (
+            os.getenv("CLAUSE_KEY_INDEX_ENABLED", "true").lower() == "true"
+        )
+        self._state: Optional[_Snapshot] = None
+        self._refreshing: Optional[asyncio.Task] = None
+        self._attempted_at = 0.0  # last background reload, successful or not
+        self.stats = {"lookups": 0, "refreshes": 0, "inserts": 0, "errors": 0}
+
+    @property
+    def ready(self) -> bool:
+        return self.enabled and self._state is not None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = _default_client()
+        return self._client
+
+    def load(self, rows: Sequence[Dict[str, Any]]) -> None:
+        """Swap in a snapshot of these rows."""
+        self._state = _Snapshot(rows)
+
+    async def refresh(self, clause_ids: Optional[Sequence[str]] = None) -> bool:
+        """Reload every row from Supabase, or replace just clause_ids in the current snapshot."""
+        client = self.client
+        if client is None:
+            print("⏭️  Clause key index refresh skipped - Supabase not configured")
+            return False
+        try:
+            start = time.perf_counter()
+            rows = await supabase_pool.run(fetch_key_rows, client, clause_ids=clause_ids)
+            if clause_ids is not None and self._state is not None:
+                changed = {r["clause_id"] for r in rows} | set(clause_ids)
+                kept = [r for r in self._state.rows if r["clause_id"] not in changed]
+                rows = sorted(kept + rows, key=lambda r: r["clause_id"])
+                self.stats["inserts"] += 1
+            elif clause_ids is not None:
+                # Nothing loaded yet: an insert is as good as a full load
+                return await self.refresh()
+            else:
+                self.stats["refreshes"] += 1
+            self.load(rows)
+            print(
+                f"✅ Clause key index: {len(rows)} rows, {len(self._state.by_nlm)} NLM IDs "
+                f"({(time.perf_counter() - start) * 1000:.0f} ms)"
+            )
+            return True
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"⚠️  Clause key index refresh failed: {e}")
+            return False
+
+    def refresh_in_background(self, clause_ids: Optional[Sequence[str]] = None) -> None:
+        """Schedule refresh() on the running loop; a full reload already in flight absorbs the rest."""
+        if self._refreshing is not None and not self._refreshing.done() and clause_ids is None:
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(self.refresh(clause_ids))
+        except RuntimeError:
+            return
+        if clause_ids is None:
+            self._refreshing = task
+
+    def _snapshot(self) -> Optional[_Snapshot]:
+        state = self._state if self.enabled else None
+        now = time.time()
+        if state is not None and self.max_age and now - max(state.built_at, self._attempted_at) > self.max_age:
+            self._attempted_at = now
+            self.refresh_in_background()
+        if state is not None:
+            self.stats["lookups"] += 1
+        return state
+
+    def lookup_nlm(self, nlm_source_id: str, section: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """Rows with this nlm_source_id and section; None when no snapshot is loaded."""
+        state = self._snapshot()
+        if state is None:
+            return None
+        if section is None:
+            # .eq('section', None) never matched: no NLM match without a clause
+            return []
+        return [r for r in state.by_nlm.get(nlm_source_id, ()) if r.get("section") == section]
+
+    def lookup_section(self, section: str, cms_tag: Optional[str] = NLM_TAG) -> Optional[List[Dict[str, Any]]]:
+        state = self._snapshot()
+        if state is None:
+            return None
+        return [r for r in state.by_section.get(section, ()) if cms_tag is None or r.get("cms_tag") == cms_tag]
+
+    def lookup_asme(self, section: str, qw_ref: str, cms_tag: Optional[str] = NLM_TAG) -> Optional[List[Dict[str, Any]]]:
+        state = self._snapshot()
+        if state is None:
+            return None
+        rows = state.by_asme.get(asme_key(section, qw_ref), ())
+        return [r for r in rows if cms_tag is None or r.get("cms_tag") == cms_tag]
+
+    def on_invalidation(self, event: Dict[str, str]) -> None:
+        """Cache-bus listener for vector_index.announce_refresh() / announce_insert()."""
+        target = event.get("target") or ""
+        if event.get("op") != "notify" or not target.startswith(NOTIFY_PREFIX):
+            return
+        try:
+            message = json.loads(target[len(NOTIFY_PREFIX):])
+        except ValueError:
+            return
+        self.refresh_in_background(list(message["insert"]) if message.get("insert") else None)
+
+    def health(self) -> Dict[str, Any]:
+        state = self._state
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "rows": len(state.rows) if state else 0,
+            "nlm_ids": len(state.by_nlm) if state else 0,
+            "sections": len(state.by_section) if state else 0,
+            "asme_refs": len(state.by_asme) if state else 0,
+            "age_seconds": round(time.time() - state.built_at, 1) if state else None,
+            **self.stats,
+        }
+
+
+# Global index used by PriorityRouter
+clause_key_index = ClauseKeyIndex()
@@ -0,0 +1,270 @@
+"""
+ClauseBot Context Packer - token-budgeted RAG context
+
+generate_rag_response used to paste the full content of every retrieved
+clause into the prompt, so long table clauses could run to thousands of
+tokens. pack_context builds the context within RAG_CONTEXT_TOKEN_BUDGET
+instead:
+
+1. Overlapping parent/child sections (same standard, one section an
+   ancestor of the other, e.g. 5.7 and 5.7.1) are deduped: when most of
+   one clause's passages already appear in the other, only the more
+   relevant of the two is kept.
+2. Each clause is split into passages (paragraphs, then lines for tables,
+   then sentences) and trimmed to its most query-relevant passages, at
+   most RAG_CONTEXT_CLAUSE_MAX_TOKENS, kept in document order with "[...]"
+   where text was cut. Passages already packed for another clause are
+   skipped. When not even the smallest relevant passage fits, the best
+   one is cut to the tokens left rather than dropping the clause.
+3. Clauses are packed in retrieval order until the budget is spent. The
+   top clause is always kept (with at least PASSAGE_MAX_TOKENS of text),
+   so the prompt never ends up with an empty context.
+
+Token counts come from one cached tiktoken encoding, and per-passage
+counts are memoized, since the same clauses recur across requests.
+
+Configuration:
+    RAG_CONTEXT_PACKING=true
+    RAG_CONTEXT_TOKEN_BUDGET=3000        # tokens for all clauses together
+    RAG_CONTEXT_CLAUSE_MAX_TOKENS=800    # tokens per clause
+
+Usage:
+    packed = pack_context(query, clauses)
+    prompt = template.format(retrieved_context=packed.text, ...)
+"""
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence
+
+from clausebot_api.services.vector_index import text_rank
+
+TOKENIZER = "cl100k_base"
+PASSAGE_MAX_TOKENS = 80
+TRIM_MARKER = "[...]"
+# Share of a clause's passages found in a related section to count as a duplicate
+OVERLAP_THRESHOLD = 0.8
+
+_PARAGRAPH = re.compile(r"\n\s*\n")
+_SENTENCE = re.compile(r"(?<=[.;:])\s+(?=[A-Z0-9(])")
+_WS = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1)
+def get_encoding():
+    import tiktoken
+    return tiktoken.get_encoding(TOKENIZER)
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    return len(get_encoding().encode(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """The leading max_tokens tokens of text."""
+    encoding = get_encoding()
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max(0, max_tokens)]).rstrip()
+
+
+@dataclass
+class PackedContext:
+    """Packed clause context and what packing saved."""
+    text: str
+    clauses: List[Any]
+    tokens: int
+    full_tokens: int
+    deduped: List[str] = field(default_factory=list)
+    dropped: List[str] = field(default_factory=list)
+    trimmed: List[str] = field(default_factory=list)
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.full_tokens - self.tokens)
+
+    def summary(self) -> dict:
+        return {
+            'context_tokens': self.tokens,
+            'context_tokens_full': self.full_tokens,
+            'context_tokens_saved': self.tokens_saved,
+            'clauses_deduped': self.deduped,
+            'clauses_dropped': self.dropped,
+            'clauses_trimmed': self.trimmed,
+        }
+
+
+def clause_header(idx: int, c: Any) -> str:
+    return f"=== CLAUSE {idx}: {c.standard} {c.section} - {c.title} ===\n"
+
+
+def clause_footer(c: Any) -> str:
+    return f"(Relevance: {c.similarity:.3f})\n"
+
+
+def format_clause(idx: int, c: Any, body: str) -> str:
+    return f"{clause_header(idx, c)}{body}\n{clause_footer(c)}"
+
+
+@lru_cache(maxsize=2048)
+def split_passages(content: str) -> tuple:
+    """Paragraphs; long ones split into lines, long lines into sentences."""
+    passages = []
+    for paragraph in _PARAGRAPH.split(content or ""):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if count_tokens(paragraph) <= PASSAGE_MAX_TOKENS:
+            passages.append(paragraph)
+            continue
+        for line in paragraph.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if count_tokens(line) <= PASSAGE_MAX_TOKENS:
+                passages.append(line)
+            else:
+                passages.extend(s for s in _SENTENCE.split(line) if s.strip())
+    return tuple(passages)
+
+
+def _norm(passage: str) -> str:
+    return _WS.sub(" ", passage).strip().lower()
+
+
+def _is_related(a: Any, b: Any) -> bool:
+    """Same standard and one section is an ancestor of the other."""
+    if a.standard != b.standard or not a.section or not b.section or a.section == b.section:
+        return False
+    return b.section.startswith(a.section + ".") or a.section.startswith(b.section + ".")
+
+
+def dedupe_related(clauses: Sequence[Any]) -> tuple:
+    """
+    Drop a clause whose passages mostly repeat a related (parent/child)
+    clause kept before it; clauses are in relevance order.
+
+    Returns:
+        (kept clauses, deduped clause IDs)
+    """
+    kept, deduped = [], []
+    for c in clauses:
+        mine = {_norm(p) for p in split_passages(c.content)}
+        duplicate = False
+        for k in kept:
+            if not _is_related(c, k):
+                continue
+            theirs = {_norm(p) for p in split_passages(k.content)}
+            if mine and len(mine & theirs) / len(mine) >= OVERLAP_THRESHOLD:
+                duplicate = True
+                break
+        if duplicate:
+            deduped.append(c.clause_id)
+        else:
+            kept.append(c)
+    return kept, deduped
+
+
+def rank_passages(query: str, passages: Sequence[str]) -> List[int]:
+    """Passage indices, most query-relevant first."""
+    # Relevance first; the opening passage (title / requirement) breaks ties
+    return sorted(
+        range(len(passages)),
+        key=lambda i: (-text_rank(query, passages[i]), i != 0, i),
+    )
+
+
+def select_passages(query: str, passages: Sequence[str], max_tokens: int, seen: set) -> List[int]:
+    """Indices of the most query-relevant passages that fit max_tokens, in document order."""
+    chosen, used = [], 0
+    for i in rank_passages(query, passages):
+        if _norm(passages[i]) in seen:
+            continue
+        cost = count_tokens(passages[i])
+        if used + cost > max_tokens:
+            continue
+        chosen.append(i)
+        used += cost
+    return sorted(chosen)
+
+
+def pack_context(
+    query: str,
+    clauses: Sequence[Any],
+    budget: Optional[int] = None,
+    clause_max_tokens: Optional[int] = None,
+) -> PackedContext:
+    """
+    Build the retrieved-clauses context within a token budget.
+
+    Args:
+        query: User query (passage relevance)
+        clauses: Retrieved clauses (clause_id, standard, section, title,
+            content, similarity), most relevant first
+        budget: Total context tokens (default RAG_CONTEXT_TOKEN_BUDGET)
+        clause_max_tokens: Per-clause tokens (default RAG_CONTEXT_CLAUSE_MAX_TOKENS)
+    """
+    full_parts = [format_clause(i, c, c.content) for i, c in enumerate(clauses, start=1)]
+    full_tokens = sum(count_tokens(p) for p in full_parts)
+
+    if os.getenv("RAG_CONTEXT_PACKING", "true").lower() != "true":
+        return PackedContext("\n".join(full_parts), list(clauses), full_tokens, full_tokens)
+
+    budget = budget or int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "3000"))
+    clause_max_tokens = clause_max_tokens or int(os.getenv("RAG_CONTEXT_CLAUSE_MAX_TOKENS", "800"))
+
+    kept, deduped = dedupe_related(clauses)
+    parts, included, dropped, trimmed = [], [], [], []
+    seen: set = set()
+    used = 0
+    for c in kept:
+        idx = len(included) + 1
+        frame = count_tokens(clause_header(idx, c)) + count_tokens(clause_footer(c)) + 2
+        room = min(clause_max_tokens, budget - used) - frame
+        if not included:
+            # Never lose the top clause, even to a budget smaller than its frame
+            room = max(room, PASSAGE_MAX_TOKENS)
+        passages = split_passages(c.content)
+        texts = list(passages)
+        chosen = select_passages(query, passages, room, seen) if room > 0 else []
+        cut_short = False
+        if not chosen and room > 0:
+            # Nothing fits whole: cut the best unseen passage to the room left
+            best = next((i for i in rank_passages(query, passages) if _norm(passages[i]) not in seen), None)
+            cut = truncate_tokens(passages[best], room - count_tokens(TRIM_MARKER) - 1) if best is not None else ""
+            if cut:
+                texts[best] = cut
+                chosen, cut_short = [best], True
+        if not chosen:
+            dropped.append(c.clause_id)
+            continue
+
+        pieces, last = [], -1
+        for i in chosen:
+            if i != last + 1:
+                pieces.append(TRIM_MARKER)
+            pieces.append(texts[i])
+            last = i
+        if cut_short or last != len(passages) - 1:
+            pieces.append(TRIM_MARKER)
+        if cut_short or len(chosen) < len(passages):
+            trimmed.append(c.clause_id)
+
+        part = format_clause(idx, c, "\n".join(pieces))
+        parts.append(part)
+        included.append(c)
+        seen.update(_norm(passages[i]) for i in chosen)
+        used += count_tokens(part)
+
+    return PackedContext(
+        text="\n".join(parts),
+        clauses=included,
+        tokens=count_tokens("\n".join(parts)) if parts else 0,
+        full_tokens=full_tokens,
+        deduped=deduped,
+        dropped=dropped,
+        trimmed=trimmed,
+    )
@@ -12,7 +12,7 @@ Usage:
     status = task_queue.get_job_status(job.id)
 """
 import os
-from typing import Optional
+from typing import List, Optional
 from redis import Redis
 from rq import Queue
 from rq.job import Job
@@ -83,6 +83,22 @@ class TaskQueue:
         from jobs.tasks import warm_cache_for_clause
         return self.default_queue.enqueue(warm_cache_for_clause, clause_num)
     
+    def enqueue_cache_warm_batch(self, clause_nums: List[str]) -> Optional[Job]:
+        """Enqueue one cache warming job for several clauses."""
+        if not self.is_enabled():
+            return None
+        
+        from jobs.tasks import warm_cache_for_clauses
+        return self.default_queue.enqueue(warm_cache_for_clauses, clause_nums)
+    
+    def enqueue_hot_key_warm(self, limit: Optional[int] = None) -> Optional[Job]:
+        """Enqueue a re-warm of the hottest cache keys (after deploy / sync)."""
+        if not self.is_enabled():
+            return None
+        
+        from jobs.tasks import warm_hot_keys
+        return self.default_queue.enqueue(warm_hot_keys, limit)
+    
     def get_job_status(self, job_id: str) -> Optional[dict]:
         """
         Get status of a job by ID.
@@ -3,12 +3,20 @@
 # Implements 3-tier priority system: Exact NLM match → Clause match → Generic NLP
 
 from __future__ import annotations
+import os
 import re
+import time
+import asyncio
+import inspect
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 from supabase import Client
 
+from clausebot_api.cache_metrics import Histogram, LATENCY_BUCKETS
+from clausebot_api.services.clause_key_index import ClauseKeyIndex, COLUMNS, NLM_TAG, clause_key_index
+from clausebot_api.services.supabase_pool import supabase_pool
+
 @dataclass
 class NLMMetadata:
     """NotebookLM SSOT metadata for content validation"""
@@ -35,7 +43,7 @@ class MiltmonNDTLogger:
     def __init__(self, supabase: Client):
         self.supabase = supabase
     
-    def log_fallback_query(
+    async def log_fallback_query(
         self,
         query: str,
         session_id: str,
@@ -64,7 +72,7 @@ class MiltmonNDTLogger:
             }
             
             # Log to dedicated Supabase table
-            self.supabase.table('miltmon_ndt_q_upload_log').insert(log_entry).execute()
+            await supabase_pool.execute(self.supabase.table('miltmon_ndt_q_upload_log').insert(log_entry))
             print(f"[MiltmonNDT Log] Logged fallback query: {query[:50]}...")
             
         except Exception as e:
@@ -77,11 +85,34 @@ class PriorityRouter:
     Priority 1: Exact NLM ID + Clause match
     Priority 2: Clause + Keyword match
     Priority 3: Generic NLP (with fallback logging)
+    
+    Tiers run one after another by default, or all at once in speculative
+    mode (PRIORITY_ROUTING_SPECULATIVE=true, opt-in); see route_query.
+    
+    Priority 1/2 lookups are served from the in-memory clause key index
+    (clause_key_index); Supabase is only queried until it is loaded.
     """
     
-    def __init__(self, supabase: Client):
+    def __init__(
+        self,
+        supabase: Client,
+        speculative: Optional[bool] = None,
+        key_index: Optional[ClauseKeyIndex] = None
+    ):
         self.supabase = supabase
         self.logger = MiltmonNDTLogger(supabase)
+        self.key_index = key_index if key_index is not None else clause_key_index
+        
+        # Speculative mode: start all tiers concurrently (PRIORITY_ROUTING_SPECULATIVE)
+        if speculative is None:
+            speculative = os.getenv("PRIORITY_ROUTING_SPECULATIVE", "false").lower() == "true"
+        self.speculative = speculative
+        
+        # Per-tier completion latency (seconds) and which tier answered
+        self.tier_seconds = {tier: Histogram(LATENCY_BUCKETS) for tier in ('p1', 'p2', 'generic')}
+        self.wins = {'p1': 0, 'p2': 0, 'generic': 0, 'none': 0}
+        self.tier_stats = {'cancelled': 0}
+        self.lookup_stats = {'index': 0, 'supabase': 0}
         
         # Regex patterns for detection
         self.nlm_id_pattern = re.compile(r'(NLM-[A-Z0-9-]+|Q\d{3,4})', re.IGNORECASE)
@@ -124,7 +155,7 @@ class PriorityRouter:
             'keywords': keywords
         }
     
-    def priority_1_match(
+    async def priority_1_match(
         self,
         query: str,
         query_metadata: Dict
@@ -141,14 +172,11 @@ class PriorityRouter:
         clause = query_metadata['clauses'][0][2] if query_metadata['clauses'] else None
         
         try:
-            # Query clause_embeddings for exact NLM + Clause match
-            result = self.supabase.table('clause_embeddings').select(
-                'clause_id, content, nlm_source_id, nlm_timestamp, '
-                'code_reference_primary, sme_reviewer_initials, cms_tag, content_hash'
-            ).eq('nlm_source_id', nlm_id).eq('section', clause).execute()
+            # Exact NLM + Clause match: in-memory index, Supabase until it is loaded
+            rows = await self._p1_rows(nlm_id, clause)
             
-            if result.data and len(result.data) > 0:
-                row = result.data[0]
+            if rows:
+                row = rows[0]
                 
                 # Verify CMS tag compliance
                 if row.get('cms_tag') != 'source: notebooklm':
@@ -177,7 +205,7 @@ class PriorityRouter:
         
         return None
     
-    def priority_2_match(
+    async def priority_2_match(
         self,
         query: str,
         query_metadata: Dict
@@ -203,26 +231,15 @@ class PriorityRouter:
             return None
         
         try:
-            # Query for clause + keyword match with NLM tag filter
-            query_builder = self.supabase.table('clause_embeddings').select(
-                'clause_id, content, nlm_source_id, nlm_timestamp, '
-                'code_reference_primary, sme_reviewer_initials, cms_tag, content_hash'
-            ).eq('cms_tag', 'source: notebooklm')
-            
-            # Match clause reference
-            if 'ASME' in clause_ref:
-                query_builder = query_builder.ilike('code_reference_primary', f'%{clause_ref}%')
-            else:
-                query_builder = query_builder.eq('section', clause_ref)
+            # Clause + keyword match with NLM tag filter
+            rows = await self._p2_rows(clause_ref, asme_refs[0] if asme_refs else None)
             
-            result = query_builder.limit(5).execute()
-            
-            if result.data and len(result.data) > 0:
+            if rows:
                 # Rank by keyword presence in content
                 best_match = None
                 best_score = 0
                 
-                for row in result.data:
+                for row in rows:
                     content_lower = row['content'].lower()
                     keyword_score = sum(1 for kw in keywords if kw.lower() in content_lower)
                     
@@ -253,7 +270,40 @@ class PriorityRouter:
         
         return None
     
-    def route_query(
+    async def _p1_rows(self, nlm_id: str, clause: Optional[str]) -> List[Dict]:
+        """clause_embeddings rows for an exact NLM ID + section."""
+        rows = self.key_index.lookup_nlm(nlm_id, clause)
+        if rows is not None:
+            self.lookup_stats['index'] += 1
+            return rows
+        
+        self.lookup_stats['supabase'] += 1
+        result = await supabase_pool.execute(
+            self.supabase.table('clause_embeddings').select(', '.join(COLUMNS))
+            .eq('nlm_source_id', nlm_id).eq('section', clause)
+        )
+        return result.data or []
+    
+    async def _p2_rows(self, clause_ref: str, asme_ref: Optional[Tuple]) -> List[Dict]:
+        """NLM-tagged rows for a section, or for an ASME reference (Section, QW-ref)."""
+        if asme_ref:
+            rows = self.key_index.lookup_asme(asme_ref[1], asme_ref[2])
+        else:
+            rows = self.key_index.lookup_section(clause_ref)
+        if rows is not None:
+            self.lookup_stats['index'] += 1
+            return rows
+        
+        self.lookup_stats['supabase'] += 1
+        query_builder = self.supabase.table('clause_embeddings').select(', '.join(COLUMNS)).eq('cms_tag', NLM_TAG)
+        if asme_ref:
+            query_builder = query_builder.ilike('code_reference_primary', f'%{clause_ref}%')
+        else:
+            query_builder = query_builder.eq('section', clause_ref)
+        result = await supabase_pool.execute(query_builder.limit(5))
+        return result.data or []
+    
+    async def route_query(
         self,
         query: str,
         session_id: str,
@@ -262,10 +312,18 @@ class PriorityRouter:
         """
         Main routing logic: Try Priority 1 → Priority 2 → Priority 3 (generic)
         
+        In speculative mode all three tiers start at once (P1/P2 lookups and
+        the generic retrieval with its query embedding); results are still
+        taken in priority order, and once a tier qualifies the lower tiers
+        still in flight are cancelled. Speculation pays for the generic
+        tier (an OpenAI embedding call) on every query, and work already
+        handed to a thread can't be cancelled, so it is off by default.
+        
         Args:
             query: User query
             session_id: Session ID for logging
-            generic_retrieval_callback: Function to call for Priority 3 generic retrieval
+            generic_retrieval_callback: Function (sync or async) to call for
+                Priority 3 generic retrieval
             
         Returns:
             Tuple of (best_match, all_retrieved_clauses)
@@ -275,26 +333,39 @@ class PriorityRouter:
         
         print(f"[Priority Router] Query metadata: {query_metadata}")
         
-        # Try Priority 1: Exact NLM ID + Clause
-        p1_match = self.priority_1_match(query, query_metadata)
-        if p1_match:
-            print(f"[Priority Router] ✅ Priority 1 match: {p1_match.match_reason}")
-            return p1_match, [{'clause_id': p1_match.clause_id, 'content': p1_match.content}]
+        start = time.perf_counter()
+        tiers = [
+            ('p1', lambda: self.priority_1_match(query, query_metadata)),
+            ('p2', lambda: self.priority_2_match(query, query_metadata)),
+            ('generic', lambda: self._generic_retrieval(generic_retrieval_callback, query)),
+        ]
+        pending = []
+        if self.speculative:
+            pending = [asyncio.ensure_future(self._timed(name, make(), start)) for name, make in tiers]
         
-        # Try Priority 2: Clause + Keyword
-        p2_match = self.priority_2_match(query, query_metadata)
-        if p2_match:
-            print(f"[Priority Router] ✅ Priority 2 match: {p2_match.match_reason}")
-            return p2_match, [{'clause_id': p2_match.clause_id, 'content': p2_match.content}]
+        try:
+            for i, (name, make) in enumerate(tiers):
+                result = await (pending[i] if pending else self._timed(name, make(), start))
+                if name == 'generic':
+                    generic_results = result
+                elif result:
+                    self.wins[name] += 1
+                    print(f"[Priority Router] ✅ Priority {result.priority_level} match: {result.match_reason}")
+                    return result, [{'clause_id': result.clause_id, 'content': result.content}]
+        finally:
+            for task in pending:
+                if not task.done():
+                    task.cancel()
+                    self.tier_stats['cancelled'] += 1
+                elif not task.cancelled() and task.exception() is not None:
+                    # A lower tier failed after a higher one already answered
+                    print(f"[Priority Router] Discarded tier error: {task.exception()}")
         
         # Fallback to Priority 3: Generic NLP retrieval
         print(f"[Priority Router] ⚠️ Falling back to Priority 3 (generic NLP)")
         
-        # Call generic retrieval (existing RAG service)
-        generic_results = generic_retrieval_callback(query)
-        
         # Log fallback for SME review
-        self.logger.log_fallback_query(
+        await self.logger.log_fallback_query(
             query=query,
             session_id=session_id,
             retrieved_clauses=generic_results,
@@ -303,6 +374,7 @@ class PriorityRouter:
         
         # Create Priority 3 match from best generic result
         if generic_results:
+            self.wins['generic'] += 1
             best_result = generic_results[0]
             p3_match = PriorityMatch(
                 priority_level=3,
@@ -315,5 +387,41 @@ class PriorityRouter:
             return p3_match, generic_results
         
         # No results at any priority level
+        self.wins['none'] += 1
         return None, []
-
+    
+    async def _generic_retrieval(self, callback, query: str) -> List[Dict]:
+        """Run the Priority 3 callback; sync callbacks go to a thread so they can overlap P1/P2."""
+        if inspect.iscoroutinefunction(callback):
+            results = await callback(query)
+        else:
+            results = await asyncio.to_thread(callback, query)
+            if inspect.isawaitable(results):
+                results = await results
+        return results or []
+    
+    async def _timed(self, tier: str, work, start: float):
+        """Await one tier and record when (since routing started) it finished."""
+        result = await work
+        self.tier_seconds[tier].observe(time.perf_counter() - start)
+        return result
+    
+    def stats(self) -> Dict:
+        """Execution mode, per-tier latency (ms) and win rates."""
+        routed = sum(self.wins.values())
+        return {
+            'mode': 'speculative' if self.speculative else 'sequential',
+            'routed': routed,
+            'wins': dict(self.wins),
+            'win_rate': {
+                tier: round(n / routed * 100, 2) if routed else 0.0
+                for tier, n in self.wins.items()
+            },
+            'tier_ms': {
+                tier: hist.snapshot(scale=1000, digits=1)
+                for tier, hist in self.tier_seconds.items()
+            },
+            'lookups': dict(self.lookup_stats),
+            'key_index': self.key_index.health(),
+            **self.tier_stats
+        }
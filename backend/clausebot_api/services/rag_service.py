@@ -3,13 +3,20 @@
 from __future__ import annotations
 
 import os
+import time
 import asyncio
-from typing import List, Optional, Dict
+from typing import AsyncIterator, List, Optional, Dict, Tuple
 from dataclasses import dataclass
-import tiktoken
 from openai import AsyncOpenAI
 from supabase import create_client, Client
 
+from clausebot_api.answer_cache import answer_cache
+from clausebot_api.embedding_cache import embedding_cache
+from clausebot_api.services.citation_log import citation_log
+from clausebot_api.services.context_packer import PackedContext, count_tokens, pack_context
+from clausebot_api.services.supabase_pool import supabase_pool
+from clausebot_api.services.vector_index import vector_index
+
 # Environment configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -23,9 +30,14 @@ if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
 # Initialize clients
 openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+citation_log.client = supabase
+
+EMBEDDING_MODEL = "text-embedding-3-large"
+CHAT_MODEL = "gpt-4o"
 
-# Token encoding for cost/usage tracking
-encoding = tiktoken.get_encoding("cl100k_base")
+# "local": in-process exact/quantized index, "ann": in-process IVF-PQ index
+# (both fall back to the Supabase RPC); "supabase": RPC only
+RAG_VECTOR_BACKEND = os.getenv("RAG_VECTOR_BACKEND", "local").lower()
 
 @dataclass
 class RetrievedClause:
@@ -60,10 +72,22 @@ USER QUERY:
 
 Answer (with citations):"""
 
+NO_RESULTS_ANSWER = "I couldn't find relevant clauses in the knowledge base to answer your question. Try rephrasing or consult the standard directly."
+
+async def _embed(text: str) -> List[float]:
+    resp = await openai_client.embeddings.create(
+        model=EMBEDDING_MODEL,
+        input=text
+    )
+    return resp.data[0].embedding
+
 async def generate_query_embedding(query: str) -> List[float]:
     """
     Generate embedding vector for a user query using OpenAI text-embedding-3-large.
     
+    Repeated questions (same text up to case and whitespace) are served
+    from the embedding cache instead of calling OpenAI again.
+    
     Args:
         query: User's compliance question
         
@@ -71,16 +95,12 @@ async def generate_query_embedding(query: str) -> List[float]:
         3072-dimensional embedding vector
     """
     try:
-        resp = await openai_client.embeddings.create(
-            model="text-embedding-3-large",
-            input=query
-        )
-        return resp.data[0].embedding
+        return await embedding_cache.get_or_embed(query, EMBEDDING_MODEL, _embed)
     except Exception as e:
         print(f"Error generating query embedding: {e}")
         raise
 
-def retrieve_relevant_clauses(
+async def retrieve_relevant_clauses(
     query_embedding: List[float],
     query_text: str,
     standard: Optional[str] = None,
@@ -90,6 +110,10 @@ def retrieve_relevant_clauses(
     """
     Retrieve relevant clauses using hybrid search (semantic + full-text).
     
+    Uses the in-process vector index (IVF-PQ candidates with
+    RAG_VECTOR_BACKEND=ann) when it is loaded and covers the requested
+    standard; otherwise (or on error) the Supabase RPC.
+    
     Args:
         query_embedding: 3072-dim vector from generate_query_embedding
         query_text: Original query text for full-text search
@@ -100,8 +124,22 @@ def retrieve_relevant_clauses(
     Returns:
         List of RetrievedClause objects
     """
+    if RAG_VECTOR_BACKEND in ("local", "ann"):
+        if vector_index.reload_due():
+            # load() parses meta.json and maps the vector files; keep it off the loop
+            await asyncio.to_thread(vector_index.load)
+        if vector_index.ready and vector_index.has_standard(standard):
+            try:
+                hits = vector_index.search_clauses(
+                    query_embedding, query_text, standard, top_k, threshold,
+                    ann=RAG_VECTOR_BACKEND == "ann",
+                )
+                return [RetrievedClause(**h) for h in hits]
+            except Exception as e:
+                print(f"Warning: local vector index failed, using Supabase: {e}")
+    
     try:
-        result = supabase.rpc(
+        result = await supabase_pool.execute(supabase.rpc(
             'search_clauses_hybrid',
             {
                 'query_embedding': query_embedding,
@@ -110,7 +148,7 @@ def retrieve_relevant_clauses(
                 'match_count': top_k,
                 'filter_standard': standard
             }
-        ).execute()
+        ))
         
         rows = result.data or []
         clauses = []
@@ -131,11 +169,53 @@ def retrieve_relevant_clauses(
         print(f"Error retrieving clauses: {e}")
         return []
 
+def build_prompt(query: str, retrieved_clauses: List[RetrievedClause]) -> Tuple[str, PackedContext, int]:
+    """
+    Compliance system prompt with the retrieved clauses packed as context.
+    
+    Returns:
+        (prompt, packed context, prompt token count)
+    """
+    packed = pack_context(query, retrieved_clauses)
+    prompt = COMPLIANCE_SYSTEM_PROMPT.format(
+        retrieved_context=packed.text,
+        user_query=query
+    )
+    # Template + query are small; the packer already counted the context
+    overhead = count_tokens(COMPLIANCE_SYSTEM_PROMPT.format(retrieved_context="", user_query=query))
+    return prompt, packed, overhead + packed.tokens
+
+def format_citations(retrieved_clauses: List[RetrievedClause]) -> List[Dict]:
+    return [
+        {
+            'clause_id': c.clause_id,
+            'standard': c.standard,
+            'section': c.section,
+            'title': c.title,
+            'similarity': c.similarity,
+            'citation_text': c.citation_text()
+        }
+        for c in retrieved_clauses
+    ]
+
+def log_citations(query: str, retrieved_clauses: List[RetrievedClause], session_id: str) -> None:
+    """Queue chat_citations rows (bulk-inserted in the background)."""
+    citation_log.enqueue([
+        {
+            'session_id': session_id,
+            'query': query,
+            'clause_id': c.clause_id,
+            'similarity_score': c.similarity,
+            'used_in_response': True
+        }
+        for c in retrieved_clauses
+    ])
+
 async def generate_rag_response(
     query: str,
     retrieved_clauses: List[RetrievedClause],
     session_id: str,
-    model: str = "gpt-4o",
+    model: str = CHAT_MODEL,
     temperature: float = 0.0
 ) -> Dict:
     """
@@ -151,24 +231,9 @@ async def generate_rag_response(
     Returns:
         Dict with 'answer', 'citations', and 'metadata'
     """
-    # Build retrieved context
-    context_parts = []
-    for idx, c in enumerate(retrieved_clauses, start=1):
-        context_parts.append(
-            f"=== CLAUSE {idx}: {c.standard} {c.section} - {c.title} ===\n"
-            f"{c.content}\n"
-            f"(Relevance: {c.similarity:.3f})\n"
-        )
-    retrieved_context = "\n".join(context_parts)
-    
-    # Build prompt
-    prompt = COMPLIANCE_SYSTEM_PROMPT.format(
-        retrieved_context=retrieved_context,
-        user_query=query
-    )
-    
-    # Token counting (approximate)
-    prompt_tokens = len(encoding.encode(prompt))
+    prompt, packed, prompt_tokens = build_prompt(query, retrieved_clauses)
+    # Cite only what the model was shown
+    cited = packed.clauses
     
     # Call OpenAI Chat Completion
     try:
@@ -184,40 +249,80 @@ async def generate_rag_response(
         print(f"Error calling OpenAI: {e}")
         raise
     
-    # Log citations to Supabase (best-effort, don't fail request)
-    for c in retrieved_clauses:
-        try:
-            supabase.table('chat_citations').insert({
-                'session_id': session_id,
-                'query': query,
-                'clause_id': c.clause_id,
-                'similarity_score': c.similarity,
-                'used_in_response': True
-            }).execute()
-        except Exception as e:
-            print(f"Warning: Failed to log citation for {c.clause_id}: {e}")
+    # Log citations to Supabase (queued, bulk-inserted in the background)
+    log_citations(query, cited, session_id)
     
     return {
         'answer': answer,
-        'citations': [
-            {
-                'clause_id': c.clause_id,
-                'standard': c.standard,
-                'section': c.section,
-                'title': c.title,
-                'similarity': c.similarity,
-                'citation_text': c.citation_text()
-            }
-            for c in retrieved_clauses
-        ],
+        'citations': format_citations(cited),
         'metadata': {
             'model': model,
             'prompt_tokens': prompt_tokens,
             'completion_tokens': completion_tokens,
-            'retrieval_count': len(retrieved_clauses)
+            'retrieval_count': len(retrieved_clauses),
+            **packed.summary()
         }
     }
 
+async def stream_rag_response(
+    query: str,
+    retrieved_clauses: List[RetrievedClause],
+    session_id: str,
+    model: str = CHAT_MODEL,
+    temperature: float = 0.0
+) -> AsyncIterator[Tuple[str, object]]:
+    """
+    Streaming variant of generate_rag_response.
+    
+    Yields ("citations", [...]) before the LLM is called, then
+    ("token", text) per content delta as it arrives, then ("metadata", {...})
+    with token counts. Citations are logged once the stream has ended.
+    """
+    prompt, packed, prompt_tokens = build_prompt(query, retrieved_clauses)
+    cited = packed.clauses
+    yield 'citations', format_citations(cited)
+    
+    completion_tokens = 0
+    start = time.perf_counter()
+    first_token_ms = None
+    
+    try:
+        stream = await openai_client.chat.completions.create(
+            model=model,
+            messages=[{"role": "system", "content": prompt}],
+            temperature=temperature,
+            max_tokens=1500,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        async for chunk in stream:
+            if chunk.usage:
+                prompt_tokens = chunk.usage.prompt_tokens
+                completion_tokens = chunk.usage.completion_tokens
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if first_token_ms is None:
+                    first_token_ms = round((time.perf_counter() - start) * 1000, 1)
+                yield 'token', delta
+    except Exception as e:
+        print(f"Error streaming from OpenAI: {e}")
+        raise
+    
+    yield 'metadata', {
+        'model': model,
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'retrieval_count': len(retrieved_clauses),
+        'llm_first_token_ms': first_token_ms,
+        'llm_total_ms': round((time.perf_counter() - start) * 1000, 1),
+        **packed.summary()
+    }
+    
+    # Only after the client has the whole answer
+    log_citations(query, cited, session_id)
+
 async def rag_pipeline(
     query: str,
     session_id: str,
@@ -227,6 +332,9 @@ async def rag_pipeline(
     """
     Full RAG pipeline: embed → retrieve → generate → log.
     
+    A near-duplicate of an earlier question that retrieves the same
+    clauses is answered from the semantic answer cache (no LLM call).
+    
     Args:
         query: User's compliance question
         session_id: Session identifier
@@ -240,7 +348,7 @@ async def rag_pipeline(
     query_embedding = await generate_query_embedding(query)
     
     # Step 2: Retrieve relevant clauses
-    clauses = retrieve_relevant_clauses(
+    clauses = await retrieve_relevant_clauses(
         query_embedding=query_embedding,
         query_text=query,
         standard=standard,
@@ -250,17 +358,102 @@ async def rag_pipeline(
     # Step 3: Handle no results
     if not clauses:
         return {
-            'answer': "I couldn't find relevant clauses in the knowledge base to answer your question. Try rephrasing or consult the standard directly.",
+            'answer': NO_RESULTS_ANSWER,
             'citations': [],
             'metadata': {'retrieval_count': 0}
         }
     
-    # Step 4: Generate response and log
+    # Step 4: Reuse a cached answer for this clause set if the question matches
+    cached = await answer_cache.lookup(query_embedding, standard, clauses, CHAT_MODEL)
+    if cached:
+        cited = cited_clauses(cached, clauses)
+        log_citations(query, cited, session_id)
+        return {
+            'answer': cached['answer'],
+            'citations': format_citations(cited),
+            'metadata': cached_metadata(cached, clauses)
+        }
+    
+    # Step 5: Generate response and log
     response = await generate_rag_response(
         query=query,
         retrieved_clauses=clauses,
         session_id=session_id
     )
+    await answer_cache.store(
+        query_embedding, standard, clauses, CHAT_MODEL,
+        response['answer'], response['metadata'], query,
+        cited=[c['clause_id'] for c in response['citations']]
+    )
     
     return response
 
+def cited_clauses(cached: Dict, clauses: List[RetrievedClause]) -> List[RetrievedClause]:
+    """Retrieved clauses that were in the cached answer's context (retrieval order)."""
+    cited = set(cached['cited'])
+    return [c for c in clauses if c.clause_id in cited]
+
+def cached_metadata(cached: Dict, clauses: List[RetrievedClause]) -> Dict:
+    """
+    Metadata for an answer served from the semantic answer cache.
+    
+    retrieval_count is the number of clauses retrieved, as on a freshly
+    generated answer (the cited subset can be smaller).
+    """
+    return dict(
+        cached['metadata'],
+        retrieval_count=len(clauses),
+        answer_cache={'similarity': cached['similarity'], 'query': cached['query']}
+    )
+
+async def rag_pipeline_stream(
+    query: str,
+    session_id: str,
+    standard: Optional[str] = None,
+    top_k: int = 5
+) -> AsyncIterator[Tuple[str, object]]:
+    """
+    Streaming RAG pipeline: embed → retrieve → stream events.
+    
+    Yields the same (event, data) pairs as stream_rag_response; with no
+    retrieved clauses, empty citations, the fallback answer as one token
+    and metadata.
+    """
+    query_embedding = await generate_query_embedding(query)
+    clauses = await retrieve_relevant_clauses(
+        query_embedding=query_embedding,
+        query_text=query,
+        standard=standard,
+        top_k=top_k
+    )
+    
+    if not clauses:
+        yield 'citations', []
+        yield 'token', NO_RESULTS_ANSWER
+        yield 'metadata', {'retrieval_count': 0}
+        return
+    
+    cached = await answer_cache.lookup(query_embedding, standard, clauses, CHAT_MODEL)
+    if cached:
+        cited = cited_clauses(cached, clauses)
+        yield 'citations', format_citations(cited)
+        yield 'token', cached['answer']
+        yield 'metadata', cached_metadata(cached, clauses)
+        log_citations(query, cited, session_id)
+        return
+    
+    tokens, citations = [], []
+    async for event, data in stream_rag_response(query=query, retrieved_clauses=clauses, session_id=session_id):
+        if event == 'citations':
+            citations = data
+        elif event == 'token':
+            tokens.append(data)
+        elif event == 'metadata':
+            metadata = data
+        yield event, data
+    
+    await answer_cache.store(
+        query_embedding, standard, clauses, CHAT_MODEL,
+        "".join(tokens), metadata, query,
+        cited=[c['clause_id'] for c in citations]
+    )
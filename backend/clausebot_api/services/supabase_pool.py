@@ -0,0 +1,101 @@
+"""
+ClauseBot Supabase Pool - run supabase-py calls without blocking the event loop
+
+supabase-py (postgrest) is synchronous: every .execute() is a full HTTP
+round trip. Called directly from an async handler it stalls the worker's
+event loop, so every other request on that worker waits for it. All
+Supabase calls on async paths (rag_service, rag_priority_routing,
+citation_log, welding resources routes) go through this pool instead:
+the call runs on a bounded thread pool and the handler awaits it.
+
+The bound keeps a slow Supabase from piling up threads (and connections);
+calls beyond it wait in the executor queue, reported as "waiting".
+
+Configuration:
+    SUPABASE_MAX_WORKERS=16    # concurrent Supabase calls per worker process
+
+Usage:
+    result = await supabase_pool.execute(supabase.table("t").select("*").eq("id", 1))
+    result = await supabase_pool.run(client.table("t").insert(rows).execute)
+"""
+import os
+import time
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from clausebot_api.cache_metrics import Histogram, LATENCY_BUCKETS
+
+
+class SupabasePool:
+    """Bounded thread pool for blocking Supabase calls."""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv("SUPABASE_MAX_WORKERS", "16"))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.in_flight = 0
+        self.submitted = 0
+        self.call_seconds = Histogram(LATENCY_BUCKETS)
+        self.stats = {"calls": 0, "errors": 0}
+        # Counters and histogram are updated from the pool's worker threads
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="supabase")
+        return self._executor
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Await fn(*args, **kwargs) running on the pool."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.submitted += 1
+        try:
+            return await loop.run_in_executor(self.executor, functools.partial(self._timed, fn, *args, **kwargs))
+        finally:
+            with self._lock:
+                self.submitted -= 1
+
+    def _timed(self, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            self.in_flight += 1
+        start = time.perf_counter()
+        failed = False
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.in_flight -= 1
+                self.stats["calls"] += 1
+                self.stats["errors"] += failed
+                self.call_seconds.observe(elapsed)
+
+    async def execute(self, query) -> Any:
+        """Await query.execute() for a postgrest request builder."""
+        return await self.run(query.execute)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def health(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "in_flight": self.in_flight,
+                "waiting": max(0, self.submitted - self.in_flight),
+                "call_ms": self.call_seconds.snapshot(scale=1000, digits=1),
+                **self.stats,
+            }
+
+
+# Global pool shared by every async Supabase caller in this process
+supabase_pool = SupabasePool()
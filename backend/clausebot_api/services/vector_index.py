@@ -0,0 +1,919 @@
+"""
+ClauseBot Vector Index - in-process exact cosine search over clause_embeddings
+
+Every RAG request used to call the Supabase search_clauses_hybrid RPC over
+HTTP (IVFFlat scan + to_tsvector per row). The corpus is a few thousand
+clauses, so it fits in memory: the index holds every clause vector in one
+contiguous float32 matrix with L2-normalized rows, and a query is a single
+matrix-vector product. Results are ordered by exact cosine similarity.
+
+Snapshot (VECTOR_INDEX_DIR):
+    meta.json                 # version, dim, row metadata, standard ranges
+    vectors-<version>.npy     # float32 (rows, dim), memory-mapped on load
+    vectors-<version>.int8.npy + scales-<version>.npy   # per-row scaled int8
+    vectors-<version>.f16.npy                           # float16
+    vectors-<version>.m256.npy, .m512.npy               # truncated, renormalized
+    ann-<version>.*.npy       # IVF-PQ lists, codes and codebooks (ann_index)
+    delta.json + delta-<stamp>.npy   # rows inserted since the snapshot was built
+
+Quantized search (VECTOR_INDEX_QUANTIZATION=int8|float16, opt-in): every
+row is scored against the quantized matrix (1/4 or 1/2 of the float32
+pages), then the top_k * VECTOR_INDEX_RESCORE candidates are rescored
+exactly against their float32 rows, so only those pages of the float32
+file are touched. Returned similarities are always exact. It trades
+latency for resident memory: every query dequantizes each scored block
+to float32 before the matmul, and NumPy has no fast float16 kernels. On
+3000 synthetic rows (scripts/benchmark_vector_index.py --synthetic 3000)
+the float32 scan is ~2 ms p50, int8 ~5 ms and float16 ~25 ms, and int8
+recall@k drops below 1.0 with a rescore of 1. The default is therefore
+the exact float32 scan; enable int8 only when the float32 pages don't fit
+in memory, and check recall with the benchmark first.
+
+Two-stage (Matryoshka) search (VECTOR_INDEX_TRUNCATE_DIM=256|512):
+text-embedding-3-large vectors stay meaningful when cut to their leading
+dimensions and renormalized. The first pass scores every row on the
+truncated matrix (12x / 6x fewer bytes than 3072 dims) for
+top_k * VECTOR_INDEX_TRUNCATE_CANDIDATES candidates; the second pass
+reranks them with the full vectors. Takes precedence over quantization.
+
+Per-stage latency histograms are kept on the index; with
+VECTOR_INDEX_RECALL_SAMPLE > 0 that share of searches also runs the exact
+scan and records first-pass (candidate) and final recall@k.
+
+ANN search (search(..., ann=True), RAG_VECTOR_BACKEND=ann): candidates come
+from the IVF-PQ index in ann_index instead of a scan of every row, then are
+rescored exactly like the quantized path. Its lists are per standard, so a
+standard filter costs no recall. Training it (k-means plus PQ codebooks per
+standard) is only done by the ingestion job (scripts/ingest_aws_d11.py) or
+scripts/build_vector_index.py; API workers just map the files. A snapshot a
+worker writes itself (rebuild from Supabase, delta compaction) has no ANN
+files, and ANN searches scan it exactly until the next ingestion build.
+
+Rows are sorted by standard, so a standard filter is a zero-copy slice of
+the matrix rather than a post-filter. meta.json is replaced atomically and
+names its vectors file, so a reader never sees a half-written snapshot.
+
+Incremental insertion: insert() appends rows to a small delta segment
+bound to the current snapshot version. Delta rows are scanned exactly and
+merged into every result (shadowing base rows with the same clause_id);
+once the delta passes VECTOR_INDEX_DELTA_MAX rows it is compacted into a
+new snapshot.
+
+Refresh: the ingestion script builds the snapshot itself, then calls
+announce_refresh() (or announce_insert(clause_ids) for a few clauses),
+which publishes a "notify" event on the cache bus. Each API worker
+rebuilds from Supabase in a background thread; workers sharing a disk
+take a file lock and skip snapshots built after the announced time, so
+they just reload the one already on disk.
+
+Configuration:
+    VECTOR_INDEX_DIR=backend/data/vector_index
+    VECTOR_INDEX_CHECK_SECONDS=30     # how often to look for a newer snapshot
+    VECTOR_INDEX_QUANTIZATION=none    # none | int8 | float16 (memory for latency)
+    VECTOR_INDEX_RESCORE=4            # quantized candidates per result to rescore
+    VECTOR_INDEX_TRUNCATE_DIM=0       # 256 | 512 enables two-stage search
+    VECTOR_INDEX_TRUNCATE_CANDIDATES=10
+    VECTOR_INDEX_RECALL_SAMPLE=0      # share of searches checked against exact
+    VECTOR_INDEX_NPROBE=8             # IVF lists visited per ANN query
+    VECTOR_INDEX_ANN_RESCORE=10       # ANN candidates per result to rescore
+    VECTOR_INDEX_DELTA_MAX=1000       # inserted rows before compaction
+
+Usage:
+    hits = vector_index.search_clauses(embedding, query, standard, top_k, threshold)
+"""
+import os
+import re
+import copy
+import json
+import time
+import random
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from clausebot_api.cache_metrics import Histogram, LATENCY_BUCKETS
+from clausebot_api.services.ann_index import IVFPQIndex, build_ivfpq, save_ivfpq
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX dev machines: no cross-process lock
+    fcntl = None
+
+DEFAULT_DIR = Path(__file__).resolve().parents[2] / "data" / "vector_index"
+META_FILE = "meta.json"
+DELTA_FILE = "delta.json"
+LOCK_FILE = ".lock"
+
+# Prefix of cache-bus "notify" targets meant for the vector index
+NOTIFY_PREFIX = "vector-index:"
+
+FIELDS = ("clause_id", "standard", "section", "title", "content")
+
+QUANTIZATIONS = ("int8", "float16")
+# Leading dimensions stored for two-stage search
+TRUNCATIONS = (256, 512)
+
+# Rows dequantized per matmul, bounds the float32 scratch buffer
+_SCORE_BLOCK = 256
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:\.[a-z0-9]+)*")
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Contiguous float32 copy with unit-length rows (zero rows stay zero)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms)
+
+
+def quantize_int8(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-row scaled int8: row ~= codes * scale, scale = max|row| / 127.
+
+    Returns:
+        (codes int8 (rows, dim), scales float32 (rows,))
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    scales = np.abs(matrix).max(axis=-1) / 127.0 if matrix.size else np.zeros(len(matrix), np.float32)
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def top_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first."""
+    if k < len(scores):
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(len(scores))
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def parse_embedding(value: Any) -> Optional[List[float]]:
+    """pgvector columns arrive through PostgREST as "[0.1,0.2,...]" strings."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return json.loads(value)
+    return list(value)
+
+
+def text_rank(query_text: str, document: str) -> float:
+    """
+    Share of query terms present in the document (0.0-1.0).
+
+    Used by context_packer to pick passages within a clause, not to rank
+    clauses; section numbers like "4.8.3" are kept as single terms.
+    """
+    terms = set(_TOKEN.findall(query_text.lower()))
+    if not terms:
+        return 0.0
+    doc_terms = set(_TOKEN.findall(document.lower()))
+    return len(terms & doc_terms) / len(terms)
+
+
+def write_snapshot(
+    path: Path,
+    rows: Sequence[Dict[str, Any]],
+    vectors: np.ndarray,
+    quantized: Sequence[str] = QUANTIZATIONS,
+    truncations: Sequence[int] = TRUNCATIONS,
+    ann: bool = False,
+) -> Dict[str, Any]:
+    """
+    Write a snapshot of rows (clause metadata), their vectors, the
+    quantized copies listed in `quantized`, truncated copies for
+    every dimension in `truncations` below the full one and, if `ann`,
+    the IVF-PQ index (ingestion only). Drops any delta segment.
+
+    Returns:
+        The new meta dict
+    """
+    path.mkdir(parents=True, exist_ok=True)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if len(rows) != len(vectors):
+        raise ValueError(f"{len(rows)} rows but {len(vectors)} vectors")
+
+    order = sorted(range(len(rows)), key=lambda i: (rows[i]["standard"], rows[i]["clause_id"]))
+    rows = [{f: rows[i].get(f) for f in FIELDS} for i in order]
+    dim = vectors.shape[1] if vectors.ndim == 2 else 0
+    vectors = normalize_rows(vectors[order].reshape(len(order), dim))
+
+    ranges: Dict[str, List[int]] = {}
+    for i, row in enumerate(rows):
+        start_end = ranges.setdefault(row["standard"], [i, i])
+        start_end[1] = i + 1
+
+    # Unique even for two snapshots written by one process in the same second
+    version = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{os.urandom(3).hex()}"
+    files = {"float32": f"vectors-{version}.npy"}
+    np.save(path / files["float32"], vectors)
+    if "int8" in quantized:
+        codes, scales = quantize_int8(vectors)
+        files["int8"] = f"vectors-{version}.int8.npy"
+        files["int8_scales"] = f"scales-{version}.npy"
+        np.save(path / files["int8"], codes)
+        np.save(path / files["int8_scales"], scales)
+    if "float16" in quantized:
+        files["float16"] = f"vectors-{version}.f16.npy"
+        np.save(path / files["float16"], vectors.astype(np.float16))
+    for trunc in truncations:
+        if 0 < trunc < dim:
+            files[f"m{trunc}"] = f"vectors-{version}.m{trunc}.npy"
+            np.save(path / files[f"m{trunc}"], normalize_rows(vectors[:, :trunc]))
+
+    ann_meta = None
+    if ann and len(rows):
+        arrays, ann_meta = build_ivfpq(vectors, {std: tuple(r) for std, r in ranges.items()})
+        ann_meta["files"] = save_ivfpq(path, version, arrays)
+
+    meta = {
+        "version": version,
+        "built_at": time.time(),
+        "dim": dim,
+        "count": len(rows),
+        "vectors_file": files["float32"],
+        "files": files,
+        "standards": ranges,
+        "ann": ann_meta,
+        "rows": rows,
+    }
+    tmp = path / f".{META_FILE}.{os.getpid()}.tmp"
+    tmp.write_text(json.dumps(meta), encoding="utf-8")
+    os.replace(tmp, path / META_FILE)
+
+    # The new snapshot already holds every delta row
+    try:
+        (path / DELTA_FILE).unlink()
+    except OSError:
+        pass
+
+    # Older vector files can go: readers that still map one keep the inode
+    current = set(files.values()) | set(ann_meta["files"].values() if ann_meta else ())
+    for pattern in ("vectors-*.npy", "scales-*.npy", "ann-*.npy", "delta-*.npy"):
+        for old in path.glob(pattern):
+            if old.name not in current:
+                try:
+                    old.unlink()
+                except OSError:
+                    pass
+    return meta
+
+
+def fetch_clause_rows(client, page_size: int = 500) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+    """Page every embedded clause out of Supabase."""
+    rows: List[Dict[str, Any]] = []
+    vectors: List[List[float]] = []
+    start = 0
+    while True:
+        result = (
+            client.table("clause_embeddings")
+            .select(",".join(FIELDS + ("embedding",)))
+            .order("clause_id")
+            .range(start, start + page_size - 1)
+            .execute()
+        )
+        page = result.data or []
+        for r in page:
+            emb = parse_embedding(r.pop("embedding", None))
+            if emb:
+                rows.append(r)
+                vectors.append(emb)
+        if len(page) < page_size:
+            break
+        start += page_size
+    return rows, np.asarray(vectors, dtype=np.float32)
+
+
+def _default_client():
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not (url and key):
+        return None
+    from supabase import create_client
+    return create_client(url, key)
+
+
+@contextmanager
+def _file_lock(path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+class _Snapshot:
+    """One loaded snapshot; replaced wholesale when a new version loads."""
+
+    def __init__(
+        self,
+        meta: Dict[str, Any],
+        vectors: np.ndarray,
+        mtime: float,
+        first_stage: str = "float32",
+        coarse: Optional[np.ndarray] = None,
+        scales: Optional[np.ndarray] = None,
+        coarse_dim: int = 0,
+    ):
+        self.meta = meta
+        self.vectors = vectors
+        # First-pass matrix: quantized or truncated (None: exact scan only)
+        self.first_stage = first_stage
+        self.coarse = coarse
+        self.scales = scales
+        self.coarse_dim = coarse_dim
+        self.rows: List[Dict[str, Any]] = meta["rows"]
+        self.ranges: Dict[str, Tuple[int, int]] = {
+            std: (int(a), int(b)) for std, (a, b) in meta["standards"].items()
+        }
+        self.mtime = mtime
+        self.ann: Optional[IVFPQIndex] = None
+        # Delta segment: rows base_count.. of self.rows, held in RAM
+        self.base_count = len(self.rows)
+        self.delta_vectors: Optional[np.ndarray] = None
+        self.delta_standards: Optional[np.ndarray] = None
+        self.delta_ids: frozenset = frozenset()
+        self.delta_mtime: Optional[float] = None
+        self.shadowed = 0
+
+    def with_delta(self, rows: List[Dict[str, Any]], vectors: np.ndarray, mtime: Optional[float]) -> "_Snapshot":
+        """Copy of this snapshot (sharing the base arrays) with a new delta."""
+        clone = copy.copy(self)
+        clone.rows = self.rows[:self.base_count] + list(rows)
+        clone.delta_vectors = vectors if len(rows) else None
+        clone.delta_standards = np.asarray([r["standard"] for r in rows], dtype=object)
+        clone.delta_ids = frozenset(r["clause_id"] for r in rows)
+        clone.delta_mtime = mtime
+        clone.shadowed = sum(1 for r in self.rows[:self.base_count] if r["clause_id"] in clone.delta_ids)
+        return clone
+
+    def delta_rows(self) -> List[Dict[str, Any]]:
+        return self.rows[self.base_count:]
+
+    def matrix_for(self, standard: Optional[str]) -> Tuple[np.ndarray, int]:
+        """(rows to search, offset of its first row) - a view, no copy."""
+        if standard is None:
+            return self.vectors, 0
+        start, end = self.ranges[standard]
+        return self.vectors[start:end], start
+
+    def coarse_scores(self, q: np.ndarray, standard: Optional[str]) -> np.ndarray:
+        """Approximate (batch, rows) scores from the first-pass matrix."""
+        start, end = self.ranges[standard] if standard is not None else (0, len(self.rows))
+        if self.coarse_dim:
+            q = normalize_rows(q[:, :self.coarse_dim])
+        if self.coarse.dtype == np.float32:
+            return q @ self.coarse[start:end].T
+
+        out = np.empty((len(q), end - start), dtype=np.float32)
+        for lo in range(start, end, _SCORE_BLOCK):
+            hi = min(lo + _SCORE_BLOCK, end)
+            block = self.coarse[lo:hi].astype(np.float32)
+            out[:, lo - start:hi - start] = q @ block.T
+        if self.scales is not None:
+            out *= self.scales[start:end]
+        return out
+
+
+class VectorIndex:
+    """Cosine top-k over an in-memory clause embedding matrix."""
+
+    def __init__(self, path: Optional[Path] = None, check_interval: Optional[float] = None):
+        self.path = Path(path or os.getenv("VECTOR_INDEX_DIR", str(DEFAULT_DIR)))
+        self.check_interval = check_interval if check_interval is not None else float(
+            os.getenv("VECTOR_INDEX_CHECK_SECONDS", "30")
+        )
+        self.quantization = os.getenv("VECTOR_INDEX_QUANTIZATION", "none").lower()
+        self.rescore = int(os.getenv("VECTOR_INDEX_RESCORE", "4"))
+        self.truncate_dim = int(os.getenv("VECTOR_INDEX_TRUNCATE_DIM", "0"))
+        self.truncate_candidates = int(os.getenv("VECTOR_INDEX_TRUNCATE_CANDIDATES", "10"))
+        self.recall_sample = float(os.getenv("VECTOR_INDEX_RECALL_SAMPLE", "0"))
+        self.nprobe = int(os.getenv("VECTOR_INDEX_NPROBE", "8"))
+        # PQ scores are coarser than int8, so more candidates are rescored
+        self.ann_rescore = int(os.getenv("VECTOR_INDEX_ANN_RESCORE", "10"))
+        self.delta_max = int(os.getenv("VECTOR_INDEX_DELTA_MAX", "1000"))
+        self._state: Optional[_Snapshot] = None
+        self._checked_at = 0.0
+        self._rebuild_thread: Optional[threading.Thread] = None
+        self._write_lock = threading.Lock()
+        self.stats = {
+            "searches": 0,
+            "queries": 0,
+            "ann_queries": 0,
+            "reloads": 0,
+            "rebuilds": 0,
+            "inserted": 0,
+            "compactions": 0,
+            "errors": 0,
+            "rescored": 0,
+            "last_search_ms": 0.0,
+        }
+        # Per-stage latency (seconds) and sampled recall vs. the exact scan
+        self.first_pass_seconds = Histogram(LATENCY_BUCKETS)
+        self.second_pass_seconds = Histogram(LATENCY_BUCKETS)
+        self.recall = {"samples": 0, "first_pass": 0.0, "final": 0.0}
+
+    @property
+    def ready(self) -> bool:
+        state = self._state
+        return state is not None and len(state.rows) > 0
+
+    def has_standard(self, standard: Optional[str], state: Optional["_Snapshot"] = None) -> bool:
+        state = state if state is not None else self._state
+        if state is None or standard is None or standard in state.ranges:
+            return state is not None
+        return state.delta_vectors is not None and bool((state.delta_standards == standard).any())
+
+    def load(self) -> bool:
+        """Map the snapshot on disk (only re-reads the delta if the version is loaded)."""
+        meta_path = self.path / META_FILE
+        try:
+            mtime = meta_path.stat().st_mtime
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            state = self._state
+            if state is not None and state.meta["version"] == meta["version"]:
+                state.mtime = mtime
+                self._state = self._load_delta(state)
+                return True
+            vectors = np.load(self.path / meta["vectors_file"], mmap_mode="r")
+            state = self._load_first_stage(meta, vectors, mtime)
+            if meta.get("ann"):
+                state.ann = IVFPQIndex(self.path, meta["ann"])
+            state = self._load_delta(state)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"⚠️  Vector index load failed: {e}")
+            return False
+
+        self._state = state
+        self.stats["reloads"] += 1
+        print(
+            f"✅ Vector index loaded: {meta['count']} clauses, dim {meta['dim']}, "
+            f"first pass {state.first_stage}, ann {'yes' if state.ann else 'no'}, "
+            f"delta {len(state.delta_ids)} ({meta['version']})"
+        )
+        return True
+
+    def _load_delta(self, state: _Snapshot) -> _Snapshot:
+        """Attach delta.json if it belongs to this snapshot version."""
+        delta_path = self.path / DELTA_FILE
+        try:
+            mtime = delta_path.stat().st_mtime
+        except OSError:
+            return state.with_delta([], None, None) if state.delta_vectors is not None else state
+        if mtime == state.delta_mtime:
+            return state
+        delta = json.loads(delta_path.read_text(encoding="utf-8"))
+        if delta.get("base_version") != state.meta["version"]:
+            # Left over from an older snapshot: ignore, but don't re-read it
+            state.delta_mtime = mtime
+            return state
+        vectors = np.load(self.path / delta["vectors_file"])
+        return state.with_delta(delta["rows"], vectors, mtime)
+
+    def _load_first_stage(self, meta: Dict[str, Any], vectors: np.ndarray, mtime: float) -> _Snapshot:
+        """Map the configured first-pass matrix (truncated, else quantized)."""
+        files = meta.get("files", {})
+        # Memory-mapped too, so workers share the pages
+        if self.truncate_dim:
+            name = f"m{self.truncate_dim}"
+            if name in files:
+                coarse = np.load(self.path / files[name], mmap_mode="r")
+                return _Snapshot(meta, vectors, mtime, name, coarse, coarse_dim=self.truncate_dim)
+            print(f"⚠️  Vector index has no {self.truncate_dim}-dim vectors - skipping two-stage search")
+
+        mode = self.quantization
+        if mode in ("", "none", "float32"):
+            return _Snapshot(meta, vectors, mtime)
+        if mode not in QUANTIZATIONS or mode not in files:
+            print(f"⚠️  Vector index has no {mode!r} vectors - searching float32")
+            return _Snapshot(meta, vectors, mtime)
+        coarse = np.load(self.path / files[mode], mmap_mode="r")
+        scales = np.load(self.path / files["int8_scales"]) if mode == "int8" else None
+        return _Snapshot(meta, vectors, mtime, mode, coarse, scales)
+
+    def reload_due(self) -> bool:
+        """
+        True when another process wrote a newer snapshot or delta (checked
+        at most every check_interval; only two stat calls).
+        """
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        try:
+            mtime = (self.path / META_FILE).stat().st_mtime
+        except OSError:
+            return False
+        try:
+            delta_mtime = (self.path / DELTA_FILE).stat().st_mtime
+        except OSError:
+            delta_mtime = None
+        state = self._state
+        return state is None or mtime != state.mtime or delta_mtime != state.delta_mtime
+
+    def maybe_reload(self) -> None:
+        """Pick up a snapshot written by another process (blocking; see reload_due)."""
+        if self.reload_due():
+            self.load()
+
+    def search(
+        self,
+        queries: Any,
+        top_k: int,
+        standard: Optional[str] = None,
+        ann: bool = False,
+        state: Optional["_Snapshot"] = None,
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Cosine top-k for one or more query vectors.
+
+        With ann (and an IVF-PQ index in the snapshot) candidates come from
+        the probed lists; else, with a first-pass matrix loaded (truncated
+        or quantized), from its scores. Candidates are rescored at full
+        precision; otherwise every row is scored exactly. Delta rows are
+        always scored exactly and merged in.
+
+        Args:
+            queries: (dim,) or (batch, dim) array-like
+            top_k: Results per query
+            standard: Only search this standard's rows
+            ann: Take candidates from the IVF-PQ index
+            state: Snapshot to search (default: the current one); row
+                indices refer to its rows, so callers that map them back
+                pass the snapshot they read
+
+        Returns:
+            Per query, [(row index, cosine similarity)] best first
+        """
+        state = state if state is not None else self._state
+        q = np.asarray(queries, dtype=np.float32)
+        if q.ndim == 1:
+            q = q[None, :]
+        if state is None or not state.rows or not self.has_standard(standard, state):
+            return [[] for _ in range(len(q))]
+
+        start = time.perf_counter()
+        q = normalize_rows(q)
+        # Room for base rows that delta rows replace
+        k_base = top_k + state.shadowed
+        if standard is not None and standard not in state.ranges:
+            results = [[] for _ in range(len(q))]
+        elif ann and state.ann is not None:
+            results = self._search_ann(state, q, k_base, standard, start)
+        else:
+            results = self._search_base(state, q, k_base, standard, start)
+        if state.delta_vectors is not None:
+            results = self._merge_delta(state, q, results, top_k, standard)
+
+        self.stats["searches"] += 1
+        self.stats["queries"] += len(q)
+        self.stats["last_search_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        return results
+
+    def _search_base(self, state, q, top_k, standard, start) -> List[List[Tuple[int, float]]]:
+        matrix, offset = state.matrix_for(standard)
+        if state.coarse is None:
+            scores = q @ matrix.T  # (batch, rows)
+            return [
+                [(int(i) + offset, float(row_scores[i])) for i in top_indices(row_scores, top_k)]
+                for row_scores in scores
+            ]
+
+        coarse = state.coarse_scores(q, standard)
+        first_done = time.perf_counter()
+        self.first_pass_seconds.observe(first_done - start)
+
+        multiplier = self.truncate_candidates if state.coarse_dim else self.rescore
+        n_candidates = top_k * max(1, multiplier)
+        results = [
+            self._rescore(matrix, query, top_k, np.sort(top_indices(row_scores, n_candidates)), offset)
+            for query, row_scores in zip(q, coarse)
+        ]
+        self.second_pass_seconds.observe(time.perf_counter() - first_done)
+        return results
+
+    def _search_ann(self, state, q, top_k, standard, start) -> List[List[Tuple[int, float]]]:
+        matrix, offset = state.matrix_for(standard)
+        n_candidates = top_k * max(1, self.ann_rescore)
+        candidates = [
+            np.sort(state.ann.candidates(query, n_candidates, standard, self.nprobe)) - offset
+            for query in q
+        ]
+        first_done = time.perf_counter()
+        self.first_pass_seconds.observe(first_done - start)
+
+        results = [self._rescore(matrix, query, top_k, cands, offset) for query, cands in zip(q, candidates)]
+        self.second_pass_seconds.observe(time.perf_counter() - first_done)
+        self.stats["ann_queries"] += len(q)
+        return results
+
+    def _rescore(self, matrix, query, top_k, candidates, offset) -> List[Tuple[int, float]]:
+        """Exact scores for sorted candidate rows of matrix."""
+        # Fancy indexing on the memmap reads only these rows
+        exact = np.asarray(matrix[candidates], dtype=np.float32) @ query
+        idx = top_indices(exact, top_k)
+        self.stats["rescored"] += len(candidates)
+        if self.recall_sample and random.random() < self.recall_sample:
+            self._sample_recall(matrix, query, top_k, candidates, idx)
+        return [(int(candidates[i]) + offset, float(exact[i])) for i in idx]
+
+    def _merge_delta(self, state, q, results, top_k, standard) -> List[List[Tuple[int, float]]]:
+        """Drop base hits replaced by delta rows and merge in the delta's top-k."""
+        ids = np.arange(len(state.delta_vectors))
+        if standard is not None:
+            ids = ids[state.delta_standards == standard]
+        scores = q @ state.delta_vectors[ids].T
+        merged = []
+        for base_hits, row_scores in zip(results, scores):
+            hits = [(r, sc) for r, sc in base_hits if state.rows[r]["clause_id"] not in state.delta_ids]
+            hits += [
+                (int(ids[i]) + state.base_count, float(row_scores[i]))
+                for i in top_indices(row_scores, top_k)
+            ]
+            hits.sort(key=lambda h: h[1], reverse=True)
+            merged.append(hits[:top_k])
+        return merged
+
+    def _sample_recall(self, matrix, query, top_k, candidates, final_idx) -> None:
+        """Compare one two-stage result with the exact scan."""
+        truth = set(top_indices(matrix @ query, top_k).tolist())
+        if not truth:
+            return
+        self.recall["samples"] += 1
+        self.recall["first_pass"] += len(truth & set(candidates.tolist())) / len(truth)
+        self.recall["final"] += len(truth & set(candidates[final_idx].tolist())) / len(truth)
+
+    def stage_stats(self) -> Dict[str, Any]:
+        """Per-stage latency (ms) and sampled recall@k."""
+        n = self.recall["samples"]
+        state = self._state
+        return {
+            "first_stage": state.first_stage if state is not None else None,
+            "first_pass_ms": self.first_pass_seconds.snapshot(scale=1000, digits=3),
+            "second_pass_ms": self.second_pass_seconds.snapshot(scale=1000, digits=3),
+            "recall_samples": n,
+            "first_pass_recall": round(self.recall["first_pass"] / n, 4) if n else None,
+            "final_recall": round(self.recall["final"] / n, 4) if n else None,
+        }
+
+    def search_clauses(
+        self,
+        query_embedding: Sequence[float],
+        query_text: str,
+        standard: Optional[str] = None,
+        top_k: int = 5,
+        threshold: float = 0.60,
+        ann: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Local replacement for the Supabase RPC: the top_k clauses above the
+        threshold by exact cosine similarity (candidates from the IVF-PQ
+        index if ann).
+
+        query_text is not scored. A term-overlap score has no stemming or
+        stopwords and a different scale from ts_rank, so blending it in
+        would reorder results away from the RPC's.
+
+        Returns:
+            Row dicts (clause_id, standard, section, title, content) plus
+            similarity and rank (always 0.0)
+        """
+        # One snapshot for the search and the row lookups: a reload in
+        # between would map indices onto another snapshot's rows
+        state = self._state
+        hits = []
+        for row, similarity in self.search(query_embedding, top_k, standard, ann=ann, state=state)[0]:
+            if similarity <= threshold:
+                break
+            hits.append(dict(state.rows[row], similarity=similarity, rank=0.0))
+        return hits
+
+    def rebuild(self, client=None, since: Optional[float] = None, ann: bool = False) -> bool:
+        """
+        Download clause_embeddings and write + load a fresh snapshot.
+
+        Args:
+            client: Supabase client (default: from SUPABASE_URL / key env)
+            since: Skip the download if the snapshot on disk was built after
+                this time (another worker already refreshed it)
+            ann: Also train the IVF-PQ index (ingestion job / CLI only)
+        """
+        with _file_lock(self.path / LOCK_FILE):
+            if since is not None:
+                try:
+                    meta = json.loads((self.path / META_FILE).read_text(encoding="utf-8"))
+                    if meta.get("built_at", 0) >= since:
+                        return self.load()
+                except (OSError, ValueError):
+                    pass
+
+            client = client or _default_client()
+            if client is None:
+                print("⏭️  Vector index rebuild skipped - Supabase not configured")
+                return False
+
+            start = time.perf_counter()
+            try:
+                rows, vectors = fetch_clause_rows(client)
+                write_snapshot(self.path, rows, vectors, ann=ann)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"⚠️  Vector index rebuild failed: {e}")
+                return False
+
+            self.stats["rebuilds"] += 1
+            print(f"✅ Vector index rebuilt: {len(rows)} clauses in {time.perf_counter() - start:.1f}s")
+            return self.load()
+
+    def rebuild_in_background(self, since: Optional[float] = None) -> bool:
+        """Start rebuild() in a daemon thread unless one is already running."""
+        if self._rebuild_thread is not None and self._rebuild_thread.is_alive():
+            return False
+        self._rebuild_thread = threading.Thread(
+            target=self.rebuild, kwargs={"since": since}, name="vector-index-rebuild", daemon=True
+        )
+        self._rebuild_thread.start()
+        return True
+
+    def insert(self, rows: Sequence[Dict[str, Any]], vectors: Any) -> int:
+        """
+        Add or replace clauses without rebuilding the snapshot.
+
+        Rows go to the delta segment (persisted next to the snapshot, so
+        other workers pick them up on their next check); past delta_max
+        rows the delta is compacted into a new snapshot.
+
+        Returns:
+            Number of delta rows after the insert
+        """
+        vectors = normalize_rows(np.asarray(vectors, dtype=np.float32).reshape(len(rows), -1))
+        rows = [{f: r.get(f) for f in FIELDS} for r in rows]
+        with self._write_lock, _file_lock(self.path / LOCK_FILE):
+            self.load()  # pick up inserts from other workers first
+            state = self._state
+            if state is None:
+                write_snapshot(self.path, rows, vectors)
+                self.load()
+                self.stats["inserted"] += len(rows)
+                return 0
+
+            new_ids = {r["clause_id"] for r in rows}
+            keep = [i for i, r in enumerate(state.delta_rows()) if r["clause_id"] not in new_ids]
+            delta_rows = [state.delta_rows()[i] for i in keep] + rows
+            old = state.delta_vectors[keep] if state.delta_vectors is not None else vectors[:0]
+            delta_vectors = np.concatenate([old, vectors])
+
+            stamp = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{time.monotonic_ns()}"
+            vectors_file = f"delta-{stamp}.npy"
+            np.save(self.path / vectors_file, delta_vectors)
+            tmp = self.path / f".{DELTA_FILE}.{os.getpid()}.tmp"
+            tmp.write_text(
+                json.dumps({"base_version": state.meta["version"], "vectors_file": vectors_file, "rows": delta_rows}),
+                encoding="utf-8",
+            )
+            os.replace(tmp, self.path / DELTA_FILE)
+            for old_file in self.path.glob("delta-*.npy"):
+                if old_file.name != vectors_file:
+                    try:
+                        old_file.unlink()
+                    except OSError:
+                        pass
+
+            self._state = state.with_delta(delta_rows, delta_vectors, (self.path / DELTA_FILE).stat().st_mtime)
+            self.stats["inserted"] += len(rows)
+
+        if len(delta_rows) > self.delta_max:
+            self.compact()
+        return len(self._state.delta_ids)
+
+    def compact(self) -> bool:
+        """Fold the delta segment into a new snapshot (without ANN lists, see module docstring)."""
+        with self._write_lock, _file_lock(self.path / LOCK_FILE):
+            self.load()
+            state = self._state
+            if state is None or state.delta_vectors is None:
+                return False
+            keep = [i for i, r in enumerate(state.rows[:state.base_count]) if r["clause_id"] not in state.delta_ids]
+            rows = [state.rows[i] for i in keep] + state.delta_rows()
+            vectors = np.concatenate([np.asarray(state.vectors[keep], dtype=np.float32), state.delta_vectors])
+            try:
+                write_snapshot(self.path, rows, vectors)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"⚠️  Vector index compaction failed: {e}")
+                return False
+            self.stats["compactions"] += 1
+            return self.load()
+
+    def _insert_from_supabase(self, clause_ids: List[str]) -> None:
+        client = _default_client()
+        if client is None:
+            print("⏭️  Vector index insert skipped - Supabase not configured")
+            return
+        try:
+            result = (
+                client.table("clause_embeddings")
+                .select(",".join(FIELDS + ("embedding",)))
+                .in_("clause_id", clause_ids)
+                .execute()
+            )
+            rows, vectors = [], []
+            for r in result.data or []:
+                emb = parse_embedding(r.pop("embedding", None))
+                if emb:
+                    rows.append(r)
+                    vectors.append(emb)
+            if rows:
+                self.insert(rows, np.asarray(vectors, dtype=np.float32))
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"⚠️  Vector index insert failed: {e}")
+
+    def on_invalidation(self, event: Dict[str, str]) -> None:
+        """Cache-bus listener for announce_refresh() / announce_insert()."""
+        target = event.get("target") or ""
+        if event.get("op") != "notify" or not target.startswith(NOTIFY_PREFIX):
+            return
+        try:
+            message = json.loads(target[len(NOTIFY_PREFIX):])
+        except ValueError:
+            return
+        if message.get("insert"):
+            threading.Thread(
+                target=self._insert_from_supabase, args=(list(message["insert"]),),
+                name="vector-index-insert", daemon=True,
+            ).start()
+        else:
+            self.rebuild_in_background(since=message.get("since") or time.time())
+
+    def start(self) -> None:
+        """Load the snapshot on disk, or build one in the background."""
+        if not self.load() and os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_SERVICE_ROLE_KEY"):
+            self.rebuild_in_background()
+
+    def health(self) -> Dict[str, Any]:
+        state = self._state
+        return {
+            "ready": self.ready,
+            "path": str(self.path),
+            "version": state.meta["version"] if state else None,
+            "count": len(state.rows) if state else 0,
+            "dim": state.meta["dim"] if state else 0,
+            "quantization": self.quantization,
+            "rescore": self.rescore,
+            "truncate_dim": self.truncate_dim,
+            "truncate_candidates": self.truncate_candidates,
+            "stages": self.stage_stats(),
+            "standards": {std: b - a for std, (a, b) in state.ranges.items()} if state else {},
+            "ann": {
+                "nlist": state.ann.nlist,
+                "m": state.ann.m,
+                "nprobe": self.nprobe,
+                "rescore": self.ann_rescore,
+            } if state is not None and state.ann is not None else None,
+            "delta": len(state.delta_ids) if state else 0,
+            "rebuilding": self._rebuild_thread is not None and self._rebuild_thread.is_alive(),
+            **self.stats,
+        }
+
+
+async def _announce(message: Dict[str, Any]) -> None:
+    from clausebot_api.cache import KVCache
+
+    kv = KVCache()
+    try:
+        await kv.bus.publish("notify", NOTIFY_PREFIX + json.dumps(message))
+    finally:
+        await kv.close()
+
+
+async def announce_refresh(since: Optional[float] = None) -> None:
+    """
+    Tell every API worker that clause_embeddings changed (after ingestion).
+
+    Args:
+        since: built_at of a snapshot the caller already wrote; workers
+            that share its disk reload it instead of downloading again
+    """
+    await _announce({"since": since or time.time()})
+
+
+async def announce_insert(clause_ids: Sequence[str]) -> None:
+    """Tell every API worker to add (or replace) just these clauses."""
+    await _announce({"insert": list(clause_ids)})
+
+
+# Global index used by rag_service
+vector_index = VectorIndex()
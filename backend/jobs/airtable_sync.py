@@ -15,7 +15,7 @@ from datetime import datetime
 from typing import List, Dict, Any, Optional
 from pyairtable import Api
 from supabase import create_client, Client
-from redis.asyncio import Redis
+from clausebot_api.cache import KVCache
 
 
 def get_supabase() -> Client:
@@ -178,33 +178,32 @@ async def upsert_to_supabase(
 
 async def warm_cache():
     """
-    Clear cache after sync to force fresh data.
-    Deletes all keys matching "cb:/v1/quiz*" and "cb:/v1/clause*"
+    Invalidate cached quiz/clause/search data after sync to force fresh data.
+    Bumps the generation of every CACHE_GENERATION_NAMESPACES namespace
+    (one INCR each) instead of scanning and deleting "cb:/v1/quiz*" etc.
+    Each bump is also published on the invalidation channel, so running
+    API workers drop their L1 copies immediately.
     """
     kv_url = os.getenv("KV_URL")
     if not kv_url:
         print("⏭️  KV_URL not set - skipping cache warm")
         return
     
-    print("🔥 Warming cache (clearing stale keys)")
+    print("🔥 Warming cache (invalidating stale namespaces)")
     
     try:
-        redis = Redis.from_url(kv_url, decode_responses=True)
+        kv = KVCache()
         
-        patterns = ["cb:/v1/quiz*", "cb:/v1/clause*", "cb:/v1/search*"]
-        total = 0
+        for namespace in sorted(kv.generation_namespaces):
+            gen = await kv.invalidate_namespace(namespace)
+            print(f"   ✅ {namespace} → generation {gen}")
         
-        for pattern in patterns:
-            count = 0
-            async for key in redis.scan_iter(match=pattern):
-                await redis.delete(key)
-                count += 1
-            total += count
-            if count > 0:
-                print(f"   ✅ Cleared {count} keys matching {pattern}")
+        await kv.close()
         
-        print(f"   ✅ Total keys cleared: {total}")
-        await redis.close()
+        # Refill the new generation with the hottest keys
+        from clausebot_api.services.queue import task_queue
+        if task_queue.enqueue_hot_key_warm() is not None:
+            print("   ✅ Hot key re-warm enqueued")
     
     except Exception as e:
         print(f"⚠️  Cache warm failed (non-fatal): {e}")
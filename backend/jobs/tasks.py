@@ -11,7 +11,7 @@ Example tasks:
 import os
 import asyncio
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from supabase import create_client, Client
 
 
@@ -197,14 +197,12 @@ def warm_cache_for_clause(clause_num: str) -> Dict[str, Any]:
     
     try:
         # Import here to avoid circular dependencies
-        from redis import Redis
-        import json
+        from clausebot_api.cache import KVCache
         
         kv_url = os.environ.get("KV_URL")
         if not kv_url:
             return {"ok": False, "error": "KV_URL not set"}
         
-        redis = Redis.from_url(kv_url, decode_responses=True)
         sb = get_supabase()
         
         # Fetch clause data
@@ -214,9 +212,17 @@ def warm_cache_for_clause(clause_num: str) -> Dict[str, Any]:
         
         clause_data = result.data[0]
         
-        # Store in cache
+        # Store in cache (through KVCache so the namespace generation applies)
         cache_key = f"cb:/v1/clause:{clause_num}"
-        redis.set(cache_key, json.dumps(clause_data), ex=300)
+        
+        async def _store():
+            kv = KVCache()
+            try:
+                await kv.set(cache_key, clause_data, ttl=300)
+            finally:
+                await kv.close()
+        
+        asyncio.run(_store())
         
         print(f"✅ Cache warmed for {clause_num}")
         
@@ -235,3 +241,113 @@ def warm_cache_for_clause(clause_num: str) -> Dict[str, Any]:
             "timestamp": datetime.utcnow().isoformat()
         }
 
+
+
+def warm_cache_for_clauses(clause_nums: List[str]) -> Dict[str, Any]:
+    """
+    Pre-warm cache for several clauses in one batch.
+    
+    One Supabase query and one pipelined cache write, instead of a
+    round trip per clause.
+    
+    Args:
+        clause_nums: Clauses to warm (e.g., ["4.1.2", "6.12"])
+    
+    Returns:
+        Dict with warm status and any clauses that were not found
+    """
+    print(f"🔥 Warming cache for {len(clause_nums)} clauses")
+    
+    try:
+        # Import here to avoid circular dependencies
+        from clausebot_api.cache import KVCache
+        
+        kv_url = os.environ.get("KV_URL")
+        if not kv_url:
+            return {"ok": False, "error": "KV_URL not set"}
+        
+        sb = get_supabase()
+        
+        # Fetch all requested clauses at once
+        result = sb.table("clauses").select("*").in_("clause_num", clause_nums).execute()
+        rows = {row["clause_num"]: row for row in (result.data or [])}
+        
+        mapping = {f"cb:/v1/clause:{num}": row for num, row in rows.items()}
+        
+        async def _store():
+            kv = KVCache()
+            try:
+                await kv.set_many(mapping, ttl=300)
+            finally:
+                await kv.close()
+        
+        if mapping:
+            asyncio.run(_store())
+        
+        missing = [num for num in clause_nums if num not in rows]
+        print(f"✅ Cache warmed for {len(mapping)} clauses ({len(missing)} not found)")
+        
+        return {
+            "ok": True,
+            "count": len(mapping),
+            "missing": missing,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    
+    except Exception as e:
+        print(f"❌ Cache warm failed: {e}")
+        return {
+            "ok": False,
+            "error": str(e),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+
+def warm_hot_keys(limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Re-warm the hottest cache keys recorded by the API workers.
+    
+    Enqueued after a deploy (first worker to start) and after the
+    Airtable sync bumps cache generations.
+    
+    Args:
+        limit: Max keys to warm (default: whole hot set)
+    
+    Returns:
+        Dict with how many keys were considered and warmed
+    """
+    print(f"🔥 Warming hot cache keys (limit={limit or 'all'})")
+    
+    try:
+        # Import here to avoid circular dependencies; importing the routes
+        # registers their warm producers
+        from clausebot_api.cache import KVCache
+        from clausebot_api.cache_warming import CacheWarmer
+        import clausebot_api.routes.quiz  # noqa: F401
+        
+        if not os.environ.get("KV_URL"):
+            return {"ok": False, "error": "KV_URL not set"}
+        
+        async def _warm():
+            kv = KVCache()
+            try:
+                return await CacheWarmer(kv).warm_all(limit)
+            finally:
+                await kv.close()
+        
+        stats = asyncio.run(_warm())
+        print(f"✅ Warmed {stats['warmed']}/{stats['considered']} hot keys in {stats['elapsed_ms']}ms")
+        
+        return {
+            "ok": True,
+            **stats,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    
+    except Exception as e:
+        print(f"❌ Hot key warm failed: {e}")
+        return {
+            "ok": False,
+            "error": str(e),
+            "timestamp": datetime.utcnow().isoformat()
+        }
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# benchmark_supabase_concurrency.py
+# Concurrent throughput of async handlers that call supabase-py directly
+# (blocking the event loop) vs. through clausebot_api supabase_pool
+#
+# Usage (from backend/):
+#   python scripts/benchmark_supabase_concurrency.py
+#   python scripts/benchmark_supabase_concurrency.py --requests 200 --concurrency 50 --latency-ms 80
+#   python scripts/benchmark_supabase_concurrency.py --live --table clause_embeddings
+#
+# Offline mode (default) simulates a Supabase call with a blocking sleep of
+# --latency-ms, which is what a synchronous postgrest HTTP request does to
+# the calling thread. --live runs a one-row select against the real
+# project (SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY).
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from clausebot_api.services.supabase_pool import SupabasePool
+
+
+class SimulatedQuery:
+    """Stands in for a postgrest request builder with a fixed round trip."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def execute(self):
+        time.sleep(self.latency)
+        return {"data": []}
+
+
+def make_query_factory(args) -> Callable:
+    if not args.live:
+        return lambda: SimulatedQuery(args.latency_ms / 1000)
+
+    from supabase import create_client
+
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not (url and key):
+        raise RuntimeError("SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY not set (omit --live to simulate)")
+    client = create_client(url, key)
+    return lambda: client.table(args.table).select("*").limit(1)
+
+
+async def run_mode(mode: str, factory: Callable, requests: int, concurrency: int, pool: SupabasePool) -> Dict:
+    """Fire `requests` handler calls, at most `concurrency` at a time."""
+    gate = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    lag: List[float] = []
+    done = asyncio.Event()
+
+    async def handler():
+        async with gate:
+            start = time.perf_counter()
+            query = factory()
+            if mode == "blocking":
+                query.execute()
+            else:
+                await pool.execute(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    async def probe():
+        # How late a 10 ms timer fires = how long other requests were stalled
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag.append((time.perf_counter() - start - 0.01) * 1000)
+
+    probe_task = asyncio.ensure_future(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(handler() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await probe_task
+
+    return {
+        'mode': mode,
+        'requests': requests,
+        'seconds': elapsed,
+        'throughput_rps': requests / elapsed,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'max_loop_lag_ms': float(max(lag)) if lag else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark blocking vs. pooled Supabase calls from async handlers")
+    parser.add_argument("--requests", type=int, default=100, help="Handler calls per mode")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent in-flight handlers")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Simulated Supabase round trip")
+    parser.add_argument("--workers", type=int, default=None, help="Pool size (default: SUPABASE_MAX_WORKERS)")
+    parser.add_argument("--live", action="store_true", help="Query the real Supabase project")
+    parser.add_argument("--table", default="clause_embeddings", help="Table for --live")
+    parser.add_argument("--output", type=Path, default=None, help="Write the JSON report here")
+
+    args = parser.parse_args()
+    factory = make_query_factory(args)
+    pool = SupabasePool(args.workers)
+
+    async def run_all():
+        return [
+            await run_mode(mode, factory, args.requests, args.concurrency, pool)
+            for mode in ("blocking", "pooled")
+        ]
+
+    try:
+        runs = asyncio.run(run_all())
+    finally:
+        pool.shutdown()
+
+    print("=" * 72)
+    print(
+        f"Supabase concurrency benchmark: {args.requests} requests, concurrency {args.concurrency}, "
+        f"pool {pool.max_workers}, {'live' if args.live else f'simulated {args.latency_ms:.0f} ms'}"
+    )
+    print("=" * 72)
+    print(f"{'mode':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'max loop lag ms':>18}")
+    for run in runs:
+        print(
+            f"{run['mode']:<10}{run['throughput_rps']:>10.1f}{run['p50_ms']:>10.1f}"
+            f"{run['p95_ms']:>10.1f}{run['max_loop_lag_ms']:>18.1f}"
+        )
+    speedup = runs[1]['throughput_rps'] / runs[0]['throughput_rps']
+    print(f"\nThroughput: {speedup:.1f}x with the pool")
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'live': args.live, 'concurrency': args.concurrency, 'runs': runs}, f, indent=2)
+        print(f"Report saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# build_vector_index.py
+# Rebuild the vector index snapshot (with its IVF-PQ files) from Supabase
+# clause_embeddings and tell API workers to pick it up
+#
+# Usage (from backend/):
+#   python scripts/build_vector_index.py
+#   python scripts/build_vector_index.py --no-ann --index-dir data/vector_index
+#
+# API workers never train the ANN index themselves; run this after
+# clauses were loaded without scripts/ingest_aws_d11.py (e.g. by SQL).
+# Workers sharing VECTOR_INDEX_DIR map the new files; workers on another
+# disk rebuild from Supabase without ANN lists.
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from clausebot_api.services.vector_index import VectorIndex, announce_refresh
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="Build the vector index snapshot and announce it to API workers")
+    parser.add_argument("--index-dir", type=Path, default=None, help="Snapshot directory (default: VECTOR_INDEX_DIR)")
+    parser.add_argument("--no-ann", action="store_true", help="Skip training the IVF-PQ index")
+    parser.add_argument("--no-announce", action="store_true", help="Don't publish the refresh on the cache bus")
+    args = parser.parse_args()
+
+    index = VectorIndex(path=args.index_dir)
+    if not index.rebuild(ann=not args.no_ann):
+        print("❌ Vector index build failed")
+        return 1
+    print(f"✅ Vector index snapshot written: {index.path}")
+
+    if not args.no_announce:
+        await announce_refresh(since=index._state.meta["built_at"])
+        print("Vector index refresh announced")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
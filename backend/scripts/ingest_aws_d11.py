@@ -2,12 +2,16 @@
 # One-shot ingestion script for AWS D1.1 clauses
 # Reads JSON, generates embeddings, upserts to Supabase
 import os
+import sys
 import asyncio
 import json
 from pathlib import Path
 from openai import AsyncOpenAI
 from supabase import create_client
 
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
 # Environment configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -158,6 +162,20 @@ async def main():
         print(f"\nVerification: {result.count} total clauses in database")
     except Exception as e:
         print(f"Verification query failed: {e}")
+    
+    # Build the vector index snapshot (+ IVF-PQ lists) here, then tell API
+    # workers to pick it up; workers on another disk rebuild from Supabase
+    try:
+        from clausebot_api.services.vector_index import VectorIndex, announce_refresh
+        index = VectorIndex()
+        since = None
+        if index.rebuild(client=supabase, ann=True):
+            since = index._state.meta["built_at"]
+            print(f"Vector index snapshot written: {index.path}")
+        await announce_refresh(since=since)
+        print("Vector index refresh announced")
+    except Exception as e:
+        print(f"Vector index refresh announce failed: {e}")
 
 if __name__ == "__main__":
     print("="*60)
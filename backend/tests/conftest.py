@@ -0,0 +1,195 @@
+"""
+Shared test doubles and fixtures (no Valkey/Redis, Supabase or OpenAI required)
+"""
+import fnmatch
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from clausebot_api.cache import KVCache
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the redis.asyncio commands KVCache uses."""
+
+    def __init__(self):
+        self.store = {}
+        self.expiry = {}
+        self.published = []
+
+    def _alive(self, key):
+        exp = self.expiry.get(key)
+        if exp is not None and exp <= time.time():
+            self.store.pop(key, None)
+            self.expiry.pop(key, None)
+        return key in self.store
+
+    async def get(self, key):
+        return self.store.get(key) if self._alive(key) else None
+
+    async def set(self, key, value, ex=None, px=None, nx=False):
+        if nx and self._alive(key):
+            return None
+        self.store[key] = value
+        self.expiry.pop(key, None)
+        if ex:
+            self.expiry[key] = time.time() + ex
+        if px:
+            self.expiry[key] = time.time() + px / 1000
+        return True
+
+    async def mget(self, keys):
+        return [await self.get(k) for k in keys]
+
+    async def pttl(self, key):
+        if not self._alive(key):
+            return -2
+        exp = self.expiry.get(key)
+        return int((exp - time.time()) * 1000) if exp else -1
+
+    async def incr(self, key):
+        value = int(self.store.get(key, 0)) + 1
+        self.store[key] = str(value)
+        return value
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 1
+
+    async def exists(self, key):
+        return int(self._alive(key))
+
+    async def delete(self, *keys):
+        return sum(1 for k in keys if self.store.pop(k, None) is not None)
+
+    async def scan_iter(self, match="*"):
+        for key in list(self.store):
+            if fnmatch.fnmatchcase(key, match):
+                yield key
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self):
+        results = []
+        for name, args, kwargs in self.calls:
+            results.append(await getattr(self.redis, name)(*args, **kwargs))
+        self.calls = []
+        return results
+
+
+@pytest.fixture
+def fake_redis():
+    """One FakeRedis, for tests that share it between several caches."""
+    return FakeRedis()
+
+
+@pytest.fixture
+def local_cache(monkeypatch):
+    """KVCache with Redis disabled and a small L1 enabled."""
+    monkeypatch.delenv("KV_URL", raising=False)
+    return KVCache(l1_max_entries=4, l1_max_bytes=1024, l1_ttl=30)
+
+
+@pytest.fixture
+def redis_cache(monkeypatch):
+    """KVCache backed by FakeRedis, L1 disabled."""
+    monkeypatch.delenv("KV_URL", raising=False)
+    kv = KVCache(l1_max_entries=0)
+    kv.redis = FakeRedis()
+    return kv
+
+
+@pytest.fixture
+def make_clause():
+    """Factory for retrieved-clause stand-ins (the RetrievedClause fields)."""
+    def make(section, content="", similarity=0.9, standard="AWS D1.1:2020", clause_id=None, title=None):
+        return SimpleNamespace(
+            clause_id=clause_id or f"d11_{section}", standard=standard, section=section,
+            title=title if title is not None else f"Clause {section}", content=content,
+            similarity=similarity, rank=0.0,
+        )
+    return make
+
+
+@pytest.fixture
+def rag_service(monkeypatch):
+    """rag_service imported with placeholder credentials (clients are never called)."""
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("SUPABASE_URL", "http://localhost:54321")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "test.service.key")
+    from clausebot_api.services import rag_service
+    return rag_service
+
+
+class FakeOpenAI:
+    """AsyncOpenAI stand-in for chat completions, plain or streamed."""
+
+    def __init__(self, tokens=("Preheat to ", "50F [AWS D1.1:2020 5.7].")):
+        self.tokens = list(tokens)
+        self.fail_after = None  # raise before this token index while streaming
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, stream=False, **kwargs):
+        self.calls += 1
+        usage = SimpleNamespace(prompt_tokens=10, completion_tokens=len(self.tokens))
+        if not stream:
+            message = SimpleNamespace(content="".join(self.tokens))
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+        return self._stream(usage)
+
+    async def _stream(self, usage):
+        for i, token in enumerate(self.tokens):
+            if i == self.fail_after:
+                raise ConnectionError("upstream reset")
+            yield SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+        yield SimpleNamespace(usage=usage, choices=[])
+
+
+@pytest.fixture
+def rag_stubs(rag_service, monkeypatch, local_cache):
+    """
+    RAG pipeline with every network call stubbed: two retrieved clauses,
+    of which context packing keeps only the first.
+    """
+    from clausebot_api.answer_cache import SemanticAnswerCache
+    from clausebot_api.services.context_packer import PackedContext
+
+    clauses = [
+        rag_service.RetrievedClause("d11_5.7", "AWS D1.1:2020", "5.7", "Preheat", "Minimum preheat", 0.91, 0.5),
+        rag_service.RetrievedClause("d11_5.8", "AWS D1.1:2020", "5.8", "Table 5.8", "Preheat table", 0.88, 0.4),
+    ]
+    stubs = SimpleNamespace(clauses=clauses, openai=FakeOpenAI(), logged=[])
+
+    async def embed(query):
+        return [1.0, 0.0, 0.0]
+
+    async def retrieve(**kwargs):
+        return list(clauses)
+
+    def build_prompt(query, retrieved):
+        packed = PackedContext("context", retrieved[:1], 5, 9, dropped=[c.clause_id for c in retrieved[1:]])
+        return "prompt", packed, 5
+
+    monkeypatch.setattr(rag_service, "generate_query_embedding", embed)
+    monkeypatch.setattr(rag_service, "retrieve_relevant_clauses", retrieve)
+    monkeypatch.setattr(rag_service, "build_prompt", build_prompt)
+    monkeypatch.setattr(rag_service, "openai_client", stubs.openai)
+    monkeypatch.setattr(rag_service, "answer_cache", SemanticAnswerCache(kv=local_cache, enabled=True))
+    monkeypatch.setattr(rag_service.citation_log, "enqueue", stubs.logged.extend)
+    return stubs
@@ -0,0 +1,31 @@
+"""
+Semantic answer cache tests (no Valkey/Redis required)
+"""
+import pytest
+
+from clausebot_api.answer_cache import SemanticAnswerCache
+
+
+@pytest.mark.asyncio
+async def test_answer_cache_matches_similar_queries_on_same_clause_set(local_cache, make_clause):
+    answers = SemanticAnswerCache(kv=local_cache, threshold=0.95)
+    clauses = [make_clause("5.8", "Preheat table 5.8"), make_clause("5.7", "Preheat")]
+    base = [1.0, 0.0, 0.0, 0.2]
+    await answers.store(base, "AWS D1.1:2020", clauses, "gpt-4o", "Use Table 5.8", {"completion_tokens": 4, "llm_total_ms": 900}, "min preheat A514")
+
+    # Close paraphrase + same clause set (any order): hit
+    hit = await answers.lookup([0.98, 0.05, 0.0, 0.2], "AWS D1.1:2020", clauses[::-1], "gpt-4o")
+    assert hit["answer"] == "Use Table 5.8" and hit["similarity"] > 0.95
+    assert hit["metadata"] == {"completion_tokens": 4}
+    assert hit["cited"] == ["d11_5.8", "d11_5.7"]
+
+    # Only the clauses the answer cited (its packed context) are recorded
+    await answers.store(base, "AWS D1.1:2020", clauses, "gpt-4o", "Use Table 5.8", {}, "min preheat A514", cited=["d11_5.8"])
+    assert (await answers.lookup(base, "AWS D1.1:2020", clauses, "gpt-4o"))["cited"] == ["d11_5.8"]
+
+    # Dissimilar query, other standard, or an edited clause: miss
+    assert await answers.lookup([0.0, 1.0, 0.0, 0.0], "AWS D1.1:2020", clauses, "gpt-4o") is None
+    assert await answers.lookup(base, "AWS D1.1:2025", clauses, "gpt-4o") is None
+    edited = [clauses[0], make_clause("5.7", "Preheat (revised)")]
+    assert await answers.lookup(base, "AWS D1.1:2020", edited, "gpt-4o") is None
+    assert answers.stats()["hits"] == 2
@@ -0,0 +1,586 @@
+"""
+KVCache unit tests (no Valkey/Redis required)
+"""
+import asyncio
+import json
+import time
+
+import pytest
+
+from clausebot_api.cache import KVCache, LocalLRU
+from clausebot_api.cache_codec import ValueCodec
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LocalLRU(max_entries=2, max_bytes=1024)
+    lru.set("a", 1, ttl=30, size=1)
+    lru.set("b", 2, ttl=30, size=1)
+    assert lru.get("a") == 1  # "b" is now least recently used
+    lru.set("c", 3, ttl=30, size=1)
+
+    assert lru.get("b") is None
+    assert lru.get("a") == 1
+    assert lru.get("c") == 3
+    assert lru.evictions == 1
+
+
+def test_lru_respects_byte_budget():
+    lru = LocalLRU(max_entries=10, max_bytes=100)
+    lru.set("a", "x", ttl=30, size=60)
+    lru.set("b", "y", ttl=30, size=60)
+
+    assert lru.get("a") is None
+    assert lru.bytes == 60
+    # Values larger than the whole budget are never stored
+    assert lru.set("huge", "z", ttl=30, size=101) is False
+
+
+def test_lru_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("clausebot_api.cache.time.monotonic", lambda: now[0])
+    lru = LocalLRU(max_entries=10, max_bytes=1024)
+    lru.set("a", 1, ttl=5, size=1)
+
+    now[0] += 6
+    assert lru.get("a") is None
+    assert len(lru) == 0
+
+
+@pytest.mark.asyncio
+async def test_l1_serves_without_redis(local_cache):
+    calls = []
+
+    def producer():
+        calls.append(1)
+        return {"items": [1, 2, 3]}
+
+    first = await local_cache.get_or_set("cb:/v1/quiz:abc", producer)
+    second = await local_cache.get_or_set("cb:/v1/quiz:abc", producer)
+
+    assert first == second == {"items": [1, 2, 3]}
+    assert len(calls) == 1
+    assert local_cache.l1.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_l1_ttl_capped_by_redis_ttl(local_cache):
+    await local_cache.set("k", {"v": 1}, ttl=5)
+    expires_at, _, _ = local_cache.l1._data["k"]
+    assert expires_at - time.monotonic() <= 5
+
+
+@pytest.mark.asyncio
+async def test_delete_pattern_clears_l1(local_cache):
+    await local_cache.set("cb:/v1/quiz:a", 1)
+    await local_cache.set("cb:/v1/clause:b", 2)
+
+    await local_cache.delete_pattern("cb:/v1/quiz*")
+
+    assert await local_cache.get("cb:/v1/quiz:a") is None
+    assert await local_cache.get("cb:/v1/clause:b") == 2
+
+
+@pytest.mark.asyncio
+async def test_health_check_reports_l1(local_cache):
+    health = await local_cache.health_check()
+    assert health["enabled"] is False
+    assert health["l1"]["max_entries"] == 4
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_producer(local_cache):
+    calls = []
+
+    async def producer():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"ok": True}
+
+    results = await asyncio.gather(
+        *[local_cache.get_or_set("cb:/v1/quiz:hot", producer) for _ in range(5)]
+    )
+
+    assert results == [{"ok": True}] * 5
+    assert len(calls) == 1
+    assert local_cache.counters["coalesced"] == 4
+    assert not local_cache._inflight
+
+
+@pytest.mark.asyncio
+async def test_producer_error_reaches_every_waiter(local_cache):
+    async def producer():
+        await asyncio.sleep(0.01)
+        raise ValueError("no records")
+
+    results = await asyncio.gather(
+        *[local_cache.get_or_set("cb:/v1/quiz:bad", producer) for _ in range(3)],
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(r, ValueError) for r in results)
+    assert local_cache.counters["producer_calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_served_while_refreshing(redis_cache):
+    redis_cache.set_stale_window("/v1/quiz", 600)
+    key = "cb:/v1/quiz:abc"
+    # Soft expiry already passed, hard expiry still ahead
+    redis_cache.redis.store[key] = json.dumps(
+        {"__cb_soft__": time.time() - 1, "v": {"version": 1}}
+    )
+
+    async def producer():
+        return {"version": 2}
+
+    stale = await redis_cache.get_or_set(key, producer)
+    assert stale == {"version": 1}
+    assert redis_cache.counters["stale_serves"] == 1
+
+    await asyncio.gather(*redis_cache._refreshing.values())
+    assert redis_cache.counters["background_refreshes"] == 1
+    assert await redis_cache.get(key) == {"version": 2}
+
+
+@pytest.mark.asyncio
+async def test_miss_does_not_join_failing_refresh(redis_cache):
+    key = "cb:/v1/quiz:abc"
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("airtable down")
+
+    # A refresh still running when the entry hard-expires
+    redis_cache._schedule_refresh(key, failing, None)
+    assert await redis_cache.get_or_set(key, lambda: {"version": 2}) == {"version": 2}
+    await asyncio.gather(*redis_cache._refreshing.values())
+    assert not redis_cache._refreshing and not redis_cache._inflight
+
+
+@pytest.mark.asyncio
+async def test_stale_window_extends_redis_expiry(redis_cache):
+    redis_cache.set_stale_window("/v1/quiz", 600)
+    await redis_cache.set("cb:/v1/quiz:abc", {"v": 1}, ttl=60)
+    await redis_cache.set("cb:/v1/clause:abc", {"v": 1}, ttl=60)
+
+    assert await redis_cache.redis.pttl("cb:/v1/quiz:abc") > 600 * 1000
+    assert await redis_cache.redis.pttl("cb:/v1/clause:abc") <= 60 * 1000
+
+
+@pytest.mark.asyncio
+async def test_invalidate_namespace_bumps_generation(redis_cache):
+    await redis_cache.set("cb:/v1/quiz:abc", {"v": 1})
+    await redis_cache.set("cb:/v1/clause:4.1", {"v": 1})
+
+    gen = await redis_cache.invalidate_namespace("/v1/quiz")
+
+    assert gen == 1
+    assert await redis_cache.get("cb:/v1/quiz:abc") is None
+    assert await redis_cache.get("cb:/v1/clause:4.1") == {"v": 1}
+
+    await redis_cache.set("cb:/v1/quiz:abc", {"v": 2})
+    assert "cb:/v1/quiz:g1:abc" in redis_cache.redis.store
+    assert await redis_cache.get("cb:/v1/quiz:abc") == {"v": 2}
+
+
+@pytest.mark.asyncio
+async def test_invalidate_unconfigured_namespace_raises(redis_cache):
+    with pytest.raises(ValueError):
+        await redis_cache.invalidate_namespace("/v1/unversioned")
+    assert "cb:/v1/unversioned" not in redis_cache.generation_namespaces
+
+
+@pytest.mark.asyncio
+async def test_generation_shared_across_instances(redis_cache):
+    other = KVCache(l1_max_entries=0)
+    other.redis = redis_cache.redis
+    other.gen_refresh_seconds = 0
+
+    await other.set("cb:/v1/search:q", ["hit"])
+    await redis_cache.invalidate_namespace("/v1/search")
+
+    assert await other.get("cb:/v1/search:q") is None
+
+
+@pytest.mark.asyncio
+async def test_get_many_and_set_many(redis_cache):
+    await redis_cache.set_many({"cb:/v1/clause:4.1": {"n": 1}, "cb:/v1/clause:4.2": {"n": 2}})
+
+    found = await redis_cache.get_many(
+        ["cb:/v1/clause:4.1", "cb:/v1/clause:4.2", "cb:/v1/clause:9.9"]
+    )
+
+    assert found == {"cb:/v1/clause:4.1": {"n": 1}, "cb:/v1/clause:4.2": {"n": 2}}
+
+
+@pytest.mark.asyncio
+async def test_get_or_set_many_calls_producer_with_misses_only(redis_cache):
+    await redis_cache.set("cb:/v1/clause:4.1", {"n": 1})
+    seen = []
+
+    def producer(missing):
+        seen.append(list(missing))
+        return {k: {"n": k[-1]} for k in missing}
+
+    keys = ["cb:/v1/clause:4.1", "cb:/v1/clause:4.2", "cb:/v1/clause:4.3"]
+    result = await redis_cache.get_or_set_many(keys, producer)
+
+    assert seen == [["cb:/v1/clause:4.2", "cb:/v1/clause:4.3"]]
+    assert list(result) == keys
+    assert await redis_cache.get("cb:/v1/clause:4.3") == {"n": "3"}
+
+
+def test_codec_reads_legacy_json():
+    codec = ValueCodec(serializer="json", compression="none")
+    assert codec.decode(b'{"a": 1}') == {"a": 1}
+    assert codec.decode('{"a": 1}') == {"a": 1}
+    # Uncompressed JSON is still written header-less
+    assert codec.encode({"a": 1}).startswith(b"{")
+
+
+@pytest.mark.parametrize("serializer", ["json", "msgpack"])
+@pytest.mark.parametrize("compression", ["zlib", "zstd"])
+def test_codec_round_trip_with_compression(serializer, compression):
+    codec = ValueCodec(serializer=serializer, compression=compression, compress_min_bytes=64)
+    value = {"items": [{"q": "Minimum preheat for A514?", "n": i} for i in range(50)]}
+
+    encoded = codec.encode(value)
+
+    assert encoded[0] < 0x09  # binary header byte
+    assert codec.decode(encoded) == value
+    assert codec.stats()["bytes_saved"] > 0
+
+
+def test_codec_skips_compression_below_threshold():
+    codec = ValueCodec(serializer="json", compression="zlib", compress_min_bytes=1024)
+    assert codec.encode({"a": 1}) == b'{"a":1}'
+
+
+def test_response_cache_bounds_and_sweeps(monkeypatch):
+    from api.response_cache import ResponseCache
+
+    now = [1000.0]
+    monkeypatch.setattr("api.response_cache.time.monotonic", lambda: now[0])
+    rc = ResponseCache(max_entries=2, max_bytes=1024, ttl=10, shared=False)
+
+    rc.set_local("AWS:4.1:explain", {"n": 1})
+    rc.set_local("AWS:4.2:explain", {"n": 2})
+    rc.set_local("AWS:4.3:explain", {"n": 3})
+    assert rc.get_local("AWS:4.1:explain") is None
+    assert rc.evictions == 1
+
+    now[0] += 11
+    assert rc.sweep() == 2
+    assert len(rc) == 0 and rc.bytes == 0
+    assert rc.stats()["expired"] == 2
+
+
+@pytest.mark.asyncio
+async def test_shared_response_cache_invalidates_every_worker(monkeypatch, fake_redis):
+    from api.response_cache import ResponseCache
+
+    monkeypatch.setenv("KV_URL", "redis://localhost:6379/0")
+    shared = fake_redis
+    worker_a = ResponseCache(ttl=60, shared=True)
+    worker_b = ResponseCache(ttl=60, shared=True)
+    assert worker_a.kv is not None and worker_a.stats()["shared"]
+    worker_a.kv.redis = worker_b.kv.redis = shared
+
+    await worker_a.set("AWS:4.1:explain", {"v": "old"})
+    assert await worker_b.get("AWS:4.1:explain") == {"v": "old"}
+    assert worker_b.shared_hits == 1
+
+    await worker_a.invalidate()
+    worker_b.kv.bus.handle(shared.published[-1][1])
+    assert len(worker_b) == 0
+    assert await worker_b.get("AWS:4.1:explain") is None
+
+    # A worker started after the clear resolves the new generation too
+    restarted = ResponseCache(ttl=60, shared=True)
+    restarted.kv.redis = shared
+    assert await restarted.get("AWS:4.1:explain") is None
+
+    # Namespace left out of CACHE_GENERATION_NAMESPACES: SCAN + DEL instead
+    monkeypatch.setenv("CACHE_GENERATION_NAMESPACES", "/v1/quiz")
+    unversioned = ResponseCache(ttl=60, shared=True)
+    unversioned.kv.redis = shared
+    await unversioned.set("AWS:4.1:explain", {"v": "new"})
+    await unversioned.invalidate()
+    assert json.loads(shared.published[-1][1])["op"] == "pattern"
+    assert await unversioned.kv.get("cb:/v1/clauses:AWS:4.1:explain") is None
+
+
+@pytest.mark.asyncio
+async def test_telemetry_tracked_per_namespace(redis_cache):
+    await redis_cache.get_or_set("cb:/v1/quiz:a", lambda: {"q": 1})
+    await redis_cache.get_or_set("cb:/v1/quiz:a", lambda: {"q": 1})
+    await redis_cache.get("cb:/v1/clause:4.1")
+
+    quiz = redis_cache.telemetry.snapshot()["cb:/v1/quiz"]
+    assert quiz["hits"]["redis"] == 1
+    assert quiz["misses"] == 1
+    assert quiz["producer_ms"]["count"] == 1
+    assert quiz["value_bytes"]["count"] == 1
+    assert redis_cache.telemetry.snapshot()["cb:/v1/clause"]["misses"] == 1
+
+    text = redis_cache.telemetry.render_prometheus()
+    assert 'clausebot_cache_hits_total{namespace="cb:/v1/quiz",tier="redis"} 1' in text
+    assert 'clausebot_cache_producer_seconds_count{namespace="cb:/v1/quiz"} 1' in text
+
+
+def test_ttl_jitter_only_shortens(redis_cache):
+    redis_cache.ttl_jitter = 0.2
+    ttls = {redis_cache._jittered(300) for _ in range(200)}
+    assert min(ttls) >= 240 and max(ttls) <= 300
+    assert len(ttls) > 1
+
+
+@pytest.mark.asyncio
+async def test_xfetch_refreshes_early_near_expiry(redis_cache, monkeypatch):
+    redis_cache.xfetch_beta = 1.0
+    key = "cb:/v1/quiz:abc"
+    # 5s left, producer took 2s to compute
+    redis_cache.redis.store[key] = json.dumps(
+        {"__cb_soft__": time.time() + 5, "d": 2.0, "v": {"version": 1}}
+    )
+
+    monkeypatch.setattr("clausebot_api.cache.random.random", lambda: 0.0)
+    assert await redis_cache.get_or_set(key, lambda: {"version": 2}) == {"version": 1}
+    assert redis_cache.counters["early_refreshes"] == 0
+
+    # -ln(1 - 0.99) * 2s ~= 9.2s >= 5s left -> refresh early
+    monkeypatch.setattr("clausebot_api.cache.random.random", lambda: 0.99)
+    assert await redis_cache.get_or_set(key, lambda: {"version": 2}) == {"version": 1}
+    assert redis_cache.counters["early_refreshes"] == 1
+
+    await asyncio.gather(*redis_cache._refreshing.values())
+    assert await redis_cache.get(key) == {"version": 2}
+
+
+@pytest.mark.asyncio
+async def test_response_body_cache_skips_decode_on_hit(local_cache):
+    from starlette.requests import Request
+    from clausebot_api.response_cache import cached_json_response
+
+    def make_request(headers):
+        raw = [(k.lower().encode(), v.encode()) for k, v in headers.items()]
+        return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+    calls = []
+
+    def producer():
+        calls.append(1)
+        return {"items": ["x" * 50] * 40}
+
+    key = "cb:/v1/quiz:abc"
+    first = await cached_json_response(
+        make_request({"accept-encoding": "gzip"}), key, producer, kv=local_cache
+    )
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["x-body-cache"] == "miss"
+
+    async def no_decode(*args, **kwargs):
+        raise AssertionError("hit path touched the data cache")
+
+    local_cache.get_or_set = no_decode
+    hit = await cached_json_response(make_request({}), key, producer, kv=local_cache)
+    assert hit.headers["x-body-cache"] == "hit"
+    assert "content-encoding" not in hit.headers
+    assert json.loads(hit.body) == {"items": ["x" * 50] * 40}
+    assert len(calls) == 1
+
+    not_modified = await cached_json_response(
+        make_request({"if-none-match": hit.headers["etag"]}), key, producer, kv=local_cache
+    )
+    assert not_modified.status_code == 304
+
+    # Per-request fields go in front of the shared body, with their own ETag
+    local_cache.get_or_set = no_decode
+    first = await cached_json_response(make_request({}), key, producer, kv=local_cache, fields={"query": "Min  Preheat"})
+    other = await cached_json_response(make_request({}), key, producer, kv=local_cache, fields={"query": "min preheat"})
+    assert list(json.loads(first.body)) == ["query", "items"]
+    assert json.loads(first.body)["query"] == "Min  Preheat" and json.loads(other.body)["query"] == "min preheat"
+    assert json.loads(other.body)["items"] == ["x" * 50] * 40
+    assert first.headers["etag"] not in (other.headers["etag"], hit.headers["etag"])
+
+
+@pytest.mark.asyncio
+async def test_negative_result_cached_with_short_ttl(redis_cache):
+    from fastapi import HTTPException
+
+    redis_cache.negative_ttl = 15
+    calls = []
+
+    def producer():
+        calls.append(1)
+        raise HTTPException(status_code=422, detail="No quiz records for category 'X'")
+
+    key = "cb:/v1/quiz:bad"
+    for _ in range(3):
+        with pytest.raises(HTTPException) as exc:
+            await redis_cache.get_or_set(key, producer)
+        assert exc.value.status_code == 422
+        assert "category 'X'" in exc.value.detail
+
+    assert len(calls) == 1
+    assert 0 < await redis_cache.redis.pttl(key) <= 15 * 1000
+    assert await redis_cache.get(key) is None
+    assert redis_cache.counters["negative_hits"] == 2
+    quiz = redis_cache.telemetry.snapshot()["cb:/v1/quiz"]
+    assert quiz["negative_hits"] == 3  # includes the plain get()
+    assert quiz["hits"]["redis"] == 0
+
+
+@pytest.mark.asyncio
+async def test_other_errors_not_negatively_cached(redis_cache):
+    from fastapi import HTTPException
+
+    def producer():
+        raise HTTPException(status_code=500, detail="boom")
+
+    with pytest.raises(HTTPException):
+        await redis_cache.get_or_set("cb:/v1/quiz:err", producer)
+    assert "cb:/v1/quiz:err" not in redis_cache.redis.store
+
+
+@pytest.mark.asyncio
+async def test_invalidation_reaches_other_workers_l1(monkeypatch, fake_redis):
+    monkeypatch.delenv("KV_URL", raising=False)
+    shared = fake_redis
+    worker_a = KVCache(l1_max_entries=16, l1_max_bytes=4096, l1_ttl=30)
+    worker_b = KVCache(l1_max_entries=16, l1_max_bytes=4096, l1_ttl=30)
+    worker_a.redis = worker_b.redis = shared
+
+    await worker_b.set("cb:/v1/quiz:abc", {"v": 1})
+    assert worker_b.l1.get("cb:/v1/quiz:abc") == {"v": 1}
+
+    await worker_a.invalidate_namespace("/v1/quiz")
+    channel, message = shared.published[-1]
+    assert channel == "cb:invalidate"
+
+    worker_a.bus.handle(message)  # own echo is ignored
+    assert worker_a.bus.stats["applied"] == 0
+
+    worker_b.bus.handle(message)
+    assert len(worker_b.l1) == 0
+    assert "cb:/v1/quiz" not in worker_b._generations
+    assert await worker_b.get("cb:/v1/quiz:abc") is None
+
+
+def test_bus_resync_clears_local_state(local_cache):
+    seen = []
+    local_cache.bus.add_listener(seen.append)
+    local_cache.l1.set("cb:/v1/clause:x", 1, ttl=30, size=1)
+
+    local_cache.bus.resync()
+
+    assert len(local_cache.l1) == 0
+    assert seen == [{"op": "all", "target": ""}]
+
+
+@pytest.mark.asyncio
+async def test_bus_backs_off_when_server_keeps_closing_subscription(redis_cache, monkeypatch):
+    class ClosingPubSub:
+        """Subscribes fine, then the server closes the connection at once."""
+
+        async def subscribe(self, channel):
+            subscribes.append(channel)
+            if len(subscribes) > 10:  # spinning without sleeping: fail, don't hang
+                raise asyncio.CancelledError
+
+        async def listen(self):
+            return
+            yield
+
+        async def aclose(self):
+            pass
+
+    delays, subscribes = [], []
+
+    async def sleep(delay):
+        delays.append(delay)
+        if len(delays) == 5:
+            raise asyncio.CancelledError
+
+    redis_cache.redis.pubsub = lambda **kwargs: ClosingPubSub()
+    monkeypatch.setattr("clausebot_api.cache_bus.asyncio.sleep", sleep)
+    with pytest.raises(asyncio.CancelledError):
+        await redis_cache.bus._listen()
+    assert delays == [0.5, 1.0, 2.0, 4.0, 8.0]
+    assert redis_cache.bus.stats["resyncs"] == 4
+
+
+def test_heavy_hitters_keeps_frequent_keys_within_capacity():
+    from clausebot_api.cache_warming import HeavyHitters
+
+    sketch = HeavyHitters(capacity=3)
+    # Space-Saving keeps any item seen more than N / capacity times
+    for _ in range(30):
+        sketch.add("hot", {"n": 1})
+    for i in range(40):
+        sketch.add(f"cold-{i}")
+
+    assert len(sketch) == 3
+    item, count, payload = sketch.top(1)[0]
+    assert (item, payload) == ("hot", {"n": 1})
+    assert count >= 30
+
+
+@pytest.mark.asyncio
+async def test_warmer_rewarms_recorded_keys(redis_cache, monkeypatch):
+    from clausebot_api import cache_warming
+    from clausebot_api.cache import cache_key
+
+    monkeypatch.setattr(cache_warming, "_PRODUCERS", {})
+    calls = []
+
+    def build(category, count):
+        calls.append((category, count))
+        return {"category": category, "count": count}
+
+    cache_warming.register_warmer("/v1/quiz", build)
+    warmer = cache_warming.CacheWarmer(redis_cache, sketch_size=8, top_n=4, lead_seconds=60)
+    warmer.record("/v1/quiz", {"category": "Fundamentals", "count": 5})
+    warmer.record("/v1/unregistered", {"x": 1})  # ignored
+    assert len(warmer.sketch) == 1
+
+    # Without a shared hot set the local sketch drives warming
+    redis_cache.redis, fake = None, redis_cache.redis
+    assert (await warmer.warm_all())["warmed"] == 1
+    redis_cache.redis = fake
+
+    key = cache_key("/v1/quiz", category="Fundamentals", count=5)
+    await warmer.warm_key(key, {"path": "/v1/quiz", "params": {"category": "Fundamentals", "count": 5}})
+    assert calls == [("Fundamentals", 5)] * 2
+
+    # Fresh for longer than lead_seconds: skipped
+    assert not await warmer.warm_key(key, {"path": "/v1/quiz", "params": {"category": "Fundamentals", "count": 5}})
+    assert warmer.stats["skipped_fresh"] == 1
+
+    assert await redis_cache.get(key) == {"category": "Fundamentals", "count": 5}
+    assert redis_cache.counters["warm_hits"] == 1
+    assert warmer.health()["warm_hit_share"] == 100.0
+
+
+@pytest.mark.asyncio
+async def test_warm_hits_counted_from_l1(monkeypatch, fake_redis):
+    monkeypatch.delenv("KV_URL", raising=False)
+    worker = KVCache(l1_max_entries=8, l1_max_bytes=4096, l1_ttl=30)
+    worker.redis = fake_redis
+
+    # Warmed by this worker (L1 mirror of the write) ...
+    await worker.set("cb:/v1/quiz:warm", {"q": 1}, warmed=True)
+    assert await worker.get("cb:/v1/quiz:warm") == {"q": 1}
+    # ... or by another one (promoted to L1 on the first Redis hit)
+    await worker.set("cb:/v1/quiz:other", {"q": 2}, warmed=True)
+    worker.l1.delete("cb:/v1/quiz:other")
+    assert await worker.get("cb:/v1/quiz:other") == {"q": 2}
+    assert await worker.get("cb:/v1/quiz:other") == {"q": 2}
+    assert await worker.get_many(["cb:/v1/quiz:warm", "cb:/v1/quiz:other"]) == {
+        "cb:/v1/quiz:warm": {"q": 1}, "cb:/v1/quiz:other": {"q": 2}
+    }
+
+    await worker.set("cb:/v1/quiz:cold", {"q": 3})
+    assert await worker.get("cb:/v1/quiz:cold") == {"q": 3}
+    assert worker.counters["warm_hits"] == 5
+    assert worker.telemetry.snapshot()["cb:/v1/quiz"]["hits"]["l1"] == 5
@@ -0,0 +1,70 @@
+"""
+Streaming compliance chat endpoint tests (SSE frames, RAG pipeline stubbed)
+"""
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+
+@pytest.fixture
+def stream(rag_stubs, monkeypatch):
+    """POST /chat/compliance/stream; returns the (event, data) frames in order."""
+    from clausebot_api.routes import chat_compliance
+
+    monkeypatch.setattr(chat_compliance, "RAG_ENABLED", True)
+    app = FastAPI()
+    app.include_router(chat_compliance.router)
+
+    async def post(session_id, query="min preheat A514"):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/chat/compliance/stream", json={"query": query, "session_id": session_id})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        frames = []
+        for frame in response.text.strip().split("\n\n"):
+            event, data = frame.split("\n")
+            frames.append((event[len("event: "):], json.loads(data[len("data: "):])))
+        return frames
+
+    return post
+
+
+@pytest.mark.asyncio
+async def test_stream_sends_citations_then_tokens_then_metadata(stream, rag_stubs):
+    frames = await stream("s1")
+    assert [event for event, _ in frames] == ["citations", "token", "token", "metadata"]
+    assert [c["clause_id"] for c in frames[0][1]] == ["d11_5.7"]
+    assert [data["text"] for _, data in frames[1:3]] == rag_stubs.openai.tokens
+    metadata = frames[-1][1]
+    assert metadata["session_id"] == "s1" and metadata["completion_tokens"] == 2
+    assert 0 <= metadata["ttfb_ms"] <= metadata["total_ms"]
+    assert [r["clause_id"] for r in rag_stubs.logged] == ["d11_5.7"]
+
+
+@pytest.mark.asyncio
+async def test_stream_ends_with_error_frame_when_generation_fails(stream, rag_stubs):
+    rag_stubs.openai.fail_after = 1
+    frames = await stream("s1")
+    assert [event for event, _ in frames] == ["citations", "token", "error"]
+    assert frames[-1][1] == {"detail": "Internal error: upstream reset"}
+    assert rag_stubs.logged == []
+
+    # The partial answer was not cached: the next request generates again
+    rag_stubs.openai.fail_after = None
+    assert [event for event, _ in await stream("s2")][-1] == "metadata"
+    assert rag_stubs.openai.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_serves_cached_answer_as_one_token(stream, rag_stubs):
+    generated = await stream("s1")
+    cached = await stream("s2")
+    assert [event for event, _ in cached] == ["citations", "token", "metadata"]
+    assert cached[0] == generated[0]
+    assert cached[1][1]["text"] == "".join(rag_stubs.openai.tokens)
+    assert cached[2][1]["answer_cache"]["similarity"] == 1.0 and cached[2][1]["session_id"] == "s2"
+    assert rag_stubs.openai.calls == 1
+    assert [r["clause_id"] for r in rag_stubs.logged] == ["d11_5.7", "d11_5.7"]
@@ -0,0 +1,57 @@
+"""
+Batched citation log writer tests (no Supabase required)
+"""
+import asyncio
+
+import pytest
+
+from clausebot_api.services.citation_log import CitationLogWriter
+
+
+class FakeSupabase:
+    """Records chat_citations insert batches; raises while down."""
+
+    def __init__(self):
+        self.batches, self.down = [], False
+
+    def table(self, name):
+        return self
+
+    def insert(self, rows):
+        self._rows = rows
+        return self
+
+    def execute(self):
+        if self.down:
+            raise ConnectionError("supabase unreachable")
+        self.batches.append(list(self._rows))
+
+
+@pytest.mark.asyncio
+async def test_citation_log_batches_spills_and_replays(tmp_path):
+    client = FakeSupabase()
+    spill = tmp_path / "spill.jsonl"
+    writer = CitationLogWriter(client, batch_size=3, flush_interval=60, spill_path=spill)
+    rows = [{"session_id": "s", "clause_id": f"c{i}"} for i in range(5)]
+
+    # Size trigger: a full batch is written without waiting for the interval
+    writer.enqueue(rows[:3])
+    for _ in range(50):
+        if client.batches:
+            break
+        await asyncio.sleep(0.01)
+    assert [len(b) for b in client.batches] == [3] and writer.depth == 0
+
+    # Outage: the batch goes to the spill file, then is replayed on recovery
+    client.down = True
+    writer.enqueue(rows[3:])
+    assert not await writer.flush()
+    assert len(spill.read_text().splitlines()) == 2
+    client.down = False
+    assert await writer.replay_spill() == 2
+    assert not spill.exists() and client.batches[-1] == rows[3:]
+
+    await writer.stop()
+    health = writer.health()
+    assert health["written"] == 5 and health["queue_depth"] == 0
+    assert health["flush_ms"]["count"] == 2
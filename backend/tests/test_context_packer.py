@@ -0,0 +1,50 @@
+"""
+Token-budgeted RAG context packing tests (whitespace tokenizer)
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from clausebot_api.services import context_packer
+
+
+@pytest.fixture(autouse=True)
+def whitespace_tokens(monkeypatch):
+    """The real BPE file needs network access; count whitespace tokens instead."""
+    monkeypatch.setattr(context_packer, "get_encoding", lambda: SimpleNamespace(encode=str.split, decode=" ".join))
+    context_packer.count_tokens.cache_clear()
+    context_packer.split_passages.cache_clear()
+    yield
+    context_packer.count_tokens.cache_clear()
+    context_packer.split_passages.cache_clear()
+
+
+def test_context_packer_dedupes_trims_and_respects_budget(make_clause):
+    table = "\n\n".join(f"Row {i}: base metal group {i} thickness limits" for i in range(40))
+    parent = make_clause("5.7", "Preheat requirements\n\nA514 minimum preheat is 50F over 2.5in\n\n" + table, 0.91)
+    child = make_clause("5.7.1", "A514 minimum preheat is 50F over 2.5in\n\nPreheat requirements", 0.88)
+    other = make_clause("6.2", "Visual inspection of completed welds\n\n" + table, 0.70)
+
+    packed = context_packer.pack_context("A514 minimum preheat", [parent, child, other], budget=120, clause_max_tokens=60)
+    assert packed.deduped == ["d11_5.7.1"]
+    assert "A514 minimum preheat is 50F" in packed.text and "[...]" in packed.text
+    assert "d11_5.7" in packed.trimmed
+    assert packed.tokens <= 120 < packed.full_tokens
+    assert packed.summary()["context_tokens_saved"] == packed.full_tokens - packed.tokens
+    assert [c.clause_id for c in packed.clauses] == ["d11_5.7", "d11_6.2"]
+
+
+def test_context_packer_cuts_oversized_passages_instead_of_dropping(make_clause):
+    long_top = make_clause("4.8", " ".join(f"preheat{i}" for i in range(300)), 0.93)
+    long_next = make_clause("6.1", " ".join(f"visual{i}" for i in range(300)), 0.80)
+
+    # Budget smaller than the top clause's frame: it is still kept, cut short
+    packed = context_packer.pack_context("preheat", [long_top], budget=5, clause_max_tokens=5)
+    assert [c.clause_id for c in packed.clauses] == ["d11_4.8"]
+    assert packed.trimmed == ["d11_4.8"] and packed.text.rstrip().count("preheat") >= 50
+
+    # A later clause's single passage is cut to the room left rather than dropped
+    packed = context_packer.pack_context("preheat", [long_top, long_next], budget=200, clause_max_tokens=120)
+    assert [c.clause_id for c in packed.clauses] == ["d11_4.8", "d11_6.1"]
+    assert packed.dropped == [] and packed.tokens <= 200
+    assert "visual0 visual1" in packed.text and "visual299" not in packed.text
@@ -0,0 +1,40 @@
+"""
+Query embedding cache tests (no Valkey/Redis or OpenAI required)
+"""
+import sys
+from array import array
+
+import pytest
+
+from clausebot_api.embedding_cache import EmbeddingCache, decode_vector
+
+
+@pytest.mark.asyncio
+async def test_embedding_cache_reuses_normalized_queries(redis_cache):
+    calls = []
+
+    async def embed(text):
+        calls.append(text)
+        return [0.5, -0.25, 0.125]
+
+    emb = EmbeddingCache(kv=redis_cache, max_entries=8, dtype="float16")
+    first = await emb.get_or_embed("Minimum  preheat A514", "m", embed)
+    again = await emb.get_or_embed("minimum preheat a514 ", "m", embed)
+    assert calls == ["Minimum  preheat A514"]  # original text, normalized key
+    assert first == again
+
+    # L1 holds float32 arrays sized by what they really occupy
+    assert emb.l1.stats()["bytes"] == sys.getsizeof(array("f", first))
+
+    # Redis holds packed float16 (header + 2 bytes per dimension)
+    raw = redis_cache.redis.store[emb.key("minimum preheat a514", "m")]
+    assert len(raw) == 1 + 3 * 2
+    assert decode_vector(raw) == [0.5, -0.25, 0.125]
+
+    # Another worker (empty L1) is served from Redis
+    other = EmbeddingCache(kv=redis_cache, max_entries=8)
+    assert await other.get_or_embed("minimum preheat a514", "m", embed) == first
+    assert len(calls) == 1
+    stats = emb.stats()
+    assert (stats["l1_hits"], stats["misses"], stats["bytes_stored"]) == (1, 1, 7)
+    assert other.stats()["redis_hits"] == 1
@@ -0,0 +1,130 @@
+"""
+Priority routing tests (speculative tiers, in-memory clause key index)
+"""
+import asyncio
+import time
+
+import pytest
+
+from clausebot_api.services.clause_key_index import ClauseKeyIndex, asme_keys
+from clausebot_api.services.rag_priority_routing import PriorityMatch, PriorityRouter
+
+
+def nlm_row(clause_id, section, nlm_id, code_ref, content):
+    """A notebooklm-tagged clause_embeddings row as the key index loads it."""
+    return {
+        "clause_id": clause_id, "section": section, "content": content,
+        "nlm_source_id": nlm_id, "nlm_timestamp": "2025-10-01T00:00:00",
+        "code_reference_primary": code_ref, "sme_reviewer_initials": "MM",
+        "cms_tag": "source: notebooklm", "content_hash": "h",
+    }
+
+
+@pytest.mark.asyncio
+async def test_priority_router_speculative_tiers_run_concurrently():
+    router = PriorityRouter(supabase=None, speculative=True)
+    finished = []
+
+    async def p1(query, meta):
+        await asyncio.sleep(0.05)
+        finished.append("p1")
+        return None
+
+    async def p2(query, meta):
+        await asyncio.sleep(0.05)
+        finished.append("p2")
+        return PriorityMatch(2, "clause + keyword", "d11_5.7", None, 0.9, "Preheat")
+
+    async def generic(query):
+        await asyncio.sleep(0.2)
+        finished.append("generic")
+        return [{"clause_id": "d11_1.1", "similarity": 0.7, "content": "Scope"}]
+
+    router.priority_1_match, router.priority_2_match = p1, p2
+    start = time.perf_counter()
+    match, results = await router.route_query("QW-200.1 WPS purpose", "s1", generic)
+    assert match.priority_level == 2 and results[0]["clause_id"] == "d11_5.7"
+    assert time.perf_counter() - start < 0.15  # P1 and P2 overlapped
+    await asyncio.sleep(0.25)
+    assert "generic" not in finished  # cancelled once P2 qualified
+
+    async def no_match(query, meta):
+        return None
+
+    logged = []
+
+    async def log_fallback_query(**kwargs):
+        logged.append(kwargs["retrieved_clauses"])
+
+    router.priority_1_match = router.priority_2_match = no_match
+    router.logger.log_fallback_query = log_fallback_query
+    match, results = await router.route_query("preheat", "s1", generic)
+    assert match.priority_level == 3 and logged == [results]
+
+    stats = router.stats()
+    assert stats["wins"] == {"p1": 0, "p2": 1, "generic": 1, "none": 0}
+    assert stats["cancelled"] == 1 and stats["tier_ms"]["generic"]["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_priority_router_matches_from_clause_key_index(monkeypatch):
+    assert asme_keys("ASME Section IX QW-451.1.2") == ["IX QW-451.1.2", "IX QW-451.1", "IX QW-451"]
+    monkeypatch.delenv("PRIORITY_ROUTING_SPECULATIVE", raising=False)
+    assert not PriorityRouter(supabase=None).speculative  # speculation is opt-in
+
+    index = ClauseKeyIndex(client=None, max_age=0, enabled=True)
+    router = PriorityRouter(supabase=None, speculative=False, key_index=index)
+    index.load([
+        nlm_row("d11_8.15", "8.15", "Q032", "AWS D1.1:2020 8.15", "Acceptance criteria for visual inspection"),
+        nlm_row("asme_qw200", "QW-200", "Q040", "ASME IX QW-200.1", "Each WPS shall list essential variables"),
+    ])
+
+    meta = {"nlm_ids": ["Q032"], "clauses": [("", "Clause", "8.15")], "asme_refs": [], "keywords": []}
+    match = await router.priority_1_match("", meta)
+    assert match.priority_level == 1 and match.clause_id == "d11_8.15"
+
+    # Rows without a section never match an NLM ID on its own
+    untagged = ClauseKeyIndex(client=None, max_age=0, enabled=True)
+    untagged.load([nlm_row("d11_none", None, "Q050", "AWS D1.1:2020", "Untagged")])
+    assert untagged.lookup_nlm("Q050") == [] and untagged.lookup_nlm("Q050", None) == []
+
+    meta = router.extract_query_metadata("ASME Section IX QW-200.1 WPS purpose")
+    match = await router.priority_2_match("", meta)
+    assert match.priority_level == 2 and match.clause_id == "asme_qw200"
+    assert router.stats()["lookups"] == {"index": 2, "supabase": 0}
+
+    # An ingestion insert replaces just the announced rows
+    async def fetch(fn, client, clause_ids=None):
+        return [nlm_row("d11_8.15", "8.15", "Q033", "AWS D1.1:2020 8.15", "Revised")]
+
+    index._client = object()
+    monkeypatch.setattr("clausebot_api.services.clause_key_index.supabase_pool.run", fetch)
+    assert await index.refresh(clause_ids=["d11_8.15"])
+    assert index.lookup_nlm("Q032", "8.15") == []
+    assert index.lookup_nlm("Q033", "8.15")[0]["content"] == "Revised"
+    assert index.health()["rows"] == 2 and index.health()["inserts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_clause_key_index_backs_off_stale_reloads_while_supabase_is_down(monkeypatch):
+    index = ClauseKeyIndex(client=object(), max_age=60, enabled=True)
+    index.load([nlm_row("d11_8.15", "8.15", "Q032", "AWS D1.1:2020 8.15", "Acceptance criteria")])
+    index._state.built_at -= 120
+    calls = []
+
+    async def down(fn, client, clause_ids=None):
+        calls.append(clause_ids)
+        raise ConnectionError("supabase unreachable")
+
+    monkeypatch.setattr("clausebot_api.services.clause_key_index.supabase_pool.run", down)
+    for _ in range(3):
+        for _ in range(20):
+            assert index.lookup_nlm("Q032", "8.15")[0]["clause_id"] == "d11_8.15"
+        await asyncio.sleep(0)
+    assert len(calls) == 1 and index.health()["errors"] == 1
+
+    # Another max_age later the reload is retried once more
+    index._attempted_at -= 61
+    index.lookup_section("8.15")
+    await asyncio.sleep(0)
+    assert len(calls) == 2
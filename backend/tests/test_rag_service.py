@@ -0,0 +1,34 @@
+"""
+RAG pipeline tests (OpenAI, Supabase and retrieval stubbed)
+"""
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_cached_answer_cites_only_clauses_from_its_context(rag_service, rag_stubs):
+    first = await rag_service.rag_pipeline("min preheat A514", "s1")
+    assert [c["clause_id"] for c in first["citations"]] == ["d11_5.7"]
+
+    # Same clause set and query: served from the answer cache, still citing
+    # only the clause that was in the generated answer's context
+    again = await rag_service.rag_pipeline("min preheat A514", "s2")
+    assert again["answer"] == first["answer"]
+    assert again["metadata"]["answer_cache"]["similarity"] == 1.0
+    assert [c["clause_id"] for c in again["citations"]] == ["d11_5.7"]
+    assert first["metadata"]["retrieval_count"] == again["metadata"]["retrieval_count"] == 2
+    assert rag_stubs.openai.calls == 1
+    assert [r["clause_id"] for r in rag_stubs.logged] == ["d11_5.7", "d11_5.7"]
+
+
+@pytest.mark.asyncio
+async def test_cached_stream_cites_only_clauses_from_its_context(rag_service, rag_stubs):
+    async def run(session_id):
+        return [event async for event in rag_service.rag_pipeline_stream("min preheat A514", session_id)]
+
+    generated = await run("s1")
+    cached = await run("s2")
+    assert [e for e, _ in cached] == ["citations", "token", "metadata"]
+    assert cached[0][1] == generated[0][1] and [c["clause_id"] for c in cached[0][1]] == ["d11_5.7"]
+    assert cached[1][1] == "".join(rag_stubs.openai.tokens)
+    assert generated[-1][1]["retrieval_count"] == cached[-1][1]["retrieval_count"] == 2
+    assert rag_stubs.openai.calls == 1
@@ -0,0 +1,61 @@
+"""
+Supabase thread pool tests (simulated blocking calls)
+"""
+import asyncio
+import time
+
+import pytest
+
+from clausebot_api.services.supabase_pool import SupabasePool
+
+
+class SlowQuery:
+    """A postgrest request builder whose execute() blocks for 50 ms."""
+
+    def execute(self):
+        time.sleep(0.05)
+        return "ok"
+
+
+@pytest.mark.asyncio
+async def test_supabase_pool_keeps_event_loop_free():
+    pool = SupabasePool(max_workers=4)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.005)
+            ticks += 1
+
+    task = asyncio.ensure_future(ticker())
+    start = time.perf_counter()
+    results = await asyncio.gather(*(pool.execute(SlowQuery()) for _ in range(4)))
+    elapsed = time.perf_counter() - start
+    task.cancel()
+    pool.shutdown()
+
+    assert results == ["ok"] * 4
+    assert elapsed < 0.15  # ran side by side, not back to back
+    assert ticks >= 3  # the loop kept serving other work meanwhile
+    health = pool.health()
+    assert health["calls"] == 4 and health["in_flight"] == 0 and health["waiting"] == 0
+
+
+@pytest.mark.asyncio
+async def test_supabase_pool_stats_are_exact_under_concurrency():
+    pool = SupabasePool(max_workers=8)
+
+    def call(i):
+        if i % 4 == 0:
+            raise ConnectionError("supabase unreachable")
+        return i
+
+    results = await asyncio.gather(*(pool.run(call, i) for i in range(400)), return_exceptions=True)
+    pool.shutdown()
+
+    assert sum(isinstance(r, ConnectionError) for r in results) == 100
+    health = pool.health()
+    assert health["calls"] == 400 and health["errors"] == 100
+    assert health["in_flight"] == 0 and health["waiting"] == 0
+    assert health["call_ms"]["count"] == 400
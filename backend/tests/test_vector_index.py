@@ -0,0 +1,147 @@
+"""
+In-process vector index tests (exact, quantized, two-stage, ANN + delta)
+"""
+import numpy as np
+import pytest
+
+from clausebot_api.services.vector_index import VectorIndex, write_snapshot
+
+
+def synthetic_rows(n, standards=("AWS D1.1:2020",)):
+    """Row metadata c000, c001, ... cycling through standards."""
+    return [
+        {"clause_id": f"c{i:03d}", "standard": standards[i % len(standards)], "section": str(i), "title": "", "content": ""}
+        for i in range(n)
+    ]
+
+
+def test_vector_index_exact_top_k_with_standard_filter(tmp_path):
+    rows = [
+        {"clause_id": "d11_4.8.3", "standard": "AWS D1.1:2020", "section": "4.8.3", "title": "Preheat", "content": "minimum preheat"},
+        {"clause_id": "d11_5.1", "standard": "AWS D1.1:2020", "section": "5.1", "title": "Fillet", "content": "fillet weld size"},
+        {"clause_id": "ix_qw200", "standard": "ASME IX", "section": "QW-200", "title": "WPS", "content": "preheat variables"},
+    ]
+    vectors = np.array([[3.0, 0.0, 0.0], [0.0, 2.0, 0.0], [1.0, 1.0, 0.0]])
+    write_snapshot(tmp_path, rows, vectors)
+
+    index = VectorIndex(path=tmp_path, check_interval=0)
+    assert index.load()
+    assert np.allclose(np.linalg.norm(index._state.vectors, axis=1), 1.0)
+
+    # Batched queries, best first
+    results = index.search([[1.0, 0.1, 0.0], [0.0, 1.0, 0.0]], top_k=2)
+    assert [index._state.rows[i]["clause_id"] for i, _ in results[0]] == ["d11_4.8.3", "ix_qw200"]
+    assert [index._state.rows[i]["clause_id"] for i, _ in results[1]] == ["d11_5.1", "ix_qw200"]
+
+    hits = index.search_clauses([1.0, 1.0, 0.0], "preheat", standard="AWS D1.1:2020", top_k=5, threshold=0.5)
+    assert [h["clause_id"] for h in hits] == ["d11_4.8.3", "d11_5.1"]
+
+    # Ordered by cosine alone: query words in a clause don't lift it
+    hits = index.search_clauses([0.7, 1.0, 0.0], "minimum preheat", standard="AWS D1.1:2020", top_k=5, threshold=0.0)
+    assert [h["clause_id"] for h in hits] == ["d11_5.1", "d11_4.8.3"]
+    assert [h["rank"] for h in hits] == [0.0, 0.0]
+    assert not index.has_standard("API 1104")
+
+    # A reload landing mid-request must not remap row indices
+    search = index.search
+
+    write_snapshot(tmp_path / "next", rows[1:], vectors[1:])
+    reloaded = VectorIndex(path=tmp_path / "next")
+    assert reloaded.load()
+
+    def search_during_reload(*args, **kwargs):
+        index._state = reloaded._state
+        return search(*args, **kwargs)
+
+    index.search = search_during_reload
+    hits = index.search_clauses([1.0, 1.0, 0.0], "preheat", standard="AWS D1.1:2020", top_k=5, threshold=0.5)
+    assert [h["clause_id"] for h in hits] == ["d11_4.8.3", "d11_5.1"]
+
+
+@pytest.mark.parametrize("mode", ["int8", "float16"])
+def test_quantized_search_rescores_to_exact_results(tmp_path, mode):
+    rng = np.random.default_rng(3)
+    vectors = rng.normal(size=(300, 64)).astype(np.float32)
+    write_snapshot(tmp_path, synthetic_rows(300), vectors)
+    queries = vectors[:10] + 0.2 * rng.normal(size=(10, 64)).astype(np.float32)
+
+    exact = VectorIndex(path=tmp_path)
+    exact.quantization = "none"
+    quantized = VectorIndex(path=tmp_path)
+    quantized.quantization, quantized.rescore = mode, 4
+    assert exact.load() and quantized.load()
+    assert quantized._state.coarse.dtype == (np.int8 if mode == "int8" else np.float16)
+
+    for want, got in zip(exact.search(queries, 5), quantized.search(queries, 5)):
+        assert [i for i, _ in got] == [i for i, _ in want]
+        # Similarities come from the float32 rows, not the quantized ones
+        assert np.allclose([s for _, s in got], [s for _, s in want], atol=1e-6)
+    assert quantized.stats["rescored"] == 10 * 20
+
+
+def test_two_stage_truncated_search_reports_stage_recall(tmp_path):
+    rng = np.random.default_rng(5)
+    # Leading dimensions carry most of the signal, as in Matryoshka embeddings
+    decay = 1.0 / np.sqrt(1.0 + np.arange(600) / 16.0)
+    vectors = (rng.normal(size=(400, 600)) * decay).astype(np.float32)
+    meta = write_snapshot(tmp_path, synthetic_rows(400), vectors)
+    assert {"m256", "m512"} <= set(meta["files"])
+
+    index = VectorIndex(path=tmp_path)
+    index.truncate_dim, index.truncate_candidates, index.recall_sample = 256, 10, 1.0
+    assert index.load()
+    assert index._state.first_stage == "m256" and index._state.coarse.shape == (400, 256)
+
+    hits = index.search(vectors[7], 5)[0]
+    assert index._state.rows[hits[0][0]]["clause_id"] == "c007"
+    assert abs(hits[0][1] - 1.0) < 1e-5
+
+    stages = index.stage_stats()
+    assert stages["recall_samples"] == 1
+    assert stages["final_recall"] == 1.0
+    assert stages["first_pass_ms"]["count"] == 1
+
+
+def test_ann_search_filters_by_standard_and_merges_inserted_rows(tmp_path):
+    rng = np.random.default_rng(11)
+    centers = rng.normal(size=(20, 64))
+    vectors = (centers[rng.integers(20, size=600)] + 0.3 * rng.normal(size=(600, 64))).astype(np.float32)
+    rows = synthetic_rows(600, standards=("AWS D1.1:2020", "AWS D1.1:2025", "ASME IX"))
+    meta = write_snapshot(tmp_path, rows, vectors, ann=True)
+    assert meta["ann"]["nlist"] > 3
+
+    index = VectorIndex(path=tmp_path)
+    index.quantization, index.nprobe = "none", 4
+    assert index.load() and index._state.ann is not None
+
+    # Per-standard lists: every hit is from the filter, and the query row is found
+    hits = index.search(vectors[10], 5, "AWS D1.1:2025", ann=True)[0]
+    assert {index._state.rows[r]["standard"] for r, _ in hits} == {"AWS D1.1:2025"}
+    assert index._state.rows[hits[0][0]]["clause_id"] == "c010"
+    exact = index.search(vectors[10], 5, "AWS D1.1:2025")[0]
+    assert len({r for r, _ in hits} & {r for r, _ in exact}) >= 4
+
+    # Inserted rows are searchable at once and replace base rows by clause_id
+    new = rng.normal(size=(2, 64)).astype(np.float32)
+    added = [
+        {"clause_id": "c010", "standard": "AWS D1.1:2025", "section": "10", "title": "", "content": ""},
+        {"clause_id": "api_1", "standard": "API 1104", "section": "1", "title": "", "content": ""},
+    ]
+    assert index.insert(added, new) == 2
+    assert index.has_standard("API 1104")
+    hits = index.search(new[0], 3, "AWS D1.1:2025", ann=True)[0]
+    assert index._state.rows[hits[0][0]]["clause_id"] == "c010"
+    assert abs(hits[0][1] - 1.0) < 1e-5
+    assert [index._state.rows[r]["clause_id"] for r, _ in index.search(vectors[10], 5, "AWS D1.1:2025")[0]].count("c010") <= 1
+    assert index._state.rows[index.search(new[1], 1, "API 1104", ann=True)[0][0][0]]["clause_id"] == "api_1"
+
+    # Another worker sees the delta; compaction folds it into the snapshot
+    other = VectorIndex(path=tmp_path)
+    assert other.load() and len(other._state.delta_ids) == 2
+    assert index.compact()
+    assert index._state.delta_vectors is None and index._state.meta["count"] == 601
+    assert index.has_standard("API 1104")
+
+    # Workers never train ANN lists: ANN searches scan exactly until the next ingestion build
+    assert index._state.ann is None
+    assert index._state.rows[index.search(new[1], 1, "API 1104", ann=True)[0][0][0]]["clause_id"] == "api_1"